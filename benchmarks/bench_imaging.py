@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""End-to-end imaging benchmark: drives a synthetic project through the mock controller.
+
+Runs COPISCore.start_imaging headless against the TEST port and reports JSON:
+poses per second, host overhead per pose (wall time not spent in simulated
+motion), clear-to-send latency percentiles, CPU usage and SysDB writes.
+
+Run from the project root:
+    python -m benchmarks.bench_imaging [-s 50] [-r 20] [--stream-depth 4] [--per-device] [--ports 2] [--pty [--serial-backend asyncio]] [--log-serial [--serial-log]] [--telemetry] [-o out.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from copis.classes import Action, Pose
+from copis.cli import HeadlessClient
+from copis.coms import serial_controller
+from copis.config import Config
+from copis.core import COPISCore
+from copis.globals import ActionType
+from copis.helpers import create_action_args
+from copis.mocks import MockCopisController
+
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+_TEST_PORT = 'TEST'
+_SYS_DB_WRITES = ('serial_tx', 'serial_rx', 'start_pose', 'update_pose_output',
+    'update_pose_output_md5', 'end_pose')
+
+_INI_TEMPLATE = """[App]
+window_min_size = 800,600
+debug_env = prod
+window_state = 0,0,800,600,False
+
+[Machine]
+size_x = 700.0
+size_y = 800.0
+size_z = 450.0
+origin_x = 350.0
+origin_y = 400.0
+origin_z = 0.0
+
+[Project]
+profile_path = {profile_path}
+default_proxy_path =
+
+[System]
+db = {db_path}
+log_serial_tx = {log_serial}
+log_serial_rx = {log_serial}
+edsdk_backend = mock
+serial_stream_depth = {stream_depth}
+serial_backend = {serial_backend}
+serial_log = {serial_log}
+telemetry_dir = {telemetry_dir}
+"""
+
+
+class _TimedController(MockCopisController):
+    """Records how long the host takes to send once the machine goes idle."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.cts_latencies = []
+        self.early_write_count = 0
+        self._last_write = None
+
+    def execute(self, cmd: bytes) -> int:
+        now = time.monotonic()
+
+        if self._last_write is not None:
+            idle_since = self.idle_since
+
+            if idle_since is None:
+                self.early_write_count += 1
+            else:
+                self.cts_latencies.append(now - max(idle_since, self._last_write))
+
+        self._last_write = now
+        return super().execute(cmd)
+
+
+def _count_writes(sys_db, names, counts) -> None:
+    # SysDB methods return a row id when they write; a negative number or None when they don't.
+    def wrap(name, func):
+        def inner(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if isinstance(result, int) and result >= 0:
+                counts[name] += 1
+            return result
+        return inner
+
+    for name in names:
+        counts[name] = 0
+        setattr(sys_db, name, wrap(name, getattr(sys_db, name)))
+
+
+def _percentiles_ms(samples) -> dict:
+    if not samples:
+        return {}
+
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        'p50': round(pick(.5), 3),
+        'p90': round(pick(.9), 3),
+        'p99': round(pick(.99), 3),
+        'max': round(ordered[-1] * 1000, 3),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 3)
+    }
+
+
+def _wait_for(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(.005)
+
+    return True
+
+
+def _build_project(core: COPISCore, set_count: int, shutter_ms: float, span: float,
+                   angle_span: float, seed: int) -> int:
+    rng = random.Random(seed)
+    devices = core.project.devices
+
+    with core.project.batch_edit():
+        for _ in range(set_count):
+            set_index = core.project.add_pose_set()
+
+            # Around each camera's profile position; the mock starts them all at its origin.
+            for dvc in devices:
+                x, y, z, p, t = dvc.position
+                coords = [x + rng.uniform(-span, span), y + rng.uniform(-span, span),
+                    z + rng.uniform(-span, span), p + rng.uniform(-angle_span, angle_span),
+                    t + rng.uniform(-angle_span, angle_span)]
+                position = Action(ActionType.G0, dvc.device_id, 5, create_action_args(coords))
+                shutter = Action(ActionType.C0, dvc.device_id, 1,
+                    create_action_args([shutter_ms], 'P'))
+                core.project.add_pose(set_index, Pose(position, [shutter]))
+
+    return set_count * len(devices)
+
+
+def run(args) -> dict:
+    """Runs one imaging session and returns its measurements."""
+    work_dir = tempfile.mkdtemp(prefix='copis_bench_')
+    ini_path = os.path.join(work_dir, 'copis.ini')
+
+    with open(ini_path, 'w', encoding='utf-8') as file:
+        file.write(_INI_TEMPLATE.format(profile_path=os.path.abspath(args.profile),
+            db_path=os.path.join(work_dir, 'copis.db'),
+            log_serial=str(args.log_serial).lower(), stream_depth=args.stream_depth,
+            serial_backend=args.serial_backend,
+            serial_log=os.path.join(work_dir, 'serial.log') if args.serial_log else '',
+            telemetry_dir=os.path.join(work_dir, 'telemetry') if args.telemetry else ''))
+
+    client = HeadlessClient(Config(ini_path))
+    core = COPISCore(client)
+    client.core = core
+    core.init_edsdk()
+
+    devices = core.project.devices
+    device_count = len(devices)
+    port_count = max(1, min(args.ports, device_count))
+    controllers, port_names = [], []
+
+    # Devices are dealt round robin to ports; the first port is the selected one, the others are routed.
+    for i in range(port_count):
+        device_ids = [d.device_id for d in devices[i::port_count]]
+        controller = _TimedController(len(device_ids),
+            accelerations={a: args.acceleration for a in MockCopisController._AXES},
+            report_rate=args.report_rate, latency=args.latency, jitter=args.jitter,
+            queue_size=args.queue_size, seed=args.seed, device_ids=device_ids)
+
+        if args.pty:
+            port_name = controller.serve_pty()
+            serial_controller.add_port(port_name, 'Benchmark mock controller')
+        elif i == 0:
+            port_name = _TEST_PORT
+            serial_controller._instance.test_device = controller
+            serial_controller.add_port(port_name, 'Benchmark mock controller')
+        else:
+            port_name = f'{_TEST_PORT}{i}'
+            serial_controller.add_port(port_name, 'Benchmark mock controller', controller)
+
+        if i > 0:
+            for dvc in devices[i::port_count]:
+                dvc.serial_port = port_name
+
+        controllers.append(controller)
+        port_names.append(port_name)
+
+    if not core.select_serial_port(port_names[0]) or not core.connect_serial():
+        raise RuntimeError(f'Unable to connect to {", ".join(port_names)}.')
+
+    try:
+        if not _wait_for(lambda: core.is_machine_idle and not core._is_new_connection, args.timeout):
+            raise RuntimeError('The mock controller did not become ready.')
+
+        pose_count = _build_project(core, args.sets, args.shutter_ms, args.span,
+            args.angle_span, args.seed)
+        core.project.update_imaging_option('per_device_queues', args.per_device)
+        core.project.update_imaging_option('sync_shutters', args.sync_shutters)
+        core.project.update_imaging_option('max_pose_set_lead', args.max_lead)
+
+        db_writes = {}
+        _count_writes(core.sys_db, _SYS_DB_WRITES, db_writes)
+
+        busy_start = [c.busy_time for c in controllers]
+        command_start = sum(c.command_count for c in controllers)
+        report_start = sum(c.report_count for c in controllers)
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        if not core.start_imaging():
+            raise RuntimeError('Imaging did not start.')
+
+        finished = _wait_for(lambda: core._working_thread is None and core.is_machine_idle,
+            args.timeout)
+
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        # The busiest port's; ports move at the same time, so their motion does not add up.
+        motion_time = max(c.busy_time - b for c, b in zip(controllers, busy_start))
+        host_time = max(wall_time - motion_time, 0)
+        # From status reports; only as precise as the report rate.
+        move_durations = [d for i in core.telemetry.device_ids for d in core.telemetry.move_durations(i)]
+    finally:
+        core.disconnect_serial()
+        for controller in controllers:
+            controller.stop()
+        core.terminate_edsdk()
+        core.close_serial_log()
+        core.telemetry.flush()
+
+    return {
+        'finished': finished,
+        'transport': 'pty' if args.pty else 'mock',
+        'serial_backend': args.serial_backend,
+        'port_count': port_count,
+        'device_count': device_count,
+        'pose_set_count': args.sets,
+        'pose_count': pose_count,
+        'stream_depth': args.stream_depth,
+        'per_device': args.per_device,
+        'sync_shutters': args.sync_shutters,
+        'max_pose_set_lead': args.max_lead,
+        'controller': {
+            'report_rate': args.report_rate,
+            'latency_s': args.latency,
+            'jitter_s': args.jitter,
+            'acceleration': args.acceleration,
+            'queue_size': args.queue_size,
+            'peak_queue_length': max(c.peak_queue_length for c in controllers),
+            'commands': sum(c.command_count for c in controllers) - command_start,
+            'reports': sum(c.report_count for c in controllers) - report_start
+        },
+        'wall_s': round(wall_time, 4),
+        'motion_s': round(motion_time, 4),
+        'host_s': round(host_time, 4),
+        'poses_per_s': round(pose_count / wall_time, 3) if wall_time else None,
+        'host_overhead_ms_per_pose': round(host_time / pose_count * 1000, 3) if pose_count else None,
+        'cts_latency_ms': _percentiles_ms([l for c in controllers for l in c.cts_latencies]),
+        'early_write_count': sum(c.early_write_count for c in controllers),
+        # Process wide; includes the mock controller's threads.
+        'cpu_s': round(cpu_time, 4),
+        'cpu_percent': round(cpu_time / wall_time * 100, 1) if wall_time else None,
+        'sys_db_writes': db_writes,
+        'sys_db_write_count': sum(db_writes.values()),
+        'serial_log_frames': core.serial_log.frame_count if core.serial_log else None,
+        'telemetry_samples': sum(len(core.telemetry.query(i)) for i in core.telemetry.device_ids),
+        'move_ms': _percentiles_ms(move_durations),
+        'python': sys.version.split()[0],
+        'threads_left': threading.active_count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-p', '--profile', default=os.path.join(_ROOT_PATH, 'profiles', 'default_profile.json'),
+        help='device profile; one mock device is emulated per profile device')
+    parser.add_argument('-s', '--sets', type=int, default=50, help='number of pose sets')
+    parser.add_argument('-r', '--report-rate', type=float, default=0, help='controller status reports per second while busy')
+    parser.add_argument('-l', '--latency', type=float, default=0, help='controller report latency, in seconds')
+    parser.add_argument('-j', '--jitter', type=float, default=0, help='maximum added random report latency, in seconds')
+    parser.add_argument('-a', '--acceleration', type=float, default=1000, help='acceleration on all axes, in mm or dd/s^2')
+    parser.add_argument('--span', type=float, default=20, help='maximum x, y and z offset of poses from the start position, in mm')
+    parser.add_argument('--angle-span', type=float, default=.3, help='maximum pan and tilt offset of poses from the start position, in radians')
+    parser.add_argument('--shutter-ms', type=float, default=10, help='shutter press time, in milliseconds')
+    parser.add_argument('--stream-depth', type=int, default=0, help='commands queued per device while imaging; 0 waits for idle')
+    parser.add_argument('--queue-size', type=int, default=0, help='commands a mock device can hold before it error-locks; 0 is unbounded')
+    parser.add_argument('--per-device', action='store_true', help='queue commands per device instead of in lockstep')
+    parser.add_argument('--sync-shutters', action='store_true', help='with --per-device, devices in a pose set shoot together')
+    parser.add_argument('--max-lead', type=int, default=1, help='with --per-device, how many pose sets devices may drift apart')
+    parser.add_argument('--ports', type=int, default=1, help='serial ports to split the devices across, one mock controller each')
+    parser.add_argument('--log-serial', action='store_true', help='log serial tx and rx to the SysDB')
+    parser.add_argument('--serial-log', action='store_true', help='with --log-serial, log to a binary serial log instead')
+    parser.add_argument('--telemetry', action='store_true', help='spill position report history to disk')
+    parser.add_argument('--pty', action='store_true', help='serve the mock on a pseudo terminal and use serial.Serial')
+    parser.add_argument('--serial-backend', choices=('threads', 'asyncio'), default='threads',
+        help='serial I/O backend; asyncio only services pty ports, mock ports are read directly')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for poses and jitter')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds to wait for imaging to finish')
+    parser.add_argument('-o', '--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    # Keep stdout for the report.
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run(args)
+
+    report = json.dumps(result, indent=2)
+    print(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(report + '\n')
+
+    if not result['finished']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
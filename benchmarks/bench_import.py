@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Import time benchmark: cold start of the headless core and the GUI.
+
+Each entry point is imported in a fresh interpreter with -X importtime;
+the best of several runs is reported, with the slowest modules by self time.
+
+Run from the project root:
+    python -m benchmarks.bench_import [-r 5] [-t 10] [--json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+_ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Entry point name: module imported to start it.
+ENTRY_POINTS = {
+    'core': 'copis.core',
+    'cli': 'copis.cli',
+    'gui': 'copis.client'
+}
+
+# Modules the headless entry points must not pull in.
+_GUI_MODULES = ('wx', 'OpenGL', 'canon.EDSDKLib')
+
+
+def _parse_importtime(stderr: str) -> dict:
+    # Lines look like: 'import time:       self [us] |  cumulative | imported package'
+    modules = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return modules
+
+
+def measure(module: str) -> dict:
+    """Imports module in a fresh interpreter; returns its import profile."""
+    check = f'import sys; print(",".join(m for m in {_GUI_MODULES!r} if m in sys.modules))'
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}; {check}'],
+        cwd=_ROOT_PATH, capture_output=True, text=True, check=False)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()
+        return {'error': error[-1] if error else f'exit code {proc.returncode}'}
+
+    modules = _parse_importtime(proc.stderr)
+    loaded = proc.stdout.strip()
+
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': modules.get(module, (0, 0))[1] / 1000,
+        'module_count': len(modules),
+        'gui_modules': loaded.split(',') if loaded else [],
+        'modules': modules
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per entry point; best is reported')
+    parser.add_argument('-t', '--top', type=int, default=10, help='number of slowest modules to list')
+    parser.add_argument('--json', action='store_true', help='print a JSON report instead of a table')
+    args = parser.parse_args()
+
+    report = {}
+    for name, module in ENTRY_POINTS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        good = [r for r in runs if 'error' not in r]
+
+        if not good:
+            report[name] = {'module': module, 'error': runs[-1]['error']}
+            continue
+
+        best = min(good, key=lambda r: r['import_ms'])
+        slowest = sorted(best['modules'].items(), key=lambda i: i[1][0], reverse=True)[:args.top]
+
+        report[name] = {
+            'module': module,
+            'import_ms': round(best['import_ms'], 3),
+            'wall_ms': round(min(r['wall_ms'] for r in good), 3),
+            'module_count': best['module_count'],
+            'gui_modules': best['gui_modules'],
+            'slowest_ms': {m: round(t[0] / 1000, 3) for m, t in slowest}
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'best of {args.repeat}')
+    for name, entry in report.items():
+        if 'error' in entry:
+            print(f'{name:6} {entry["module"]:14} error: {entry["error"]}')
+            continue
+
+        gui_modules = ', '.join(entry['gui_modules']) or 'none'
+        print(f'{name:6} {entry["module"]:14} import: {entry["import_ms"]:9.3f}ms  '
+              f'process: {entry["wall_ms"]:9.3f}ms  modules: {entry["module_count"]:5}  '
+              f'gui modules: {gui_modules}')
+        for module, self_ms in entry['slowest_ms'].items():
+            print(f'{"":8}{self_ms:9.3f}ms  {module}')
+
+
+if __name__ == '__main__':
+    main()
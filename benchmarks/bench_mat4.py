@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Micro-benchmarks: scalar vs batch pose matrix and heading helpers.
+
+Run from the project root:
+    python -m benchmarks.bench_mat4 [-n 10000] [-r 5]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import glm
+from glm import vec3
+
+from copis.helpers import (get_heading, get_heading_batch, xyzpt_to_mat4,
+    xyzpt_to_mat4_batch)
+
+
+def _best_ms(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=10000, help='number of points')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='timing repetitions; best is reported')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack((rng.uniform(-500, 500, (args.count, 3)),
+        rng.uniform(-np.pi, np.pi, (args.count, 2))))
+    ends = rng.uniform(-500, 500, (args.count, 3))
+    point_list = points.tolist()
+    vec_pairs = [(vec3(*a), vec3(*b)) for a, b in zip(points[:, :3].tolist(), ends.tolist())]
+
+    scalar_mats = lambda: np.asarray(glm.array([xyzpt_to_mat4(*p) for p in point_list]))
+    batch_mats = lambda: xyzpt_to_mat4_batch(points)
+    scalar_headings = lambda: np.array([get_heading(a, b) for a, b in vec_pairs], dtype=np.float32)
+    batch_headings = lambda: get_heading_batch(points[:, :3], ends)
+
+    assert np.array_equal(scalar_mats(), batch_mats()), 'mat4 batch mismatch'
+    assert np.array_equal(scalar_headings(), batch_headings()), 'heading batch mismatch'
+
+    print(f'{args.count} points, best of {args.repeat}')
+    for name, scalar, batch in (
+            ('xyzpt_to_mat4', scalar_mats, batch_mats),
+            ('get_heading', scalar_headings, batch_headings)):
+        scalar_ms = _best_ms(scalar, args.repeat)
+        batch_ms = _best_ms(batch, args.repeat)
+        print(f'{name:16} scalar: {scalar_ms:9.3f}ms  batch: {batch_ms:9.3f}ms  '
+              f'speedup: {scalar_ms / batch_ms:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
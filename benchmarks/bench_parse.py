@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Micro-benchmark: controller response parsing, regex vs single pass.
+
+Parses recorded serial_rx blobs from a SysDB, or a synthetic stream of
+status reports like the mock controller's, and checks that every parser
+gives the same result.
+
+Run from the project root:
+    python -m benchmarks.bench_parse [--db copis.db] [-n 100000] [-r 5]
+"""
+
+import argparse
+import random
+import sqlite3
+import timeit
+
+from copis.coms.serial_controller import SerialController
+
+
+def _recorded_lines(db_path: str, limit: int) -> list:
+    db = sqlite3.connect(db_path)
+    try:
+        rows = db.execute('SELECT data FROM serial_rx ORDER BY id LIMIT ?;', (limit,)).fetchall()
+    finally:
+        db.close()
+
+    return [bytes(r[0]).decode(errors='replace') for r in rows]
+
+
+def _synthetic_lines(count: int, device_count: int, idle_ratio: float, seed: int) -> list:
+    # Moving devices report new positions; idle ones repeat their last report.
+    rng = random.Random(seed)
+    positions = [[0.0] * 5 for _ in range(device_count)]
+    lines = []
+
+    for _ in range(count):
+        device_id = rng.randrange(device_count)
+        pos = positions[device_id]
+        ssf = 0
+
+        if rng.random() >= idle_ratio:
+            for i in range(5):
+                pos[i] += rng.uniform(-5, 5) if i < 3 else rng.uniform(-.05, .05)
+            ssf = 96
+
+        x, y, z, p, t = pos
+        lines.append(f'<id:{device_id},ssf:{ssf},pos:{x:.3f},{y:.3f},{z:.3f},{p:.3f},{t:.3f}>\r\n')
+
+    return lines
+
+
+def _parse_all(parse, lines) -> list:
+    results = []
+    for line in lines:
+        try:
+            results.append(parse(line))
+        except ValueError as err:
+            results.append(type(err))
+    return results
+
+
+def _best_lines_per_s(func, line_count: int, repeat: int) -> float:
+    return line_count / min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help='SysDB to read recorded serial_rx blobs from; synthetic reports otherwise')
+    parser.add_argument('-n', '--count', type=int, default=100000, help='number of lines')
+    parser.add_argument('-d', '--devices', type=int, default=3, help='devices reporting, for synthetic reports')
+    parser.add_argument('--idle-ratio', type=float, default=.5, help='share of repeated idle reports, for synthetic reports')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='timing repetitions; best is reported')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for synthetic reports')
+    args = parser.parse_args()
+
+    if args.db:
+        lines = _recorded_lines(args.db, args.count)
+    else:
+        lines = _synthetic_lines(args.count, args.devices, args.idle_ratio, args.seed)
+
+    if not lines:
+        parser.error('no lines to parse')
+
+    regex = SerialController()
+    single_pass = SerialController()
+    single_pass._RESPONSE_CACHE_SIZE = 0
+    cached = SerialController()
+
+    def run_cached():
+        cached._response_cache.clear()
+        return _parse_all(cached._parse_response, lines)
+
+    expected = _parse_all(regex._parse_response_re, lines)
+    assert _parse_all(single_pass._parse_response, lines) == expected, 'single pass parse mismatch'
+    assert run_cached() == expected, 'cached parse mismatch'
+
+    source = args.db or f'synthetic, {args.devices} devices, {args.idle_ratio:.0%} idle'
+    print(f'{len(lines)} lines ({source}), best of {args.repeat}')
+
+    baseline = None
+    for name, func in (
+            ('regex', lambda: _parse_all(regex._parse_response_re, lines)),
+            ('single pass', lambda: _parse_all(single_pass._parse_response, lines)),
+            ('single pass, cached', run_cached)):
+        rate = _best_lines_per_s(func, len(lines), args.repeat)
+        baseline = baseline or rate
+        print(f'{name:20} {rate:12,.0f} lines/s  speedup: {rate / baseline:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -15,42 +15,129 @@
 
 """Console Output Class."""
 
+import logging
+import os
 import threading
-import time
 
-from pydispatch import dispatcher
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import List, Tuple
+
+from copis.helpers import dispatch_msg, get_notification_msg
+
+
+_MIRROR_LEVELS = {
+    'msg_error': logging.ERROR,
+    'msg_debug': logging.DEBUG
+}
 
-from copis.helpers import dispatch_msg
 
 class ConsoleOutput:
-    """Implement console output operations."""
+    """Implement console output operations.
 
-    def __init__(self, client):
+    Messages are queued in a bounded ring buffer; loggers never block on the
+    GUI. The console panel drains the buffer in batches on a timer. When full,
+    the oldest messages are dropped and counted.
+
+    Args:
+        client: The app; if None, messages are printed to standard output.
+        capacity: Optional; the maximum number of buffered messages.
+        mirror_path: Optional; a file to which every message is also written.
+        mirror_max_bytes: Optional; the size at which the mirror file is rotated.
+            0 disables rotation.
+        mirror_backup_count: Optional; the number of rotated mirror files to keep.
+    """
+
+    def __init__(self, client, capacity: int = 10000, mirror_path: str = None,
+                 mirror_max_bytes: int = 5 * 1024 * 1024, mirror_backup_count: int = 3):
         self._client = client
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._dropped_count = 0
+        self._mirror = None
+
+        if mirror_path:
+            self.set_mirror(mirror_path, mirror_max_bytes, mirror_backup_count)
+
+    @property
+    def dropped_count(self) -> int:
+        """Returns the number of messages dropped since the last drain."""
+        return self._dropped_count
+
+    @property
+    def pending_count(self) -> int:
+        """Returns the number of buffered messages."""
+        return len(self._buffer)
 
     def log(self, signal: str, msg: str) -> None:
-        """Dispatch a message to the console."""
-        client = self._client
-
-        if client:
-            if client.is_gui_loaded:
-                dispatcher.send(signal, message=msg)
-            else:
-                dispatch_thread = threading.Thread(
-                    target=self._dispatch_on_gui_loaded,
-                    name='console output thread',
-                    daemon=True,
-                    kwargs={
-                        "signal": signal,
-                        "message": msg
-                    })
-
-                dispatch_thread.start()
+        """Queue a message for the console."""
+        self._write_mirror(signal, msg)
+
+        if self._client:
+            self._append(signal, msg)
         else:
             dispatch_msg(None, signal, msg)
 
-    def _dispatch_on_gui_loaded(self, signal, message):
-        while not self._client.is_gui_loaded:
-            time.sleep(.001)
+    def write(self, line: str) -> None:
+        """Queue an already formatted line for the console."""
+        self._write_mirror(None, line)
+
+        if self._client:
+            self._append(None, line)
+        else:
+            print(line)
+
+    def drain(self, max_count: int = None) -> Tuple[List[Tuple[str, str]], int]:
+        """Removes and returns up to max_count buffered (signal, message) pairs,
+        oldest first; along with the number of messages dropped since the last drain.
+
+        The signal is None for lines queued via write."""
+        with self._lock:
+            count = len(self._buffer)
+
+            if max_count is not None:
+                count = min(count, max_count)
+
+            messages = [self._buffer.popleft() for _ in range(count)]
+            dropped, self._dropped_count = self._dropped_count, 0
+
+        return messages, dropped
+
+    def set_mirror(self, path: str, max_bytes: int = 5 * 1024 * 1024,
+                   backup_count: int = 3) -> None:
+        """Mirrors console messages to a log file, rotated once it reaches
+        max_bytes. Pass an empty path to stop mirroring."""
+        if self._mirror:
+            for handler in list(self._mirror.handlers):
+                self._mirror.removeHandler(handler)
+                handler.close()
+            self._mirror = None
+
+        if not path:
+            return
+
+        log_dir = os.path.dirname(path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        handler = RotatingFileHandler(path, maxBytes=max_bytes,
+            backupCount=backup_count if max_bytes else 0, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+        mirror = logging.getLogger(f'copis.console.{id(self)}')
+        mirror.setLevel(logging.DEBUG)
+        mirror.propagate = False
+        mirror.addHandler(handler)
+
+        self._mirror = mirror
+
+    def _write_mirror(self, signal: str, msg: str) -> None:
+        if self._mirror:
+            self._mirror.log(_MIRROR_LEVELS.get(signal, logging.INFO),
+                get_notification_msg(signal, msg) if signal else msg)
 
-        dispatcher.send(signal, message=message)
+    def _append(self, signal: str, msg: str) -> None:
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._dropped_count += 1
+            self._buffer.append((signal, msg))
@@ -16,11 +16,13 @@
 """COPIS classes package."""
 
 from .bounding_box import BoundingBox
-from .monitored_list import MonitoredList
+from .monitored_list import ListChange, ListChangeKind, ListDiff, MonitoredList
 from .device import Device
 from .action import Action
 from .pose import Pose
+from .path_stats import DevicePathStats, PathStatsAggregator
 from .serial_response import SerialResponse
+from .telemetry import PositionTrack, TelemetrySamples, TelemetryStore
 from .read_thread import ReadThread
 from .object3d import Object3D, CylinderObject3D, AABoxObject3D, OBJObject3D
 from .settings import ApplicationSettings, MachineSettings
@@ -28,4 +30,6 @@ from .settings import ApplicationSettings, MachineSettings
 __all__ = [
     "Device", "BoundingBox", "Object3D", "CylinderObject3D", "AABoxObject3D",
     "OBJObject3D", "Action", "SerialResponse", "ReadThread", "MonitoredList",
-    "ApplicationSettings", "MachineSettings", "Pose"]
+    "ListChange", "ListChangeKind", "ListDiff", "DevicePathStats", "PathStatsAggregator",
+    "ApplicationSettings", "MachineSettings", "Pose", "PositionTrack", "TelemetrySamples",
+    "TelemetryStore"]
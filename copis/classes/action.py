@@ -20,6 +20,9 @@ from typing import Any, List, Optional
 import json
 from copis.globals import ActionType
 
+# Attributes the serialized command depends on; see command_processor.serialize_command.
+_SERIALIZED_ATTRS = frozenset(('atype', 'device', 'args', '_raw'))
+
 @dataclass
 class Action(dict):
     """Data structure that implements a camera action."""
@@ -28,6 +31,14 @@ class Action(dict):
     argc: int = 0
     args: Optional[List[Any]] = None
 
+    # Cached serialized command; not a field, so it is neither compared nor stored.
+    _serialized = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in _SERIALIZED_ATTRS:
+            self.__dict__.pop('_serialized', None)
+
     def __post_init__(self):
         a_type = self.atype
         if isinstance(a_type, str):
@@ -43,7 +54,8 @@ class Action(dict):
         dict.__init__(self, a_dict)
 
     def update(self):
-        """Updates the action instance's dictionary store."""
+        """Updates the action instance's dictionary store; call it after editing args in place."""
+        self.__dict__.pop('_serialized', None)
         a_type = self.atype
         a_type_name = a_type.name
         a_dict = deepcopy(self.__dict__)
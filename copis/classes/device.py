@@ -45,6 +45,7 @@ class Device:
     gantry_dims: vec3 = vec3()
     gantry_orientation: int = 0
     edsdk_save_to_path: str = ''
+    serial_port: str = ''   # Serial port the device's controller is on; '' for the selected one.
     _serial_response: SerialResponse = None
     _is_homed: bool = False
     _is_writing_ser: bool = False   # How is this flag used?
@@ -15,64 +15,236 @@
 
 """Provide the COPIS MonitoredList Class."""
 
+from contextlib import contextmanager
+from enum import Enum
+from typing import List, NamedTuple
+
 from pydispatch import dispatcher
 
 
+class ListChangeKind(Enum):
+    """Kinds of change recorded by a MonitoredList."""
+    INSERTED = 'inserted'
+    REMOVED = 'removed'
+    MODIFIED = 'modified'
+    RESET = 'reset'
+
+
+class ListChange(NamedTuple):
+    """A contiguous change to a MonitoredList.
+
+    Start is relative to the list as it was when the change was made.
+    For RESET changes, start and count are 0 and the whole list is to be
+    considered new.
+    """
+    kind: ListChangeKind
+    start: int
+    count: int
+
+    @property
+    def stop(self) -> int:
+        """Returns the index past the end of the change."""
+        return self.start + self.count
+
+
+class ListDiff:
+    """The ordered changes made to a MonitoredList between two notifications.
+
+    Listeners can replay changes in order to update incrementally, or rebuild
+    from scratch if is_reset.
+    """
+
+    def __init__(self, changes: List[ListChange] = None) -> None:
+        self._changes: List[ListChange] = []
+
+        for change in changes or []:
+            self.add(change)
+
+    def __repr__(self) -> str:
+        return f'ListDiff({self._changes!r})'
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def __iter__(self):
+        return iter(self._changes)
+
+    @property
+    def changes(self) -> List[ListChange]:
+        """Returns the changes, in the order they were made."""
+        return self._changes
+
+    @property
+    def is_reset(self) -> bool:
+        """Returns whether the list needs to be treated as entirely new."""
+        return any(c.kind == ListChangeKind.RESET for c in self._changes)
+
+    @property
+    def inserted(self) -> List[range]:
+        """Returns the inserted index ranges."""
+        return self._ranges(ListChangeKind.INSERTED)
+
+    @property
+    def removed(self) -> List[range]:
+        """Returns the removed index ranges."""
+        return self._ranges(ListChangeKind.REMOVED)
+
+    @property
+    def modified(self) -> List[range]:
+        """Returns the modified index ranges."""
+        return self._ranges(ListChangeKind.MODIFIED)
+
+    def add(self, change: ListChange) -> None:
+        """Records a change; coalescing it with the previous one when contiguous."""
+        if change.kind == ListChangeKind.RESET:
+            # Nothing before a reset matters anymore.
+            self._changes = [change]
+            return
+
+        if change.count <= 0:
+            return
+
+        last = self._changes[-1] if self._changes else None
+
+        if last is not None and last.kind == change.kind:
+            merged = None
+
+            if change.kind == ListChangeKind.INSERTED and \
+                last.start <= change.start <= last.stop:
+                merged = ListChange(last.kind, last.start, last.count + change.count)
+            elif change.kind == ListChangeKind.REMOVED:
+                if change.start == last.start:
+                    merged = ListChange(last.kind, last.start, last.count + change.count)
+                elif change.stop == last.start:
+                    merged = ListChange(last.kind, change.start, last.count + change.count)
+            elif change.kind == ListChangeKind.MODIFIED and \
+                change.start <= last.stop and last.start <= change.stop:
+                start = min(last.start, change.start)
+                merged = ListChange(last.kind, start, max(last.stop, change.stop) - start)
+
+            if merged is not None:
+                self._changes[-1] = merged
+                return
+
+        self._changes.append(change)
+
+    def _ranges(self, kind: ListChangeKind) -> List[range]:
+        return [range(c.start, c.stop) for c in self._changes if c.kind == kind]
+
+
 class MonitoredList(list):
     """Data structure that implements a monitored list.
 
     Just a regular list, but sends notifications when changed or modified.
+    Each notification carries a ListDiff keyword argument describing the
+    change; use batch() to group several changes into one notification.
     """
     def __init__(self, signal: str, iterable=None) -> None:
         if iterable is None:
             iterable = []
         super().__init__(iterable)
         self.signal = signal
-        
+        self._pending = ListDiff()
+        self._batch_depth = 0
+
     def clear(self, dispatch=True) -> None:
         super().clear()
-        if dispatch:
-            self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.RESET, 0, 0), dispatch)
 
     def append(self, __object) -> None:
         super().append(__object)
-        self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.INSERTED, len(self) - 1, 1))
 
     def extend(self, __iterable) -> None:
+        start = len(self)
         super().extend(__iterable)
-        self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.INSERTED, start, len(self) - start))
 
-    def pop(self, __index: int):
+    def pop(self, __index: int = -1):
+        index = self._normalize_index(__index)
         value = super().pop(__index)
-        self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.REMOVED, index, 1))
         return value
 
     def insert(self, __index: int, __object) -> None:
+        index = min(max(__index + len(self) if __index < 0 else __index, 0), len(self))
         super().insert(__index, __object)
-        self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.INSERTED, index, 1))
 
     def remove(self, __value) -> None:
-        super().remove(__value)
-        self._dispatch()
+        index = self.index(__value)
+        super().pop(index)
+        self._dispatch(ListChange(ListChangeKind.REMOVED, index, 1))
 
     def reverse(self) -> None:
         super().reverse()
-        self._dispatch()
+        self._dispatch(ListChange(ListChangeKind.RESET, 0, 0))
 
     def __setitem__(self, key, value) -> None:
-        super().__setitem__(key, value)
-        self._dispatch()
+        if isinstance(key, slice):
+            super().__setitem__(key, value)
+            self._dispatch(ListChange(ListChangeKind.RESET, 0, 0))
+        else:
+            index = self._normalize_index(key)
+            super().__setitem__(key, value)
+            self._dispatch(ListChange(ListChangeKind.MODIFIED, index, 1))
 
     def __delitem__(self, key) -> None:
-        super().__delitem__(key)
-        self._dispatch()
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            super().__delitem__(key)
 
-    def _dispatch(self) -> None:
+            if step == 1:
+                self._dispatch(ListChange(ListChangeKind.REMOVED, start, max(0, stop - start)))
+            else:
+                self._dispatch(ListChange(ListChangeKind.RESET, 0, 0))
+        else:
+            index = self._normalize_index(key)
+            super().__delitem__(key)
+            self._dispatch(ListChange(ListChangeKind.REMOVED, index, 1))
+
+    @contextmanager
+    def batch(self):
+        """Defers notifications until the outermost batch exits.
+
+        Then sends a single notification carrying all changes made in between;
+        none is sent if nothing changed. Batches can be nested.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+
+            if self._batch_depth == 0 and len(self._pending):
+                self._flush()
+
+    def mark_modified(self, index: int, count: int = 1) -> None:
+        """Notifies that items were modified in place; e.g. a pose set's poses were edited."""
+        self._dispatch(ListChange(ListChangeKind.MODIFIED, self._normalize_index(index), count))
+
+    def _normalize_index(self, index: int) -> int:
+        return index + len(self) if index < 0 else index
+
+    def _dispatch(self, change: ListChange = None, send: bool = True) -> None:
         """This is necessary because unpickling a 'List' subclass calls 'extend' to populate the
         '__iterable' even before the object's instance attributes are set. This causes dispatching
         to fail while unpickling the object because 'signal' does not yet exist. But dispatching
         does not need to happen for an object being unpickled because it's just a monitored list
         being restored and not technically being actively changed. Besides, there is no need to
-        dispatch if there's no registered signal."""
-        if 'signal' in self.__dict__:
-            dispatcher.send(self.signal)
+        dispatch if there's no registered signal.
+
+        Without a change, the whole list is considered reset. With send False, the change is
+        recorded and goes out with the next notification."""
+        if 'signal' not in self.__dict__:
+            return
+
+        self._pending.add(change or ListChange(ListChangeKind.RESET, 0, 0))
+
+        if send and self._batch_depth == 0:
+            self._flush()
+
+    def _flush(self) -> None:
+        diff = self._pending
+        self._pending = ListDiff()
+        dispatcher.send(self.signal, diff=diff)
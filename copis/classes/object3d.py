@@ -19,14 +19,19 @@ Classes:
     AABoxObject3D, CylinderObject3D, OBJObject3D.
 """
 
+import os
 from abc import ABC, abstractmethod
 from math import inf
+from typing import List
 
-from glm import vec3, vec4, mat4, u32vec3
+from glm import vec3, vec4, mat4
 import glm
-import pywavefront
+import numpy as np
 
+from copis.helpers import hash_file_md5
 from copis.mathutils import orthonormal_basis_of
+from copis.meshutils import MeshData, build_lod_chain, select_lod, weld_vertices
+import copis.store as store
 from . import BoundingBox
 
 
@@ -127,29 +132,116 @@ class CylinderObject3D(Object3D):
 
 
 class OBJObject3D(Object3D):
-    """.obj object. TODO"""
+    """.obj object.
 
-    def __init__(self, filename: str, scale: vec3 = vec3(1.0)):
+    The full resolution mesh (vertices, normals, indices) is kept for
+    collision queries; rendering should go through lod() instead.
+
+    Parsed meshes are cached in a content addressed binary format keyed by the
+    source file's hash and the scale, and memory mapped on subsequent loads
+    instead of being re-parsed by pywavefront.
+    """
+
+    _CACHE_VERSION = 1
+    _CACHE_ARRAYS = ('vertices', 'normals', 'indices', 'bbox')
+
+    def __init__(self, filename: str, scale: vec3 = vec3(1.0), use_cache: bool = True):
         super().__init__()
         self._filename = filename
-        self._wavefront_vertices: glm.array
         self.scale = vec3(scale)
-        self.vertices: glm.array
-        self.normals: glm.array
-        self.indices: glm.array
-        self.obj = pywavefront.Wavefront(filename)
+        self.vertices: np.ndarray
+        self.normals: np.ndarray
+        self.indices: np.ndarray
+        self._obj = None
+        self._lods: List[MeshData] = None
+
+        cache_dir = None
+        arrays = None
+        if use_cache:
+            try:
+                cache_dir = self._get_cache_dir()
+                arrays = store.load_arrays(cache_dir, self._CACHE_ARRAYS)
+            except OSError:
+                cache_dir = None
+
+        if arrays is None:
+            mesh = self._parse()
+            bbox = np.array([mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)]) \
+                if len(mesh.vertices) > 0 else np.array([[inf] * 3, [-inf] * 3])
+            arrays = dict(zip(self._CACHE_ARRAYS, (*mesh, bbox.astype(np.float32))))
+            if cache_dir:
+                store.save_arrays(cache_dir, arrays)
+
+        self.vertices = arrays['vertices']
+        self.normals = arrays['normals']
+        self.indices = arrays['indices']
+        # create bbox
+        lower, upper = arrays['bbox'].tolist()
+        self._bbox = BoundingBox(vec3(*lower), vec3(*upper))
+
+    def _parse(self) -> MeshData:
+        """Parse the .obj file and weld its first mesh into an indexed mesh."""
+        positions = np.empty((0, 3), dtype=np.float32)
+        normals = np.empty((0, 3), dtype=np.float32)
         for _, material in self.obj.materials.items():
-            v = material.vertices
-            v = [v[i:i + 8] for i in range(0, len(v), 8)]
-            self.vertices = glm.array([vec3(chunk[5:8]) * scale for chunk in v])
-            self.normals = glm.array([vec3(chunk[2:5]) for chunk in v])
-            self.indices = glm.array([u32vec3(i*3, i*3+1, i*3+2) for i in range(len(self.vertices) // 3)])
+            # Interleaved [..., nx, ny, nz, vx, vy, vz] per vertex.
+            data = np.asarray(material.vertices, dtype=np.float32) \
+                .reshape(-1, material.vertex_size)
+            positions = data[:, -3:] * np.asarray(self.scale, dtype=np.float32)
+            normals = data[:, -6:-3]
             # only use first mesh
             break
-        # create bbox
-        self._bbox = BoundingBox(vec3(inf), vec3(-inf))
-        for v in self.vertices:
-            self._bbox.vec3_extend(v)
+        return weld_vertices(positions, normals)
+
+    def _get_cache_dir(self) -> str:
+        """Return the cache entry path for this file's content and scale.
+
+        The file hash is memoized against the file's size and modification
+        time so unchanged proxies aren't re-hashed on every load.
+        """
+        cache_root = store.get_cache_dir('proxies')
+        index_path = os.path.join(cache_root, 'index.json')
+        stat = os.stat(self._filename)
+        path_key = os.path.realpath(self._filename)
+        try:
+            index = store.load_json(index_path) if store.path_exists(index_path) else {}
+        except ValueError:
+            index = {}
+        entry = index.get(path_key)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            digest = entry['md5']
+        else:
+            digest = hash_file_md5(self._filename)
+            index[path_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'md5': digest}
+            store.save_json(index_path, index)
+
+        scale_key = '_'.join(f'{v:g}' for v in self.scale)
+        return os.path.join(cache_root, f'{digest}_{scale_key}_v{self._CACHE_VERSION}')
+
+    @property
+    def obj(self) -> 'pywavefront.Wavefront':
+        """Return the parsed pywavefront object; parsed on first access."""
+        if self._obj is None:
+            import pywavefront
+            self._obj = pywavefront.Wavefront(self._filename)
+        return self._obj
+
+    @property
+    def filename(self) -> str:
+        """Return the path of the source .obj file."""
+        return self._filename
+
+    @property
+    def lods(self) -> List[MeshData]:
+        """Return the cached level of detail chain, finest (full resolution) first."""
+        if self._lods is None:
+            self._lods = build_lod_chain(MeshData(self.vertices, self.normals, self.indices))
+        return self._lods
+
+    def lod(self, max_triangles: int) -> MeshData:
+        """Return the finest level of detail within the given triangle budget."""
+        return select_lod(self.lods, max_triangles)
 
     def vec3_intersect(self, v: vec3, epsilon: float) -> bool:
         return self._bbox.vec3_intersect(v, epsilon)
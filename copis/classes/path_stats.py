@@ -0,0 +1,227 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Provide the COPIS PathStatsAggregator Class."""
+
+import threading
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from glm import vec3
+from pydispatch import dispatcher
+
+from copis.globals import ActionType, F_STACK_ACTION_TYPES, SNAP_ACTION_TYPES
+from .monitored_list import ListChangeKind, ListDiff
+from .pose import Pose
+
+
+class DevicePathStats(NamedTuple):
+    """Path stats for one device. Lower and upper are None if no pose has a position."""
+    pose_count: int = 0
+    image_count: int = 0
+    lower: Optional[vec3] = None
+    upper: Optional[vec3] = None
+
+
+def _pose_device(pose: Pose) -> int:
+    return (pose.position or pose.payload[0]).device
+
+
+def _stack_image_count(args) -> int:
+    # A focus stack takes its step count (V) plus one images.
+    value = next((a[1] for a in args or [] if a[0] == 'V'), None)
+    return int(float(value)) + 1 if value else 1
+
+
+class PathStatsAggregator:
+    """Keeps per-device pose counts, image counts and position extents of a
+    pose set list, updated incrementally from the list's change diffs.
+
+    Args:
+        get_pose_sets: Returns the current pose set list.
+        snap_commands: Optional; action types that take one image.
+        f_stack_commands: Optional; action types that take a focus stack of images.
+        signal: Optional; the pose set list's change signal.
+    """
+
+    def __init__(self, get_pose_sets: Callable[[], List[List[Pose]]],
+                 snap_commands: Iterable[ActionType] = SNAP_ACTION_TYPES,
+                 f_stack_commands: Iterable[ActionType] = F_STACK_ACTION_TYPES,
+                 signal: str = 'ntf_a_list_changed') -> None:
+        self._get_pose_sets = get_pose_sets
+        self._snap_commands = frozenset(snap_commands)
+        self._f_stack_commands = frozenset(f_stack_commands)
+        self._lock = threading.RLock()
+
+        # Per set: {device_id: [pose_count, image_count, lower, upper]}; lower/upper as lists or None.
+        self._set_stats: List[Dict[int, list]] = []
+        self._totals: Dict[int, List[int]] = {}
+        self._extents: Dict[int, tuple] = {}
+        self._extents_stale = True
+        self._stale = True
+        self._list_id = None
+
+        dispatcher.connect(self._on_list_changed, signal=signal)
+
+    @property
+    def set_count(self) -> int:
+        """Returns the number of pose sets."""
+        with self._lock:
+            self._ensure_current()
+            return len(self._set_stats)
+
+    @property
+    def pose_count(self) -> int:
+        """Returns the total number of poses."""
+        with self._lock:
+            self._ensure_current()
+            return sum(t[0] for t in self._totals.values())
+
+    @property
+    def image_count(self) -> int:
+        """Returns the total number of images the path takes."""
+        with self._lock:
+            self._ensure_current()
+            return sum(t[1] for t in self._totals.values())
+
+    @property
+    def device_ids(self) -> List[int]:
+        """Returns the ids of the devices with poses in the path."""
+        with self._lock:
+            self._ensure_current()
+            return sorted(k for k, t in self._totals.items() if t[0])
+
+    def get_device_stats(self, device_id: int) -> DevicePathStats:
+        """Returns the path stats for a device."""
+        with self._lock:
+            self._ensure_current()
+            totals = self._totals.get(device_id)
+            if not totals or not totals[0]:
+                return DevicePathStats()
+            lower, upper = self._get_extents().get(device_id, (None, None))
+            return DevicePathStats(totals[0], totals[1],
+                vec3(lower) if lower else None, vec3(upper) if upper else None)
+
+    def get_stats(self) -> Dict[int, DevicePathStats]:
+        """Returns the path stats for all devices with poses, by device id."""
+        with self._lock:
+            return {d: self.get_device_stats(d) for d in self.device_ids}
+
+    def compute(self, poses: Iterable[Pose]) -> Dict[int, DevicePathStats]:
+        """Returns the path stats of an arbitrary list of poses, by device id;
+        without touching the aggregate."""
+        stats = self._get_set_stats(poses)
+        return {d: DevicePathStats(s[0], s[1],
+            vec3(s[2]) if s[2] else None, vec3(s[3]) if s[3] else None)
+            for d, s in sorted(stats.items())}
+
+    def invalidate(self) -> None:
+        """Forces a full recount on next query."""
+        with self._lock:
+            self._stale = True
+
+    def _on_list_changed(self, diff: ListDiff = None) -> None:
+        with self._lock:
+            if self._stale:
+                return
+            if diff is None or diff.is_reset or not self._apply_diff(diff):
+                self._stale = True
+
+    def _ensure_current(self) -> None:
+        sets = self._get_pose_sets() or []
+        if self._stale or id(sets) != self._list_id or len(sets) != len(self._set_stats):
+            self._recount(sets)
+
+    def _recount(self, sets) -> None:
+        self._set_stats = [self._get_set_stats(s) for s in sets]
+        self._totals = {}
+        for stats in self._set_stats:
+            self._add(stats, 1)
+        self._extents_stale = True
+        self._stale = False
+        self._list_id = id(sets)
+
+    def _apply_diff(self, diff: ListDiff) -> bool:
+        sets = self._get_pose_sets() or []
+        set_stats = self._set_stats
+        # Replay structural changes in order; entries to (re)compute from the final list are None.
+        for change in diff:
+            if change.kind == ListChangeKind.REMOVED:
+                for stats in set_stats[change.start:change.stop]:
+                    self._add(stats, -1)
+                del set_stats[change.start:change.stop]
+                self._extents_stale = True
+            elif change.kind == ListChangeKind.INSERTED:
+                set_stats[change.start:change.start] = [None] * change.count
+            elif change.kind == ListChangeKind.MODIFIED:
+                for index in range(change.start, min(change.stop, len(set_stats))):
+                    self._add(set_stats[index], -1)
+                    set_stats[index] = None
+                self._extents_stale = True
+
+        if len(set_stats) != len(sets):
+            return False
+
+        for index, stats in enumerate(set_stats):
+            if stats is None:
+                stats = set_stats[index] = self._get_set_stats(sets[index])
+                self._add(stats, 1)
+                if not self._extents_stale:
+                    self._grow_extents(stats)
+        return True
+
+    def _get_set_stats(self, poses: Iterable[Pose]) -> Dict[int, list]:
+        stats = {}
+        for pose in poses:
+            device_id = _pose_device(pose)
+            entry = stats.get(device_id)
+            if entry is None:
+                entry = stats[device_id] = [0, 0, None, None]
+            entry[0] += 1
+            for action in pose.get_actions():
+                if action.atype in self._snap_commands:
+                    entry[1] += 1
+                elif action.atype in self._f_stack_commands:
+                    entry[1] += _stack_image_count(action.args)
+            if pose.position and pose.position.args and len(pose.position.args) >= 3:
+                xyz = [float(a[1]) if isinstance(a, tuple) else a for a in pose.position.args[:3]]
+                entry[2] = list(map(min, entry[2], xyz)) if entry[2] else xyz
+                entry[3] = list(map(max, entry[3], xyz)) if entry[3] else xyz
+        return stats
+
+    def _add(self, stats: Dict[int, list], sign: int) -> None:
+        if not stats:
+            return
+        for device_id, entry in stats.items():
+            totals = self._totals.setdefault(device_id, [0, 0])
+            totals[0] += sign * entry[0]
+            totals[1] += sign * entry[1]
+
+    def _grow_extents(self, stats: Dict[int, list]) -> None:
+        for device_id, entry in stats.items():
+            if not entry[2]:
+                continue
+            lower, upper = self._extents.get(device_id, (None, None))
+            self._extents[device_id] = (
+                list(map(min, lower, entry[2])) if lower else entry[2],
+                list(map(max, upper, entry[3])) if upper else entry[3])
+
+    def _get_extents(self) -> Dict[int, tuple]:
+        if self._extents_stale:
+            self._extents = {}
+            for stats in self._set_stats:
+                self._grow_extents(stats)
+            self._extents_stale = False
+        return self._extents
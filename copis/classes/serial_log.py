@@ -0,0 +1,355 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Append-only binary log of serial traffic.
+
+The log file is a header followed by frames: a unix time, a direction (tx or
+rx), a length and the bytes sent or received. Frames are buffered in memory
+and written, then fsynced, by a background thread; logging a line is a pack
+and an append. A sidecar index (the log's filename plus '.idx') holds the
+time and offset of each written block, for time range queries.
+
+To use the logs with SQLite tooling, to_sys_db converts them into a system
+database's serial_tx and serial_rx tables:
+    python -m copis.classes.serial_log db serial.log copis.db
+"""
+
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from bisect import bisect_right
+from typing import Iterator, List, NamedTuple, Tuple
+
+
+_MAGIC = b'COPISSL1'
+_INDEX_MAGIC = b'COPISSI1'
+_FRAME = struct.Struct('<dBI')      # unix time, direction, data length.
+_INDEX_ENTRY = struct.Struct('<dQ') # unix time of a block's first frame, offset of the block.
+
+TX = 0
+RX = 1
+
+
+class SerialLogFrame(NamedTuple):
+    """A logged serial write or read."""
+    unix_time: float
+    direction: int
+    data: bytes
+
+
+def _index_filename(filename: str) -> str:
+    return filename + '.idx'
+
+
+def _scan(view, offset: int, end_offset: int) -> Iterator[Tuple[int, SerialLogFrame]]:
+    # Yields (offset after the frame, frame) for every complete frame; a torn one ends the scan.
+    while offset + _FRAME.size <= end_offset:
+        unix_time, direction, length = _FRAME.unpack_from(view, offset)
+        data_start = offset + _FRAME.size
+
+        if data_start + length > end_offset:
+            return
+
+        offset = data_start + length
+        yield offset, SerialLogFrame(unix_time, direction, bytes(view[data_start:offset]))
+
+
+def _read_index(filename: str) -> List[Tuple[float, int]]:
+    try:
+        with open(_index_filename(filename), 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+
+    if not data.startswith(_INDEX_MAGIC):
+        return []
+
+    body = memoryview(data)[len(_INDEX_MAGIC):]
+    body = body[:len(body) - len(body) % _INDEX_ENTRY.size]
+    return list(_INDEX_ENTRY.iter_unpack(body))
+
+
+class SerialLog():
+    """Logs serial traffic to an append-only binary file.
+
+    An existing log is appended to; a frame torn by a crash is dropped first.
+    """
+
+    _BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, filename: str, fsync_interval: float = 1.0) -> None:
+        self._filename = filename
+        self._fsync_interval = fsync_interval
+        self._buffer = bytearray()
+        self._buffer_start_time = None
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._is_open = True
+        self._frame_count = 0
+
+        log_dir = os.path.dirname(filename)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        self._offset = self._recover()
+        self._file = open(filename, 'ab')
+        self._index_file = open(_index_filename(filename), 'ab')
+
+        if self._offset == 0:
+            self._file.write(_MAGIC)
+            self._offset = len(_MAGIC)
+        if self._index_file.tell() == 0:
+            self._index_file.write(_INDEX_MAGIC)
+
+        self._flusher = threading.Thread(target=self._flush_periodically,
+            daemon=True, name='serial log thread')
+        self._flusher.start()
+
+    @property
+    def filename(self) -> str:
+        """Returns the file path of the log."""
+        return self._filename
+
+    @property
+    def is_open(self) -> bool:
+        """Returns True if the log can be written to."""
+        return self._is_open
+
+    @property
+    def frame_count(self) -> int:
+        """Returns the number of frames logged since the log was opened."""
+        return self._frame_count
+
+    def tx(self, data: bytes) -> None:
+        """Logs data written to the controller."""
+        self._append(TX, data)
+
+    def rx(self, data: bytes) -> None:
+        """Logs data read from the controller; empty reads are not logged."""
+        if data:
+            self._append(RX, data)
+
+    def flush(self) -> None:
+        """Writes buffered frames and fsyncs the log."""
+        self._write_buffer()
+
+    def close(self) -> None:
+        """Flushes and closes the log."""
+        with self._condition:
+            if not self._is_open:
+                return
+
+            self._is_open = False
+            self._condition.notify_all()
+
+        self._flusher.join()
+        self._write_buffer()
+        self._file.close()
+        self._index_file.close()
+
+    def _append(self, direction: int, data: bytes) -> None:
+        now = time.time()
+
+        with self._condition:
+            if not self._is_open:
+                return
+
+            if not self._buffer:
+                self._buffer_start_time = now
+
+            self._buffer += _FRAME.pack(now, direction, len(data))
+            self._buffer += data
+            self._frame_count += 1
+
+            if len(self._buffer) >= self._BUFFER_SIZE:
+                self._condition.notify_all()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            with self._condition:
+                if self._is_open:
+                    self._condition.wait(self._fsync_interval)
+                if not self._is_open:
+                    return
+
+            self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        # Loggers only wait for the buffer swap, not for the write and fsync.
+        with self._write_lock:
+            with self._condition:
+                if not self._buffer:
+                    return
+                block, block_start_time = self._buffer, self._buffer_start_time
+                self._buffer = bytearray()
+
+            self._file.write(block)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+            # The index entry is written after the block it points to.
+            self._index_file.write(_INDEX_ENTRY.pack(block_start_time, self._offset))
+            self._index_file.flush()
+
+            self._offset += len(block)
+
+    def _recover(self) -> int:
+        # Returns where the next frame goes; 0 for a new log.
+        try:
+            size = os.path.getsize(self._filename)
+        except FileNotFoundError:
+            size = 0
+
+        if size == 0:
+            if os.path.exists(_index_filename(self._filename)):
+                os.remove(_index_filename(self._filename))
+            return 0
+
+        with open(self._filename, 'rb') as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f'{self._filename} is not a serial log.')
+
+        entries = [e for e in _read_index(self._filename) if e[1] < size]
+        end_offset = entries[-1][1] if entries else len(_MAGIC)
+
+        with open(self._filename, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for end_offset, _ in _scan(view, end_offset, size):
+                pass
+
+        if end_offset < size:
+            os.truncate(self._filename, end_offset)
+
+        _write_index(self._filename, [e for e in entries if e[1] < end_offset])
+        return end_offset
+
+
+def _write_index(filename: str, entries: List[Tuple[float, int]]) -> None:
+    with open(_index_filename(filename), 'wb') as file:
+        file.write(_INDEX_MAGIC)
+        for entry in entries:
+            file.write(_INDEX_ENTRY.pack(*entry))
+
+
+def read_frames(filename: str, start: float = None, end: float = None) -> Iterator[SerialLogFrame]:
+    """Yields a log's frames, optionally only those logged from start to end unix time.
+
+    The index narrows where the scan starts; frames written after the last
+    indexed block are still found.
+    """
+    size = os.path.getsize(filename)
+    if size <= len(_MAGIC):
+        return
+
+    offset = len(_MAGIC)
+    if start is not None:
+        entries = _read_index(filename)
+        i = bisect_right([e[0] for e in entries], start) - 1
+        if i >= 0 and entries[i][1] < size:
+            offset = entries[i][1]
+
+    with open(filename, 'rb') as file, \
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        if view[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f'{filename} is not a serial log.')
+
+        for _, frame in _scan(view, offset, size):
+            if start is not None and frame.unix_time < start:
+                continue
+            if end is not None and frame.unix_time > end:
+                return
+            yield frame
+
+
+def build_index(filename: str, block_size: int = 64 * 1024) -> int:
+    """Rebuilds a log's index, with an entry every block_size bytes; returns the entry count."""
+    size = os.path.getsize(filename)
+    entries = []
+    block_start = len(_MAGIC)
+
+    with open(filename, 'rb') as file, \
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        if view[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f'{filename} is not a serial log.')
+
+        offset = block_start
+        for next_offset, frame in _scan(view, offset, size):
+            if not entries or offset - entries[-1][1] >= block_size:
+                entries.append((frame.unix_time, offset))
+            offset = next_offset
+
+    _write_index(filename, entries)
+    return len(entries)
+
+
+def to_sys_db(filename: str, db_filename: str, start: float = None, end: float = None) -> Tuple[int, int]:
+    """Inserts a log's frames into a system database's serial_tx and serial_rx tables;
+    returns the number of tx and rx rows inserted."""
+    # Imported here; the log itself does not need the database.
+    from copis.classes.sys_db import SysDB
+
+    if not SysDB(db_filename).is_initialized:
+        raise ValueError(f'Cannot open system database {db_filename}.')
+
+    rows = {TX: [], RX: []}
+    for frame in read_frames(filename, start, end):
+        rows[frame.direction].append((frame.data, frame.unix_time))
+
+    db = sqlite3.connect(db_filename)
+    try:
+        with db:
+            db.executemany('INSERT INTO serial_tx (data, unix_time) VALUES(?,?);', rows[TX])
+            db.executemany('INSERT INTO serial_rx (data, unix_time) VALUES(?,?);', rows[RX])
+    finally:
+        db.close()
+
+    return len(rows[TX]), len(rows[RX])
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Index, dump or convert a binary serial log.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = commands.add_parser('index', help='rebuild the time index')
+    index_parser.add_argument('log')
+
+    for name, help_text in (('dump', 'print frames'), ('db', 'insert frames into a system database')):
+        sub_parser = commands.add_parser(name, help=help_text)
+        sub_parser.add_argument('log')
+        if name == 'db':
+            sub_parser.add_argument('db')
+        sub_parser.add_argument('--start', type=float, help='first unix time to include')
+        sub_parser.add_argument('--end', type=float, help='last unix time to include')
+
+    args = parser.parse_args()
+
+    if args.command == 'index':
+        print(f'{build_index(args.log)} index entries')
+    elif args.command == 'dump':
+        for frame in read_frames(args.log, args.start, args.end):
+            print(f'{frame.unix_time:.6f} {"tx" if frame.direction == TX else "rx"} {frame.data!r}')
+    else:
+        tx_count, rx_count = to_sys_db(args.log, args.db, args.start, args.end)
+        print(f'{tx_count} serial_tx rows, {rx_count} serial_rx rows')
+
+
+if __name__ == '__main__':
+    main()
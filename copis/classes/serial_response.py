@@ -16,18 +16,35 @@
 """Provide the COPIS SerialResponse Class."""
 from typing import List
 
-from dataclasses import dataclass
-
 from copis.globals import Point5, SysStatFlags
 
 
-@dataclass
 class SerialResponse:
-    """Data structure that implements a parsed COPIS serial response."""
-    device_id: int = -1
-    system_status_number: int = -1
-    position: Point5 = Point5()
-    error: str = None
+    """Data structure that implements a parsed COPIS serial response.
+
+    Parsed responses may be shared between reads of the same line; treat them as read only.
+    """
+    __slots__ = ('device_id', 'system_status_number', 'position', 'error')
+
+    def __init__(self, device_id: int = -1, system_status_number: int = -1,
+                 position: Point5 = Point5(), error: str = None) -> None:
+        self.device_id = device_id
+        self.system_status_number = system_status_number
+        self.position = position
+        self.error = error
+
+    def __repr__(self) -> str:
+        return (f'{type(self).__name__}(device_id={self.device_id!r}, '
+            f'system_status_number={self.system_status_number!r}, '
+            f'position={self.position!r}, error={self.error!r})')
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.device_id, self.system_status_number, self.position, self.error) == \
+            (other.device_id, other.system_status_number, other.position, other.error)
+
+    __hash__ = None
 
     @property
     def is_idle(self) -> bool:
@@ -209,8 +209,9 @@ class SysDB():
         self._is_writing = False
         return row_id
 
-    def update_pose_output(self, device: Device, fname:str) -> int:
-        """Updates a picture taking action entry and returns the entry's id."""
+    def update_pose_output(self, device: Device, fname:str, hash_file: bool=True) -> int:
+        """Updates a picture taking action entry and returns the entry's id.
+        If hash_file is False, the image's MD5 is left for update_pose_output_md5."""
         if not self._is_initialized:
             return -1
 
@@ -236,8 +237,9 @@ class SysDB():
                 if r[1] is not None:
                     cur.close()
                     db.close()
+                    self._is_writing = False
                     return -3
-            h = hash_file_md5(fname)
+            h = hash_file_md5(fname) if hash_file else None
             s = f'UPDATE image_metadata SET {p1} = ?, {p2} = ? WHERE id =? and unix_time_end is null;'
             v = (fname,h, p_id)
             cur.execute(s, v)
@@ -248,6 +250,29 @@ class SysDB():
             return p_id
         return -2
 
+    def update_pose_output_md5(self, p_id: int, fname: str) -> int:
+        """Hashes an image recorded by update_pose_output and stores its MD5;
+        returns the entry's id."""
+        if not self._is_initialized:
+            return -1
+
+        h = hash_file_md5(fname)
+
+        while self._is_writing:
+            time.sleep(self._yield_timeout)
+
+        self._is_writing = True
+        db = sqlite3.connect(self._filename)
+        cur = db.cursor()
+        for p1, p2 in (('img1_fname', 'img1_md5'), ('img2_fname', 'img2_md5')):
+            s = f'UPDATE image_metadata SET {p2} = ? WHERE id = ? and {p1} = ?;'
+            cur.execute(s, (h, p_id, fname))
+        cur.close()
+        db.commit()
+        db.close()
+        self._is_writing = False
+        return p_id
+
     def end_pose(self, device: Device) -> int:
         """Records the end of a picture taking action and returns the entry's id."""
         if not self._is_initialized:
@@ -0,0 +1,398 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Provide the COPIS TelemetryStore Class.
+
+Keeps the history of each device's position reports: time, XYZPT and
+status flags, in columns. Recent reports are held in a ring buffer per
+device; with a spill directory, the oldest half of a full ring is written
+to a compressed chunk instead of being dropped, and chunks are read back
+for queries and replay. Chunks are written by a background thread; until
+then, they are queried from memory. A directory of chunks can be opened
+without the session that wrote it.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+import zipfile
+
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from copis.globals import Point5, SysStatFlags
+from .serial_response import SerialResponse
+
+
+_CHUNK_PATTERN = re.compile(r'^device_(\d+)_(\d+)\.npz$')
+# Raised by np.load for a chunk that is truncated or not a chunk at all.
+_CHUNK_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile)
+_MOTION_MASK = (1 << SysStatFlags.STA_MOTION_EXEC.value) | (1 << SysStatFlags.STA_HOMING.value)
+
+
+class TelemetrySamples(NamedTuple):
+    """A device's position reports, oldest first."""
+    times: np.ndarray       # Unix times; float64.
+    positions: np.ndarray   # (n, 5) x, y, z, p, t; float64.
+    status: np.ndarray      # System status flags; int32.
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def _empty_samples() -> TelemetrySamples:
+    return TelemetrySamples(np.empty(0), np.empty((0, 5)), np.empty(0, dtype=np.int32))
+
+
+def _concat_samples(parts: List[TelemetrySamples]) -> TelemetrySamples:
+    if not parts:
+        return _empty_samples()
+    if len(parts) == 1:
+        return parts[0]
+    return TelemetrySamples(*(np.concatenate(c) for c in zip(*parts)))
+
+
+def _slice_samples(samples: TelemetrySamples, start: float, end: float) -> TelemetrySamples:
+    lo = 0 if start is None else np.searchsorted(samples.times, start, 'left')
+    hi = len(samples) if end is None else np.searchsorted(samples.times, end, 'right')
+    return TelemetrySamples(*(c[lo:hi] for c in samples))
+
+
+class _Chunk(NamedTuple):
+    start_time: float
+    end_time: float
+    path: str
+
+
+class _ChunkWriter:
+    """Writes spilled chunks on a background thread; it stops when idle."""
+
+    _IDLE_TIMEOUT = 1.0
+
+    def __init__(self) -> None:
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, write: Callable[[], None]) -> None:
+        """Queues a chunk write."""
+        with self._lock:
+            self._jobs.put(write)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                    name='telemetry writer thread')
+                self._thread.start()
+
+    def join(self) -> None:
+        """Waits for queued writes to finish."""
+        self._jobs.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                write = self._jobs.get(timeout=self._IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._lock:
+                    if self._jobs.empty():
+                        self._thread = None
+                        return
+                continue
+
+            try:
+                write()
+            except Exception:
+                # The chunk stays in memory; later chunks are still written.
+                pass
+            finally:
+                self._jobs.task_done()
+
+
+class PositionTrack:
+    """Position reports of one device: a ring buffer, spilled to chunks if a directory is given.
+
+    Reports that repeat the previous one are not stored; a device holds its
+    last sample's state until the next one.
+    """
+
+    def __init__(self, device_id: int, capacity: int = 4096, spill_dir: str = None,
+                 writer: _ChunkWriter = None) -> None:
+        self.device_id = device_id
+        self._capacity = max(capacity, 2)
+        self._spill_dir = spill_dir
+        self._writer = writer or _ChunkWriter()
+        self._lock = threading.Lock()
+
+        self._times = np.empty(self._capacity)
+        self._positions = np.empty((self._capacity, 5))
+        self._status = np.empty(self._capacity, dtype=np.int32)
+        self._start = 0
+        self._count = 0
+        self._last = None
+
+        self._chunks: List[_Chunk] = []
+        self._unwritten: Dict[str, TelemetrySamples] = {}
+        self._next_chunk_index = 0
+        self.dropped_count = 0
+
+    @property
+    def chunk_count(self) -> int:
+        """Returns the number of chunks spilled to disk."""
+        return len(self._chunks)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def append(self, unix_time: float, position: Point5, status: int) -> bool:
+        """Records a report; returns False if it repeats the previous one."""
+        sample = (*position, status)
+
+        with self._lock:
+            if sample == self._last:
+                return False
+            self._last = sample
+
+            if self._count == self._capacity:
+                if self._spill_dir:
+                    self._spill(self._capacity // 2)
+                else:
+                    self._start = (self._start + 1) % self._capacity
+                    self._count -= 1
+                    self.dropped_count += 1
+
+            i = (self._start + self._count) % self._capacity
+            self._times[i] = unix_time
+            self._positions[i] = position
+            self._status[i] = status
+            self._count += 1
+
+        return True
+
+    def flush(self) -> None:
+        """Spills everything buffered to a chunk, if there is a spill directory,
+        and waits for chunks to be written."""
+        with self._lock:
+            if self._spill_dir and self._count:
+                self._spill(self._count)
+
+        self._writer.join()
+
+    def query(self, start: float = None, end: float = None) -> TelemetrySamples:
+        """Returns the reports from start to end unix time, both optional and inclusive."""
+        with self._lock:
+            chunks = [c for c in self._chunks
+                if (start is None or c.end_time >= start) and (end is None or c.start_time <= end)]
+            unwritten = {c.path: self._unwritten[c.path] for c in chunks if c.path in self._unwritten}
+            buffered = self._buffered()
+
+        parts = [unwritten[c.path] if c.path in unwritten else _load_chunk(c.path) for c in chunks]
+        parts.append(buffered)
+        return _slice_samples(_concat_samples(parts), start, end)
+
+    def move_durations(self, start: float = None, end: float = None) -> np.ndarray:
+        """Returns how long each move from start to end unix time took, in seconds.
+
+        A move lasts from the first report with motion or homing flags to the
+        next report without; its precision is the report interval.
+        """
+        samples = self.query(start, end)
+        moving = (samples.status >= 0) & ((samples.status & _MOTION_MASK) != 0)
+
+        edges = np.diff(moving.astype(np.int8))
+        starts = np.flatnonzero(edges == 1) + 1
+        ends = np.flatnonzero(edges == -1) + 1
+
+        if moving.size and moving[0]:
+            starts = np.insert(starts, 0, 0)
+        starts = starts[:len(ends)]
+
+        return samples.times[ends] - samples.times[starts]
+
+    def add_chunk(self, path: str) -> None:
+        """Adds a chunk written by an earlier session.
+
+        A chunk that can't be read raises; its number is still not reused.
+        """
+        match = _CHUNK_PATTERN.match(os.path.basename(path))
+        if match:
+            with self._lock:
+                self._next_chunk_index = max(self._next_chunk_index, int(match.group(2)) + 1)
+
+        times = _load_chunk(path, times_only=True)
+        if not times.size:
+            return
+
+        with self._lock:
+            self._chunks.append(_Chunk(float(times[0]), float(times[-1]), path))
+            self._chunks.sort(key=lambda c: c.start_time)
+
+    def _buffered(self) -> TelemetrySamples:
+        # Called with the lock held; returns copies, oldest first.
+        order = (self._start + np.arange(self._count)) % self._capacity
+        return TelemetrySamples(self._times[order], self._positions[order], self._status[order])
+
+    def _spill(self, count: int) -> None:
+        # Called with the lock held; moves the oldest count reports to a new chunk.
+        # Recording only waits for the copy; the chunk is written off the lock.
+        order = (self._start + np.arange(count)) % self._capacity
+        path = os.path.join(self._spill_dir, f'device_{self.device_id}_{self._next_chunk_index:06d}.npz')
+        samples = TelemetrySamples(self._times[order], self._positions[order], self._status[order])
+
+        self._chunks.append(_Chunk(float(samples.times[0]), float(samples.times[-1]), path))
+        self._unwritten[path] = samples
+        self._next_chunk_index += 1
+        self._start = (self._start + count) % self._capacity
+        self._count -= count
+
+        self._writer.put(lambda: self._write_chunk(path, samples))
+
+    def _write_chunk(self, path: str, samples: TelemetrySamples) -> None:
+        # Written aside and moved into place, so a chunk is never seen half written.
+        os.makedirs(self._spill_dir, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez_compressed(file, times=samples.times, positions=samples.positions,
+                status=samples.status)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            del self._unwritten[path]
+
+
+def _load_chunk(path: str, times_only: bool = False):
+    with np.load(path) as data:
+        if times_only:
+            return data['times']
+        return TelemetrySamples(data['times'], data['positions'], data['status'])
+
+
+class TelemetryStore:
+    """Keeps every device's position reports, for queries and replay.
+
+    Args:
+        capacity: Optional; reports kept in memory per device.
+        spill_dir: Optional; directory full buffers are spilled to. Without
+            one, the oldest reports are dropped. To add to a directory that
+            has chunks already, use open.
+    """
+
+    def __init__(self, capacity: int = 4096, spill_dir: str = None) -> None:
+        self._capacity = capacity
+        self._spill_dir = spill_dir
+        self._tracks: Dict[int, PositionTrack] = {}
+        self._writer = _ChunkWriter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, directory: str, capacity: int = 4096,
+             on_bad_chunk: Callable[[str, Exception], None] = None) -> 'TelemetryStore':
+        """Opens the chunks in a spill directory; new reports are spilled there too.
+
+        Chunks that can't be read, like one cut short by a crash, are skipped;
+        on_bad_chunk, if given, is called with the path and the error.
+        """
+        store = cls(capacity, directory)
+
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            match = _CHUNK_PATTERN.match(name)
+            if match:
+                path = os.path.join(directory, name)
+                try:
+                    store.get_track(int(match.group(1))).add_chunk(path)
+                except _CHUNK_ERRORS as err:
+                    if on_bad_chunk:
+                        on_bad_chunk(path, err)
+
+        return store
+
+    @property
+    def device_ids(self) -> List[int]:
+        """Returns the ids of the devices with a track."""
+        with self._lock:
+            return sorted(self._tracks)
+
+    def get_track(self, device_id: int) -> PositionTrack:
+        """Returns a device's track; one is created if needed."""
+        track = self._tracks.get(device_id)
+        if track is None:
+            with self._lock:
+                track = self._tracks.setdefault(device_id,
+                    PositionTrack(device_id, self._capacity, self._spill_dir, self._writer))
+        return track
+
+    def record(self, response: SerialResponse, unix_time: float = None) -> bool:
+        """Records a device's report; returns False if it is not stored."""
+        if response.device_id < 0:
+            return False
+
+        return self.get_track(response.device_id).append(
+            time.time() if unix_time is None else unix_time,
+            response.position, response.system_status_number)
+
+    def flush(self) -> None:
+        """Spills every device's buffered reports, if there is a spill directory,
+        and waits for chunks to be written."""
+        for device_id in self.device_ids:
+            self._tracks[device_id].flush()
+
+    def query(self, device_id: int, start: float = None, end: float = None) -> TelemetrySamples:
+        """Returns a device's reports from start to end unix time, both optional and inclusive."""
+        track = self._tracks.get(device_id)
+        return track.query(start, end) if track is not None else _empty_samples()
+
+    def move_durations(self, device_id: int, start: float = None, end: float = None) -> np.ndarray:
+        """Returns how long each of a device's moves from start to end unix time took, in seconds."""
+        track = self._tracks.get(device_id)
+        return track.move_durations(start, end) if track is not None else np.empty(0)
+
+    def replay(self, start: float = None, end: float = None, device_ids: Iterable[int] = None,
+               speed: float = 0) -> Iterator[Tuple[float, SerialResponse]]:
+        """Yields (unix time, report) for every device's reports, in time order.
+
+        Args:
+            start: Optional; first unix time to replay.
+            end: Optional; last unix time to replay.
+            device_ids: Optional; devices to replay; all by default.
+            speed: Optional; paces replay at this multiple of real time. 0 does not wait.
+        """
+        ids = self.device_ids if device_ids is None else list(device_ids)
+        parts = [(device_id, self.query(device_id, start, end)) for device_id in ids]
+        parts = [p for p in parts if len(p[1])]
+
+        if not parts:
+            return
+
+        times = np.concatenate([s.times for _, s in parts])
+        positions = np.concatenate([s.positions for _, s in parts])
+        status = np.concatenate([s.status for _, s in parts])
+        devices = np.concatenate([np.full(len(s), i, dtype=np.int32) for i, s in parts])
+        order = np.argsort(times, kind='stable')
+
+        first_time = times[order[0]]
+        replay_start = time.monotonic()
+
+        for i in order:
+            if speed > 0:
+                delay = (times[i] - first_time) / speed - (time.monotonic() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            x, y, z, p, t = positions[i].tolist()
+            yield float(times[i]), SerialResponse(int(devices[i]), int(status[i]),
+                Point5(x, y, z, p, t), None)
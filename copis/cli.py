@@ -0,0 +1,264 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Headless COPIS imaging runner (copis-run).
+
+Opens a project, connects to the machine, optionally homes it and images
+a range of pose sets; without the GUI. Progress is written to stdout as
+JSON lines, one event per line. The exit status is 0 if every pose set was
+imaged, 1 if the run failed and 130 if it was interrupted.
+
+Run from the project root:
+    python copis_run.py -p project.copis --port COM3 [--home] [--start 0 --end 9]
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+
+from typing import Any, TextIO
+
+from pydispatch import dispatcher
+
+from copis.coms import serial_controller
+from copis.config import Config
+from copis.core import COPISCore
+from copis.globals import ComStatus
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+class HeadlessClient:
+    """Stands in for the GUI application when running the core without it.
+
+    Args:
+        config: The application configuration.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.core = None
+
+
+class JsonLinesReporter:
+    """Writes events as JSON lines; safe to call from any thread.
+
+    Args:
+        stream: Where to write events.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Writes an event, with the seconds since the reporter was created."""
+        record = {'event': event, 'elapsed': round(time.monotonic() - self._start, 3)}
+        record.update(fields)
+        line = json.dumps(record, default=str)
+
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+
+class _RunFailed(Exception):
+    """Stops a run; its message is reported."""
+
+
+def _wait_for(predicate, timeout: float, on_tick=None) -> bool:
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while not predicate():
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        if on_tick:
+            on_tick()
+        time.sleep(.05)
+
+    return True
+
+
+def _forward_console(core: COPISCore, reporter: JsonLinesReporter, verbose: bool) -> None:
+    messages, dropped = core.console.drain()
+
+    for signal, msg in messages:
+        level = signal[len('msg_'):] if signal else 'raw'
+        if verbose or level == 'error':
+            reporter.emit('message', level=level, text=msg)
+
+    if dropped and verbose:
+        reporter.emit('message', level='warning', text=f'{dropped} console messages dropped')
+
+
+def _has_device_error(core: COPISCore) -> bool:
+    return any(d.serial_status == ComStatus.ERROR for d in core.project.devices)
+
+
+def _run(args, core: COPISCore, reporter: JsonLinesReporter) -> int:
+    tick = lambda: _forward_console(core, reporter, args.verbose)
+    is_work_done = lambda: core._working_thread is None and core.is_machine_idle
+
+    if args.project:
+        resp = core.open_project(args.project)
+        if resp:
+            reporter.emit('message', level='warning', text=resp)
+
+    pose_sets = core.project.pose_sets
+    if not pose_sets:
+        raise _RunFailed('The project has no pose sets.')
+
+    start_index = args.start if args.start is not None else 0
+    end_index = args.end if args.end is not None else len(pose_sets) - 1
+    if not 0 <= start_index <= end_index < len(pose_sets):
+        raise _RunFailed(f'Invalid pose set range {start_index}-{end_index}; '
+            f'the project has {len(pose_sets)} pose sets.')
+
+    reporter.emit('project', path=args.project, pose_set_count=len(pose_sets),
+        pose_count=sum(len(s) for s in pose_sets), device_count=len(core.project.devices))
+
+    if args.port not in [p.name for p in core.serial_port_list]:
+        serial_controller.add_port(args.port)
+
+    if not core.select_serial_port(args.port) or not core.connect_serial(args.baud):
+        raise _RunFailed(f'Unable to connect to {args.port}.')
+
+    reporter.emit('connected', port=args.port, baud=args.baud)
+
+    if not _wait_for(lambda: core.is_machine_idle and not core._is_new_connection,
+            args.ready_timeout, tick):
+        raise _RunFailed(f'The machine did not report ready within {args.ready_timeout}s '
+            f'(status: {core.machine_status}).')
+
+    reporter.emit('ready', status=core.machine_status)
+
+    if args.home:
+        if not core.start_homing():
+            raise _RunFailed('Homing did not start.')
+
+        reporter.emit('homing')
+        if not _wait_for(is_work_done, args.timeout, tick):
+            core.stop_work()
+            raise _RunFailed(f'Homing did not finish within {args.timeout}s.')
+
+        if _has_device_error(core) or not core.is_machine_homed:
+            raise _RunFailed(f'Homing failed (status: {core.machine_status}).')
+
+        reporter.emit('homed')
+
+    # Shutters may go through EDSDK; it must be initialized here, not on the imaging thread.
+    core.init_edsdk()
+
+    imaged_sets = []
+    total = end_index - start_index + 1
+
+    def on_imaged_list_changed():
+        # The core clears its list when imaging ends; sets are remembered here.
+        for set_index in list(core.imaged_pose_sets):
+            if start_index <= set_index <= end_index and set_index not in imaged_sets:
+                imaged_sets.append(set_index)
+                reporter.emit('pose_set', index=set_index, done=len(imaged_sets), total=total)
+
+    dispatcher.connect(on_imaged_list_changed, signal='ntf_i_list_changed')
+
+    try:
+        if not core.start_imaging(start_index, end_index):
+            raise _RunFailed('Imaging did not start.')
+
+        reporter.emit('imaging', start=start_index, end=end_index, pose_set_count=total)
+
+        if not _wait_for(is_work_done, args.timeout, tick):
+            core.stop_work()
+            raise _RunFailed(f'Imaging did not finish within {args.timeout}s.')
+    finally:
+        dispatcher.disconnect(on_imaged_list_changed, signal='ntf_i_list_changed')
+
+    tick()
+
+    if _has_device_error(core) or len(imaged_sets) < total:
+        raise _RunFailed(f'Imaging stopped after {len(imaged_sets)} of {total} pose sets '
+            f'(status: {core.machine_status}).')
+
+    reporter.emit('imaged', pose_set_count=len(imaged_sets))
+    return EXIT_OK
+
+
+def main(argv=None) -> int:
+    """Runs copis-run; returns the exit status."""
+    parser = argparse.ArgumentParser(prog='copis-run', description=__doc__.splitlines()[0])
+    parser.add_argument('-p', '--project', help='project file to image; the empty project otherwise')
+    parser.add_argument('-c', '--config', help='configuration (ini) file; the default one otherwise')
+    parser.add_argument('--profile', help='machine profile; the configured one otherwise')
+    parser.add_argument('--port', required=True, help="serial port name; 'TEST' for the mock controller")
+    parser.add_argument('--baud', type=int, default=serial_controller.BAUDS[-1], help='serial baud rate')
+    parser.add_argument('--home', action='store_true', help='home the machine before imaging')
+    parser.add_argument('--start', type=int, help='index of the first pose set to image')
+    parser.add_argument('--end', type=int, help='index of the last pose set to image; inclusive')
+    parser.add_argument('--use-project-profile', action='store_true',
+        help="use the project's machine profile if it differs from the configured one")
+    parser.add_argument('--ready-timeout', type=float, default=30,
+        help='seconds to wait for the machine to report after connecting')
+    parser.add_argument('--timeout', type=float, help='seconds to wait for homing or imaging to finish')
+    parser.add_argument('-v', '--verbose', action='store_true', help='report all console messages, not just errors')
+    args = parser.parse_args(argv)
+
+    reporter = JsonLinesReporter(sys.stdout)
+    status = EXIT_FAILED
+    core = None
+
+    # Keep stdout for events; the core and SysDB print status lines.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            config = Config(args.config)
+            if args.profile:
+                config.profile_path = args.profile
+
+            client = HeadlessClient(config)
+            core = COPISCore(client)
+            client.core = core
+            core.project.set_prompt_handlers(
+                confirm=lambda msg, caption: args.use_project_profile,
+                notify=lambda msg: reporter.emit('message', level='warning', text=msg))
+
+            reporter.emit('start', config=config.ini_path, profile=config.profile_path,
+                project=args.project, port=args.port)
+            status = _run(args, core, reporter)
+        except _RunFailed as err:
+            reporter.emit('error', text=str(err))
+        except KeyboardInterrupt:
+            status = EXIT_INTERRUPTED
+            reporter.emit('interrupted')
+            if core is not None:
+                core.stop_work()
+        except Exception as err:
+            reporter.emit('error', text=f'{type(err).__name__}: {err}')
+        finally:
+            if core is not None:
+                _forward_console(core, reporter, args.verbose)
+                if core.is_serial_port_connected:
+                    core.disconnect_serial()
+                core.terminate_edsdk()
+                core.terminate_serial()
+                core.close_serial_log()
+
+    reporter.emit('done', status=status)
+    return status
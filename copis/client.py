@@ -23,6 +23,7 @@ import wx.lib.inspection
 from .config import Config
 from .core import COPISCore
 from .gui.main_frame import MainWindow
+from .gui.wxutils import show_msg_dialog, show_prompt_dialog
 
 import copis.store as store
 
@@ -41,6 +42,10 @@ class COPISApp(wx.App):
         #self.config = Config(display_rect)
         self.config = Config()
         self.core = COPISCore(self)
+        self.core.init_edsdk()
+        self.core.project.set_prompt_handlers(
+            confirm=lambda msg, caption: show_prompt_dialog(msg, caption) == wx.ID_YES,
+            notify=show_msg_dialog)
         self.AppName = 'COPIS Interface'
         dimensions_list = self._parse_chamber_dimensions()
         x, y, width, height, is_maximized = self.config.application_settings.window_state
@@ -81,6 +81,42 @@ def collision_eval_cam2cam_start() -> List[dict]:
     return collisions
 
 
+def collision_eval_cam2cam_lead(start_idx: int, end_idx: int, max_lead: int) -> List[dict]:
+    """Returns pairs of camera moves into different pose sets, at most max_lead apart, whose paths collide.
+       Moves into the same pose set are checked by collision_eval_cam2cam_path. For each pair, ps_idx
+       is the later pose set: both cameras must be done with the sets before it before either moves into it.
+    """
+    collisions = []
+    proj = Project()
+    if proj._is_initialized and max_lead > 0:
+        end_idx = min(end_idx, len(proj.pose_sets) - 1)
+        moves = {}
+        for device in proj.devices:
+            for i in range(start_idx, end_idx + 1):
+                end = proj.pose_by_dev_id(i, device.device_id)
+                if end != None:
+                    start = proj.last_pose_by_dev_id(i - 1, device.device_id) if i > start_idx else None
+                    start_pos = start.position_as_vec3 if start != None else vec3(device.position.x, device.position.y, device.position.z)
+                    end_pos = end.position_as_vec3
+                    moves[(device.device_id, i)] = (start_pos, end_pos, swept_bounds(device, start_pos, end_pos))
+        for k in range(0, len(proj.devices)):
+            a = proj.devices[k]
+            for j in range(k+1, len(proj.devices)):
+                b = proj.devices[j]
+                for i in range(start_idx, end_idx + 1):
+                    if (a.device_id, i) not in moves:
+                        continue
+                    a_start, a_end, a_bounds = moves[(a.device_id, i)]
+                    for n in range(max(start_idx, i - max_lead), min(end_idx, i + max_lead) + 1):
+                        if n == i or (b.device_id, n) not in moves:
+                            continue
+                        b_start, b_end, b_bounds = moves[(b.device_id, n)]
+                        if is_collision_between_aab(a_bounds, b_bounds) and \
+                            is_collision_between_moving_cams(a, a_start, a_end, b, b_start, b_end):
+                            collisions.append({'ps_idx': max(i, n), 'cams': (a.device_id, b.device_id)})
+    return collisions
+
+
 class sphere(object):
     def __init__(self, p:vec3, r: float):
         self.p = p
@@ -269,9 +305,20 @@ def cam_bounds_along_line(device : Device, start_pos: vec3, end_pos: vec3, incre
         results.append(cam_bounds(device, p))
     return results
 
+def swept_bounds(device: Device, start_pos: vec3, end_pos: vec3) -> aab:
+    """Returns an axis aligned box around everything a camera's bounds cover moving between two positions."""
+    lower, upper = None, None
+    for pos in (start_pos, end_pos):
+        cb = cam_bounds(device, pos)
+        for l, u in ((cb.head.p - cb.head.r, cb.head.p + cb.head.r), (cb.body.lower, cb.body.upper), (cb.gantry.lower, cb.gantry.upper)):
+            l, u = glm.min(l, u), glm.max(l, u)
+            lower = l if lower is None else glm.min(lower, l)
+            upper = u if upper is None else glm.max(upper, u)
+    return aab(lower, upper)
+
 def is_collision_between_moving_cams(cam1: Device, cam1_start_pos: vec3, cam1_end_pos: vec3, cam2: Device, cam2_start_pos: vec3, cam2_end_pos: vec3):
     cb_list1 = cam_bounds_along_line(cam1, cam1_start_pos, cam1_end_pos, 5)
-    cb_list2 = cam_bounds_along_line(cam1, cam2_start_pos, cam2_end_pos, 5)
+    cb_list2 = cam_bounds_along_line(cam2, cam2_start_pos, cam2_end_pos, 5)
     for cb1 in cb_list1:
         for cb2 in cb_list2:
             if (is_collision_between_cam_bounds(cb1,cb2)):
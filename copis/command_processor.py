@@ -20,6 +20,7 @@ from pickle import TRUE
 import re
 
 from itertools import chain
+from typing import Iterable, List
 
 from .classes.action import Action
 from .globals import ActionType
@@ -46,7 +47,32 @@ def deserialize_command(cmd: str) -> Action:
     return Action(atype, device_id, len(args), args)
 
 def serialize_command(action: Action) -> str:
-    """Serialize an Action object into a string."""
+    """Serialize an Action object into a string.
+
+    The result is cached on the action until it is updated or its type, device or args are set.
+    """
+    serialized = action._serialized
+    if serialized is None:
+        serialized = _serialize_command(action)
+        action._serialized = serialized
+    return serialized
+
+
+def serialize_commands(actions: Iterable[Action]) -> int:
+    """Serializes actions ahead of sending them; returns how many were serialized."""
+    count = 0
+    for action in actions:
+        serialize_command(action)
+        count += 1
+    return count
+
+
+def encode_commands(actions: List[Action]) -> bytes:
+    """Encodes actions as one serial write: their commands, each terminated by a carriage return."""
+    return ''.join(f'{serialize_command(a)}\r' for a in actions).encode()
+
+
+def _serialize_command(action: Action) -> str:
     get_g_code = lambda input: str(input).split('.')[1]
 
     g_code = get_g_code(action.atype)
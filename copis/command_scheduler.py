@@ -0,0 +1,204 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Command scheduler: per-device queues with sync barriers.
+
+Work is a sequence of phases. A packet is a phase of its own: it is sent whole,
+once everything before it has been sent and the machine is clear. Between
+packets, steps are queued per device; each device takes its next step as soon
+as it is ready, independently of the others, except where a barrier makes the
+devices it names wait for each other.
+"""
+
+import threading
+
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Set
+
+from copis.classes import Action
+
+
+class _Packet(NamedTuple):
+    actions: List[Action]
+    pose_set: int
+
+
+class _Step(NamedTuple):
+    actions: List[Action]
+    pose_set: int
+
+
+class _Barrier:
+    """Holds the devices it names until all of them reach it."""
+
+    def __init__(self, device_ids: Iterable[int]) -> None:
+        self.device_ids = frozenset(device_ids)
+
+
+class ScheduledBatch(NamedTuple):
+    """Actions that can be sent together."""
+    actions: List[Action]
+    pose_sets: Set[int]     # Pose sets the actions belong to; -1 for none.
+
+
+class CommandScheduler:
+    """Queues commands per device and hands out what can be sent.
+
+    Readiness is left to the caller, through the predicates given to pop_ready.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._phases: Deque = deque()
+        self._pose_set_counts = Counter()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 if isinstance(p, _Packet) else
+                sum(isinstance(i, _Step) for q in p.values() for i in q) for p in self._phases)
+
+    @property
+    def is_empty(self) -> bool:
+        """Returns True if nothing is left to send."""
+        with self._lock:
+            return not self._phases
+
+    @property
+    def first_pose_set(self) -> int:
+        """Returns the lowest pose set with actions left to send; -1 if none."""
+        with self._lock:
+            pending = [s for s, count in self._pose_set_counts.items() if count > 0]
+            return min(pending) if pending else -1
+
+    def clear(self) -> None:
+        """Drops everything queued."""
+        with self._lock:
+            self._phases.clear()
+            self._pose_set_counts.clear()
+
+    def add_packet(self, actions: List[Action], pose_set: int = -1) -> None:
+        """Queues actions to be sent together, once everything before them is."""
+        with self._lock:
+            self._phases.append(_Packet(list(actions), pose_set))
+            self._count(pose_set, 1)
+
+    def add_step(self, device_id: int, actions: List[Action], pose_set: int = -1) -> None:
+        """Queues actions for a device, after its previous ones."""
+        with self._lock:
+            self._get_queue(device_id).append(_Step(list(actions), pose_set))
+            self._count(pose_set, 1)
+
+    def add_barrier(self, device_ids: Iterable[int]) -> None:
+        """Makes the given devices wait for each other before their next steps."""
+        device_ids = set(device_ids)
+        if len(device_ids) < 2:
+            return
+
+        with self._lock:
+            barrier = _Barrier(device_ids)
+            for device_id in device_ids:
+                self._get_queue(device_id).append(barrier)
+
+    def pop_ready(self, is_packet_ready: Callable[[List[Action]], bool],
+                  is_step_ready: Callable[[int, List[Action]], bool],
+                  is_device_idle: Callable[[int], bool],
+                  max_lead: int = None) -> ScheduledBatch:
+        """Pops what can be sent now; None if nothing can.
+
+        Args:
+            is_packet_ready: Returns True if a packet's actions can be sent.
+            is_step_ready: Returns True if a device can take a step's actions.
+            is_device_idle: Returns True if a device is done with everything sent to it;
+                barriers are crossed when all their devices are.
+            max_lead: Optional; how many pose sets ahead of the slowest device
+                with steps left another device may be. None is unbounded.
+        """
+        with self._lock:
+            while self._phases:
+                phase = self._phases[0]
+
+                if isinstance(phase, _Packet):
+                    if not is_packet_ready(phase.actions):
+                        return None
+                    self._phases.popleft()
+                    self._count(phase.pose_set, -1)
+                    return ScheduledBatch(phase.actions, {phase.pose_set})
+
+                self._cross_barriers(phase, is_device_idle)
+
+                if not any(phase.values()):
+                    self._phases.popleft()
+                    continue
+
+                return self._pop_steps(phase, is_step_ready, max_lead)
+
+            return None
+
+    def _get_queue(self, device_id: int) -> Deque:
+        if not self._phases or isinstance(self._phases[-1], _Packet):
+            self._phases.append({})
+        return self._phases[-1].setdefault(device_id, deque())
+
+    def _count(self, pose_set: int, delta: int) -> None:
+        if pose_set >= 0:
+            self._pose_set_counts[pose_set] += delta
+            if self._pose_set_counts[pose_set] <= 0:
+                del self._pose_set_counts[pose_set]
+
+    def _cross_barriers(self, queues: Dict[int, Deque], is_device_idle: Callable[[int], bool]) -> None:
+        crossed = True
+        while crossed:
+            crossed = False
+            heads = {q[0] for q in queues.values() if q and isinstance(q[0], _Barrier)}
+
+            for barrier in heads:
+                if all(queues[d] and queues[d][0] is barrier and is_device_idle(d)
+                       for d in barrier.device_ids):
+                    for device_id in barrier.device_ids:
+                        queues[device_id].popleft()
+                    crossed = True
+
+    def _pop_steps(self, queues: Dict[int, Deque], is_step_ready: Callable[[int, List[Action]], bool],
+                   max_lead: int) -> ScheduledBatch:
+        lead_limit = None
+        if max_lead is not None:
+            frontiers = [s for s in (_next_pose_set(q) for q in queues.values()) if s >= 0]
+            if frontiers:
+                lead_limit = min(frontiers) + max_lead
+
+        actions, pose_sets = [], set()
+        for device_id, queue in queues.items():
+            if not queue or not isinstance(queue[0], _Step):
+                continue
+
+            step = queue[0]
+            if lead_limit is not None and step.pose_set > lead_limit:
+                continue
+            if not is_step_ready(device_id, step.actions):
+                continue
+
+            queue.popleft()
+            self._count(step.pose_set, -1)
+            actions.extend(step.actions)
+            pose_sets.add(step.pose_set)
+
+        return ScheduledBatch(actions, pose_sets) if actions else None
+
+
+def _next_pose_set(queue: Deque) -> int:
+    for item in queue:
+        if isinstance(item, _Step) and item.pose_set >= 0:
+            return item.pose_set
+    return -1
@@ -1,4 +1,31 @@
-from . serial_controller import SerialController
-from . edsdk_controller import EDSDKController
+"""COPIS communications package.
 
-__all__ = ["SerialController", "EDSDKController"]
+Controllers are imported on first use, so that importing one does not load
+the others' dependencies; the Canon EDSDK in particular.
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    "AsyncSerialLoop": "async_serial",
+    "SerialController": "serial_controller",
+    "EDSDKController": "edsdk_controller",
+    "EdsDownloadJob": "edsdk_download",
+    "EdsDownloadQueue": "edsdk_download",
+    "EdsShot": "edsdk_download",
+    "EvfFrame": "evf_stream",
+    "EvfStats": "evf_stream",
+    "EvfStream": "evf_stream"
+}
+
+__all__ = ["AsyncSerialLoop", "SerialController", "EDSDKController", "EdsDownloadJob", "EdsDownloadQueue",
+    "EdsShot", "EvfFrame", "EvfStats", "EvfStream"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
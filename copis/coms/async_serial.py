@@ -0,0 +1,240 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Serial I/O serviced by one asyncio event loop.
+
+Every attached port's file descriptor is watched by the loop's selector;
+received bytes are split into lines and queued per port, and writes go
+through a per port pipeline that coalesces what is queued into one write.
+Threads use the blocking readline and write adapters.
+
+Connections without a file descriptor (mock ports, Windows) can't be
+attached; they are read and written directly, as before.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+
+from typing import Dict
+
+
+class _Channel:
+    """A port attached to the loop."""
+
+    def __init__(self, name: str, fd: int) -> None:
+        self.name = name
+        self.fd = fd
+        self.lines = queue.Queue()
+        self.pending = b''
+        self.outbox: asyncio.Queue = None
+        self.writer: asyncio.Task = None
+        self.is_closed = False
+        self.was_blocking = True
+
+
+class AsyncSerialLoop:
+    """Services serial ports from one event loop on a background thread."""
+
+    _READ_SIZE = 4096
+    _DETACH_TIMEOUT = 1.0
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: threading.Thread = None
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """Returns True if the event loop is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Starts the event loop thread, if it isn't running."""
+        with self._lock:
+            if self.is_running:
+                return
+
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,),
+                daemon=True, name='serial loop thread')
+            self._thread.start()
+            ready.wait()
+
+    def stop(self) -> None:
+        """Detaches all ports and stops the event loop thread."""
+        for name in list(self._channels):
+            self.detach(name)
+
+        self._stop_loop()
+
+    def _stop_loop(self) -> None:
+        with self._lock:
+            if not self.is_running:
+                return
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+            self._loop = None
+
+    def is_attached(self, name: str) -> bool:
+        """Returns True if the port is serviced by the loop."""
+        return name in self._channels
+
+    def attach(self, name: str, connection) -> bool:
+        """Services an open connection from the loop; False if it has no file descriptor."""
+        try:
+            fd = connection.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False
+
+        self.start()
+        self.detach(name)
+
+        channel = _Channel(name, fd)
+        asyncio.run_coroutine_threadsafe(self._attach(channel), self._loop).result()
+        self._channels[name] = channel
+
+        return True
+
+    def detach(self, name: str) -> None:
+        """Flushes pending writes and stops servicing the port; the connection stays open.
+
+        The event loop thread stops with the last port; attach starts it again.
+        """
+        channel = self._channels.pop(name, None)
+
+        if channel is None or not self.is_running:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._detach(channel), self._loop)
+        future.result()
+
+        if not self._channels:
+            self._stop_loop()
+
+    def readline(self, name: str, timeout: float = None) -> bytes:
+        """Returns the port's next received line; b'' if none arrives within timeout seconds."""
+        channel = self._channels.get(name)
+
+        if channel is None:
+            return b''
+
+        try:
+            return channel.lines.get(timeout=timeout)
+        except queue.Empty:
+            return b''
+
+    def write(self, name: str, data: bytes) -> None:
+        """Queues data to be written to the port; returns without waiting for the write.
+
+        Data written while the port is being detached is dropped.
+        """
+        # The lock keeps the loop from being stopped and closed in between.
+        with self._lock:
+            channel = self._channels.get(name)
+
+            if channel is not None and not channel.is_closed and self.is_running:
+                self._loop.call_soon_threadsafe(channel.outbox.put_nowait, data)
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    async def _attach(self, channel: _Channel) -> None:
+        channel.was_blocking = os.get_blocking(channel.fd)
+        os.set_blocking(channel.fd, False)
+        channel.outbox = asyncio.Queue()
+        channel.writer = self._loop.create_task(self._drain(channel))
+        self._loop.add_reader(channel.fd, self._on_readable, channel)
+
+    async def _detach(self, channel: _Channel) -> None:
+        if not channel.is_closed:
+            self._loop.remove_reader(channel.fd)
+            channel.outbox.put_nowait(None)
+
+        try:
+            await asyncio.wait_for(channel.writer, self._DETACH_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+
+        channel.is_closed = True
+
+        # The connection is read and written directly again.
+        try:
+            os.set_blocking(channel.fd, channel.was_blocking)
+        except OSError:
+            pass
+
+    def _close_channel(self, channel: _Channel) -> None:
+        # The other end went away; readers get what was received, writes are dropped.
+        if not channel.is_closed:
+            channel.is_closed = True
+            self._loop.remove_reader(channel.fd)
+            channel.outbox.put_nowait(None)
+
+    def _on_readable(self, channel: _Channel) -> None:
+        try:
+            data = os.read(channel.fd, self._READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            self._close_channel(channel)
+            return
+
+        *lines, channel.pending = (channel.pending + data).split(b'\n')
+
+        for line in lines:
+            channel.lines.put(line + b'\n')
+
+    async def _drain(self, channel: _Channel) -> None:
+        # None in the outbox means write what came before it, then stop.
+        is_done = False
+
+        while not is_done and not channel.is_closed:
+            chunks = [await channel.outbox.get()]
+
+            # Whatever else is queued goes out in the same write.
+            while not channel.outbox.empty():
+                chunks.append(channel.outbox.get_nowait())
+
+            is_done = None in chunks
+            payload = b''.join(c for c in chunks if c)
+
+            while payload and not channel.is_closed:
+                try:
+                    written = os.write(channel.fd, payload)
+                    payload = payload[written:]
+                except BlockingIOError:
+                    await self._writable(channel.fd)
+                except OSError:
+                    self._close_channel(channel)
+
+    async def _writable(self, fd: int) -> None:
+        future = self._loop.create_future()
+        self._loop.add_writer(fd, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            self._loop.remove_writer(fd)
@@ -19,7 +19,13 @@ import os
 import datetime
 import time
 
-from ctypes import c_int, c_ubyte, c_uint, c_void_p, sizeof, WINFUNCTYPE, string_at, cast
+from ctypes import c_int, c_ubyte, c_uint, c_void_p, sizeof, string_at, cast
+
+try:
+    from ctypes import WINFUNCTYPE
+except ImportError:
+    # Not on Windows; only a mock EDSDK backend can be used.
+    from ctypes import CFUNCTYPE as WINFUNCTYPE
 from dataclasses import dataclass
 
 from typing import ClassVar, List
@@ -33,10 +39,12 @@ from canon.EDSDKLib import (
 from copis.helpers import print_error_msg, print_info_msg, get_hardware_id
 from copis.classes import Device as COPIS_Device
 from copis.classes.sys_db import SysDB
+from copis.coms.edsdk_download import EdsDownloadJob, EdsDownloadQueue, EdsShot
 
 class EDSDKController():
     """Implement EDSDK Functionalities."""
     _object_handler = _property_handler = _state_handler = object
+    _DOWNLOAD_TIMEOUT = 60 # Seconds to wait for pending downloads before closing a session.
 
     def __init__(self) -> None:
         self._sys_db = None
@@ -57,7 +65,11 @@ class EDSDKController():
         self._evf_stream = None
         self._db_attached = False
         self._img_buffer_length = 1 # Number of images that are expected to be buffered in camera when shutter is released via edsdk if save to pc is enabled.
-        self._img_buffer_counter = 0 # Number of images that have been downloaded from the camera's buffer.
+        self._img_buffer_counter = 0 # Number of images that have been requested from the camera's buffer.
+        self._downloads = None
+        self._current_shot = None
+        self._last_image_stamp = None # Time stamp of the last shot's file name; shots sharing it are numbered.
+        self._image_stamp_count = 0
 
         # Locally aliasing WINFUNCTYPE is required to avoid NameError caused
         # by the use of @mproperty.
@@ -147,39 +159,74 @@ class EDSDKController():
         if self._img_buffer_counter >= 1: # Ensure consistent base name across multiple formats.
             self._image_settings.filename = f'{os.path.splitext(self._image_settings.filename)[0]}.{ext}'
         else:
-            now = datetime.datetime.now().isoformat()[:-7].replace(':', '-')
-            self._image_settings.filename = (f'{self._image_settings.PREFIX}_{now}.{ext}')
+            # Downloads don't hold up the next shot, so names go to the millisecond.
+            now = datetime.datetime.now()
+            stamp = f'{now:%Y-%m-%dT%H-%M-%S}-{now.microsecond // 1000:03d}'
+            if stamp == self._last_image_stamp:
+                self._image_stamp_count += 1
+                stamp = f'{stamp}_{self._image_stamp_count}'
+            else:
+                self._last_image_stamp = stamp
+                self._image_stamp_count = 0
+            self._image_settings.filename = (f'{self._image_settings.PREFIX}_{stamp}.{ext}')
             self._image_settings.filename = os.path.join(self._current_copis_device.edsdk_save_to_path,self._image_settings.filename)
 
-    def _download_image(self, image) -> None:
-        """Download image from camera buffer to host computer.
+    def _queue_image_download(self, image) -> None:
+        """Queue an image in the camera buffer for download to the host computer.
 
         Args:
             image: Pointer to the image.
         """
         self._is_waiting_for_image = True
+        shot = self._current_shot
+
+        if shot is None or shot.is_fully_requested:
+            shot = self._current_shot = EdsShot(self._current_copis_device, self._img_buffer_length)
+            self._img_buffer_counter = 0
+
+        img_ref = c_void_p(image)
+        job = EdsDownloadJob(img_ref, 0, None, shot, shot.requested_count + 1)
+
         try:
-            img_ref = c_void_p(image)
             dir_info = self._edsdk.EdsGetDirectoryItemInfo(img_ref)
             self._generate_file_name(os.path.splitext(dir_info.file_name)[1][1:])
-            stream = self._edsdk.EdsCreateFileStream(self._image_settings.filename, EdsFileCreateDisposition.CreateAlways.value, EdsAccess.ReadWrite.value)
-            self._edsdk.EdsDownload(img_ref, dir_info.size, stream)
-            self._edsdk.EdsDownloadComplete(img_ref)
-            self._edsdk.EdsRelease(stream)
+            self._img_buffer_counter += 1
+
+            job = job._replace(size=dir_info.size, filename=self._image_settings.filename)
+            self._downloads.put(job)
+        except Exception as err:
+            # Count the image as done so the shot does not wait on it forever.
+            self._downloads.fail(job, err)
 
+        shot.requested_count += 1
+
+    def _on_image_downloaded(self, job: EdsDownloadJob, error: Exception) -> None:
+        """Record a downloaded image; called on a download thread."""
+        if error:
+            msg = error.args[0] if error.args else error
+            self._print_error_msg(self._console, f'An exception occurred while downloading an image: {msg}')
+        else:
             if self._db_attached:
-                self._sys_db.update_pose_output(self._current_copis_device,self._image_settings.filename)
+                p_id = self._sys_db.update_pose_output(job.shot.device, job.filename, hash_file=False)
 
-            self._img_buffer_counter += 1
-            self._print_info_msg(self._console, f'Image {self._img_buffer_counter} of {self._img_buffer_length} saved at {self._image_settings.filename}')
-        except Exception as err:
-            self._print_error_msg(self._console, f'An exception occurred while downloading an image: {err.args[0]}')
-        finally:
-            if self._img_buffer_counter >= self._img_buffer_length:
-                self._is_waiting_for_image = False
-                self._current_copis_device.is_writing_eds = False
-                self._img_buffer_counter = 0 # Reset counter.
-                self.disconnect() # Disconnect.
+                if p_id >= 0:
+                    self._downloads.defer(self._sys_db.update_pose_output_md5, p_id, job.filename)
+
+            self._print_info_msg(self._console, f'Image {job.index} of {job.shot.image_count} saved at {job.filename}')
+
+        if job.shot.is_complete:
+            self._on_shot_complete(job.shot)
+
+    def _on_shot_complete(self, shot: EdsShot) -> None:
+        if shot is self._current_shot:
+            self._is_waiting_for_image = False
+
+        if shot.device:
+            shot.device.is_writing_eds = False
+
+    def _on_deferred_error(self, err: Exception) -> None:
+        msg = err.args[0] if err.args else err
+        self._print_error_msg(self._console, f'An exception occurred while hashing an image: {msg}')
 
     def _handle_object(self, event, obj, _context):
         """Handle the group of events where request notifications are issued to
@@ -187,7 +234,7 @@ class EDSDKController():
         the memory card.
         """
         if event == self._edsdk.ObjectEvent_DirItemRequestTransfer:
-            self._download_image(obj)
+            self._queue_image_download(obj)
         return 0
 
     def _handle_property(self, _event, _property, _parameter, _context):
@@ -259,17 +306,25 @@ class EDSDKController():
         for info in pic_info_list:
             self._edsdk.EdsDeleteDirectoryItem(info.ref)
 
-    def initialize(self, console = None) -> None:
-        """Initialize the EDSDK object."""
+    def initialize(self, console = None, backend = None) -> None:
+        """Initialize the EDSDK object.
+
+        Args:
+            console: Optional; the console to print messages to.
+            backend: Optional; an object to use in place of the Canon EDSDK,
+                like copis.mocks.MockEDSDK.
+        """
         if self._is_connected:
             return
 
         self._console = console
 
         try:
-            self._edsdk = EDSDK()
+            self._edsdk = backend if backend is not None else EDSDK()
             self._edsdk.EdsInitializeSDK()
             self._update_camera_list()
+            self._downloads = EdsDownloadQueue(self._edsdk, self._on_image_downloaded,
+                on_deferred_error=self._on_deferred_error)
 
             # Set handlers.
             object_prototype = self._win_func_type(c_int, c_int, c_void_p, c_void_p)
@@ -380,6 +435,11 @@ class EDSDKController():
             return True
 
         if close_session:
+            # Images still streaming to disk need the session.
+            if self._downloads and not self._downloads.wait_idle(self._DOWNLOAD_TIMEOUT):
+                self._print_error_msg(self._console,
+                    f'Timed out waiting for camera {self._camera_settings.software_id} downloads.')
+
             self._edsdk.EdsCloseSession(self._camera_settings.ref)
 
         self._print_info_msg(self._console, f'Disconnected from camera {self._camera_settings.software_id}')
@@ -388,6 +448,7 @@ class EDSDKController():
         self._camera_settings.software_id = -1
         self._camera_settings.hardware_id = None
         self._current_copis_device = None
+        self._current_shot = None
         self._is_connected = False
 
         return not self._is_connected
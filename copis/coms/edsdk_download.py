@@ -0,0 +1,199 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""EDSDK image download queue; streams camera images to disk on worker threads."""
+
+import ctypes
+import queue
+import threading
+import time
+
+from typing import Any, Callable, NamedTuple
+
+from canon.EDSDKLib import EdsAccess, EdsFileCreateDisposition
+
+
+_COINIT_MULTITHREADED = 0x0
+
+
+class EdsShot:
+    """Tracks the images a single shutter release produces.
+
+    Args:
+        device: The COPIS device that took the shot.
+        image_count: The number of images the shot is expected to produce.
+    """
+
+    def __init__(self, device: Any, image_count: int) -> None:
+        self.device = device
+        self.image_count = image_count
+        self.requested_count = 0
+        self.completed_count = 0
+
+    @property
+    def is_fully_requested(self) -> bool:
+        """Returns True if every expected image has been queued."""
+        return self.requested_count >= self.image_count
+
+    @property
+    def is_complete(self) -> bool:
+        """Returns True if every expected image has been downloaded, or failed to."""
+        return self.completed_count >= self.image_count
+
+
+class EdsDownloadJob(NamedTuple):
+    """An image waiting to be downloaded from a camera."""
+    ref: Any            # EdsDirectoryItemRef of the image in the camera's buffer.
+    size: int           # Size of the image, in bytes.
+    filename: str       # Destination path on the host.
+    shot: EdsShot       # The shot the image belongs to.
+    index: int          # 1-based position of the image within its shot.
+
+
+class EdsDownloadQueue:
+    """Downloads queued camera images on worker threads.
+
+    Completion callbacks are serialized, so they may touch shared state such
+    as the system database without further locking. Slow follow-up work, like
+    hashing, can be handed to defer to keep it off the download path.
+
+    Args:
+        edsdk: The EDSDK object to download with; anything with the same
+            EdsCreateFileStream, EdsDownload, EdsDownloadComplete and EdsRelease
+            methods will do.
+        on_downloaded: Called with a job and None when its image is saved;
+            or with a job and the exception if the download failed.
+        worker_count: Optional; the number of concurrent downloads.
+        on_deferred_error: Optional; called with exceptions raised by deferred work.
+    """
+
+    def __init__(self, edsdk: Any, on_downloaded: Callable[[EdsDownloadJob, Exception], None],
+                 worker_count: int = 2,
+                 on_deferred_error: Callable[[Exception], None] = None) -> None:
+        self._edsdk = edsdk
+        self._on_downloaded = on_downloaded
+        self._on_deferred_error = on_deferred_error
+        self._worker_count = max(worker_count, 1)
+
+        self._jobs = queue.Queue()
+        self._deferred = queue.Queue()
+        self._complete_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._pending_count = 0
+        self._workers = []
+        self._deferred_worker = None
+
+    @property
+    def pending_count(self) -> int:
+        """Returns the number of queued or in progress downloads."""
+        return self._pending_count
+
+    def put(self, job: EdsDownloadJob) -> None:
+        """Queues an image download."""
+        self._ensure_workers()
+
+        with self._idle:
+            self._pending_count += 1
+
+        self._jobs.put(job)
+
+    def fail(self, job: EdsDownloadJob, error: Exception) -> None:
+        """Records an image that could not be queued, as a failed download."""
+        self._complete(job, error)
+
+    def defer(self, func: Callable, *args) -> None:
+        """Runs func(*args) on a background thread, in submission order."""
+        if self._deferred_worker is None or not self._deferred_worker.is_alive():
+            self._deferred_worker = threading.Thread(target=self._run_deferred,
+                name='edsdk deferred thread', daemon=True)
+            self._deferred_worker.start()
+
+        self._deferred.put((func, args))
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Blocks until all queued downloads are done. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._idle:
+            while self._pending_count > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    return False
+
+                self._idle.wait(remaining)
+
+        return True
+
+    def _ensure_workers(self) -> None:
+        self._workers = [w for w in self._workers if w.is_alive()]
+
+        while len(self._workers) < self._worker_count:
+            worker = threading.Thread(target=self._run_downloads,
+                name=f'edsdk download thread {len(self._workers)}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _download(self, job: EdsDownloadJob) -> None:
+        stream = self._edsdk.EdsCreateFileStream(job.filename,
+            EdsFileCreateDisposition.CreateAlways.value, EdsAccess.ReadWrite.value)
+
+        try:
+            self._edsdk.EdsDownload(job.ref, job.size, stream)
+            self._edsdk.EdsDownloadComplete(job.ref)
+        finally:
+            self._edsdk.EdsRelease(stream)
+
+    def _complete(self, job: EdsDownloadJob, error: Exception) -> None:
+        with self._complete_lock:
+            job.shot.completed_count += 1
+            self._on_downloaded(job, error)
+
+    def _run_downloads(self) -> None:
+        # On Windows, EDSDK calls made off the thread that initialized the SDK
+        # need COM initialized on the calling thread.
+        ole32 = getattr(ctypes, 'windll', None) and ctypes.windll.ole32
+        if ole32:
+            ole32.CoInitializeEx(None, _COINIT_MULTITHREADED)
+
+        try:
+            while True:
+                job = self._jobs.get()
+                error = None
+
+                try:
+                    self._download(job)
+                except Exception as err:
+                    error = err
+
+                try:
+                    self._complete(job, error)
+                finally:
+                    with self._idle:
+                        self._pending_count -= 1
+                        self._idle.notify_all()
+        finally:
+            if ole32:
+                ole32.CoUninitialize()
+
+    def _run_deferred(self) -> None:
+        while True:
+            func, args = self._deferred.get()
+
+            try:
+                func(*args)
+            except Exception as err:
+                if self._on_deferred_error:
+                    self._on_deferred_error(err)
@@ -0,0 +1,184 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Live view frame producer; fetches and decodes EVF frames off the GUI thread."""
+
+import io
+import threading
+import time
+
+from collections import deque
+from typing import Callable, NamedTuple, Tuple
+
+from PIL import Image
+
+
+class EvfFrame(NamedTuple):
+    """A decoded live view frame; RGB bytes, row major."""
+    data: bytes
+    width: int
+    height: int
+    sequence: int
+    decode_ms: float
+
+
+class EvfStats(NamedTuple):
+    """Live view throughput statistics."""
+    fps: float              # Frames decoded per second, over the recent window.
+    decode_ms: float        # Average decode and resize time, in milliseconds.
+    fetch_ms: float         # Average frame download time, in milliseconds.
+    dropped_count: int      # Frames replaced before they were taken.
+
+
+def decode_evf_frame(data: bytes, size: Tuple[int, int]) -> Tuple[bytes, int, int]:
+    """Decodes JPEG data into RGB bytes of the given size.
+
+    Uses JPEG draft mode so the decoder does most of the downscaling,
+    leaving only a small resize to the exact size.
+    """
+    img = Image.open(io.BytesIO(data))
+    img.draft('RGB', size)
+    img = img.convert('RGB')
+
+    if img.size != size:
+        img = img.resize(size, Image.BILINEAR)
+
+    width, height = img.size
+    return img.tobytes(), width, height
+
+
+class EvfStream:
+    """Pulls live view frames on a background thread and keeps the latest one.
+
+    Frames that are not taken before the next one is decoded are dropped, so a
+    slow consumer never builds a backlog.
+
+    Args:
+        fetch: Returns the next frame's JPEG data; or None if there is none.
+        on_frame: Optional; called on the producer thread after each new frame.
+        on_error: Optional; called on the producer thread with fetch or decode errors.
+        window: Optional; number of most recent frames the statistics are averaged over.
+    """
+
+    _IDLE_DELAY = .05
+
+    def __init__(self, fetch: Callable[[], bytes], on_frame: Callable[[], None] = None,
+                 on_error: Callable[[Exception], None] = None, window: int = 30) -> None:
+        self._fetch = fetch
+        self._on_frame = on_frame
+        self._on_error = on_error
+
+        self._lock = threading.Lock()
+        self._keep_running = False
+        self._thread = None
+
+        self._size = (1, 1)
+        self._latest = None
+        self._sequence = 0
+        self._dropped_count = 0
+
+        self._frame_times = deque(maxlen=window)
+        self._decode_times = deque(maxlen=window)
+        self._fetch_times = deque(maxlen=window)
+
+    @property
+    def is_running(self) -> bool:
+        """Returns True if the producer thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stats(self) -> EvfStats:
+        """Returns the current throughput statistics."""
+        avg_ms = lambda samples: sum(samples) / len(samples) * 1000 if samples else 0.0
+
+        with self._lock:
+            frame_times = list(self._frame_times)
+            decode_ms = avg_ms(self._decode_times)
+            fetch_ms = avg_ms(self._fetch_times)
+            dropped_count = self._dropped_count
+
+        fps = 0.0
+        if len(frame_times) > 1 and frame_times[-1] > frame_times[0]:
+            fps = (len(frame_times) - 1) / (frame_times[-1] - frame_times[0])
+
+        return EvfStats(fps, decode_ms, fetch_ms, dropped_count)
+
+    def set_size(self, width: int, height: int) -> None:
+        """Sets the size frames are decoded to, starting with the next frame."""
+        with self._lock:
+            self._size = (max(int(width), 1), max(int(height), 1))
+
+    def take(self) -> EvfFrame:
+        """Returns the latest frame and clears the slot; None if no new frame is ready."""
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def start(self) -> None:
+        """Starts the producer thread."""
+        if self.is_running:
+            return
+
+        self._keep_running = True
+        self._thread = threading.Thread(target=self._produce, name='evf thread', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """Stops the producer thread; waits up to timeout seconds for it to exit."""
+        self._keep_running = False
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+        self._thread = None
+
+        with self._lock:
+            self._latest = None
+
+    def _produce(self) -> None:
+        while self._keep_running:
+            try:
+                start = time.perf_counter()
+                data = self._fetch()
+                fetched = time.perf_counter()
+
+                if not data or not self._keep_running:
+                    time.sleep(self._IDLE_DELAY)
+                    continue
+
+                with self._lock:
+                    size = self._size
+
+                pixels, width, height = decode_evf_frame(bytes(data), size)
+                decoded = time.perf_counter()
+            except Exception as err:
+                if self._on_error:
+                    self._on_error(err)
+                time.sleep(self._IDLE_DELAY)
+                continue
+
+            with self._lock:
+                if self._latest is not None:
+                    self._dropped_count += 1
+
+                self._sequence += 1
+                self._latest = EvfFrame(pixels, width, height, self._sequence,
+                    (decoded - fetched) * 1000)
+                self._frame_times.append(decoded)
+                self._decode_times.append(decoded - fetched)
+                self._fetch_times.append(fetched - start)
+
+            if self._on_frame:
+                self._on_frame()
@@ -30,8 +30,67 @@ from copis.globals import Point5
 from copis.helpers import print_error_msg, print_raw_msg
 from copis.classes import SerialResponse
 from copis.mocks.mock_serial import MockSerial
+from copis.classes.serial_log import SerialLog
 from copis.classes.sys_db import SysDB
 
+_tuple_new = tuple.__new__
+
+
+def _parse_int(value: str) -> int:
+    if not value.isdecimal() and not (value[:1] == '-' and value[1:].isdecimal()):
+        raise ValueError(value)
+    return int(value)
+
+
+def _parse_word(value: str) -> str:
+    # Words that start like a number are cut short by the regex parser; leave those to it.
+    if not value.isalnum() or (not value[0].isalpha() and not value.isdecimal()):
+        raise ValueError(value)
+    return value
+
+
+def _parse_point5(values: List[str]) -> Point5:
+    # Digits, dots and minus signs only; float() rejects any misplaced ones.
+    if len(values) != 5 or not ''.join(values).replace('.', '').replace('-', '').isdecimal():
+        raise ValueError(values)
+    x, y, z, p, t = values
+    return _tuple_new(Point5, (float(x), float(y), float(z), float(p), float(t)))
+
+
+# Report key: (index in the parsed fields, number of comma separated values, parser).
+_FIELDS = {
+    'id': (0, 1, _parse_int),
+    'ssf': (1, 1, _parse_int),
+    'pos': (2, 5, _parse_point5),
+    'ERR': (3, 1, _parse_word)
+}
+_DEFAULT_FIELDS = (-1, -1, Point5(), None)
+
+
+def _parse_object(body: str) -> SerialResponse:
+    # Single pass over a well formed report's body; None for anything else,
+    # which is left to the regex parser so malformed lines parse as they always have.
+    tokens = body.split(',')
+    count = len(tokens)
+    fields = list(_DEFAULT_FIELDS)
+    i = 0
+
+    try:
+        while i < count:
+            key, _, value = tokens[i].partition(':')
+            index, size, parse = _FIELDS[key]
+            if size == 1:
+                fields[index] = parse(value)
+            else:
+                tokens[i] = value
+                fields[index] = parse(tokens[i:i + size])
+            i += size
+    except (KeyError, ValueError):
+        return None
+
+    return SerialResponse(*fields)
+
+
 def _filter_serials(ports):
     """Don't return bluetooth ports"""
     return filter(
@@ -70,29 +129,48 @@ class SerialController():
     _OBJECT_PATTERN = re.compile(r'^<(.*)>$')
     _PAIR_PATTERN = re.compile(r'\w+:[-?\d+\.?\d+,]+|\w+:\w+')
     _KEY_VAL_PATTERN = re.compile(r'(\w+):(.*)')
+    _RESPONSE_CACHE_SIZE = 256
 
     BAUDS = [9600, 19200, 38400, 57600, 115200]
 
     def __init__(self):
         self._sys_db = None
+        self._serial_log = None
         self._log_options = None
         self._ports = []
+        self._extra_ports = {}
+        self._mock_devices = {}
         self._active_port = None
+        self._test_device = None
         self._console = None
         self._is_dev_env = False
         self._filter_serials = _filter_serials
         self._print_error_msg = print_error_msg
         self._print_raw_msg = print_raw_msg
         self._db_attached = False
+        self._response_cache = {}
+        self._io_loop = None
 
-    def initialize(self, console = None, is_dev_env: bool = False) -> None:
-        """Initializes the serial object."""
+    def initialize(self, console = None, is_dev_env: bool = False, backend: str = 'threads') -> None:
+        """Initializes the serial object.
+
+        With the 'asyncio' backend, open ports are serviced by one event loop
+        instead of a blocking read on each listening thread.
+        """
         if any(p.is_open for p in self._ports):
             return
 
         self._console = console
         self._is_dev_env = is_dev_env
-        
+
+        if backend == 'asyncio' and self._io_loop is None:
+            # Imported here; only this backend needs asyncio.
+            from copis.coms.async_serial import AsyncSerialLoop
+            self._io_loop = AsyncSerialLoop()
+        elif backend != 'asyncio' and self._io_loop is not None:
+            self._io_loop.stop()
+            self._io_loop = None
+
         self.update_port_list()
 
     def attach_sys_db(self, sys_db : SysDB, log_options: dict=None) -> bool:
@@ -105,6 +183,31 @@ class SerialController():
             self._db_attached = False
         return self._db_attached
 
+    def attach_serial_log(self, serial_log: SerialLog, log_options: dict=None) -> None:
+        """Logs serial traffic to the given binary log instead of the system database; None detaches it."""
+        self._serial_log = serial_log
+        if log_options is not None:
+            self._log_options = log_options
+
+    @property
+    def test_device(self):
+        """Returns the mock controller served on the test port; None for the default one."""
+        return self._test_device
+
+    @test_device.setter
+    def test_device(self, value) -> None:
+        self._test_device = value
+
+    def add_port(self, name: str, description: str = '', device=None) -> None:
+        """Lists a port that port discovery misses, like a virtual serial port.
+
+        A mock controller given as device is served on the port instead of a serial connection.
+        """
+        self._extra_ports[name] = description
+        if device is not None:
+            self._mock_devices[name] = device
+        self.update_port_list()
+
     def select_port(self, name: str) -> SerialPort:
         """Creates a serial connection with the given port, without opening it."""
         port = self._get_port(name)
@@ -127,14 +230,7 @@ class SerialController():
             return True
 
         try:
-            connection = None
-            if name == SerialController._TEST_SERIAL_PORT:
-                connection = MockSerial() # serial.serial_for_url('loop://', do_not_open=True)
-            else:
-                connection = serial.Serial()
-                connection.port = name
-
-            port.connection = connection
+            port.connection = self._create_connection(name)
             port.is_active = True
             self._active_port = port
 
@@ -144,52 +240,71 @@ class SerialController():
                 f'Cannot instantiate serial connection: {err.args[0]}')
             return False
 
-    def open_port(self, baud: int = BAUDS[-1]) -> bool:
-        """Opens the active port."""
-        active_port = self._active_port
-        has_active_port = active_port is not None
+    def open_port(self, baud: int = BAUDS[-1], name: str = None) -> bool:
+        """Opens the active port; or the named one, which stays open alongside it."""
+        port = self._active_port if name is None else self._get_port(name)
 
-        if not has_active_port:
-            self._print_error_msg(self._console, 'No port selected.')
+        if port is None:
+            self._print_error_msg(self._console,
+                'No port selected.' if name is None else f'Invalid attempt to open unknown port {name}.')
             return False
 
-        if active_port.connection.is_open:
-            self._print_error_msg(self._console, 'Port connection already open.')
-            return True
-
         try:
-            active_port.connection.baudrate = baud
-            active_port.connection.timeout = self._READ_TIMEOUT
-            active_port.connection.open()
+            if port.connection is None:
+                port.connection = self._create_connection(port.name)
+
+            if port.connection.is_open:
+                self._print_error_msg(self._console, 'Port connection already open.')
+                return True
+
+            port.connection.baudrate = baud
+            port.connection.timeout = self._READ_TIMEOUT
+            port.connection.open()
         except SerialException as err:
             self._print_error_msg(self._console, f'Cannot open serial connection: {err.args[0]}')
             return False
 
-        return True
-
-    def close_port(self) -> None:
-        """Closes the active port."""
-        active_port = self._active_port
-        has_active_port = active_port is not None
-
-        if has_active_port and active_port.connection.is_open:
-            active_port.connection.close()
+        if self._io_loop is not None:
+            # Connections without a file descriptor are read and written directly.
+            self._io_loop.attach(port.name, port.connection)
 
-    def write(self, data: str) -> None:
-        """Writes to the active port"""
-        active_port = self._active_port
-
-        if active_port is not None and active_port.connection is not None and active_port.connection.is_open:
-            data = data.rstrip("\r")
-            data = f'{data}\r'.encode()
-
-            if self._db_attached and self._log_options and self._log_options.get('log_tx'):
-                self._sys_db.serial_tx(data)
+        return True
 
-            active_port.connection.write(data)
+    def close_port(self, name: str = None) -> None:
+        """Closes the active port; or the named one."""
+        port = self._active_port if name is None else self._get_port(name)
+
+        if port is not None and self._is_port_open(port):
+            if self._io_loop is not None:
+                self._io_loop.detach(port.name)
+            port.connection.close()
+
+    def write(self, data: str, port_name: str = None) -> None:
+        """Writes to the active port; or the named one."""
+        data = data.rstrip("\r")
+        self.write_encoded(f'{data}\r'.encode(), port_name)
+
+    def write_encoded(self, data: bytes, port_name: str = None) -> None:
+        """Writes already encoded, carriage return terminated commands to the active port; or the named one."""
+        port = self._active_port if port_name is None else self._get_port(port_name)
+
+        if port is not None and self._is_port_open(port):
+            if self._log_options and self._log_options.get('log_tx'):
+                if self._serial_log is not None:
+                    self._serial_log.tx(data)
+                elif self._db_attached:
+                    self._sys_db.serial_tx(data)
+
+            if self._io_loop is not None and self._io_loop.is_attached(port.name):
+                self._io_loop.write(port.name, data)
+            else:
+                port.connection.write(data)
 
     def terminate(self) -> None:
         """Closes all ports."""
+        if self._io_loop is not None:
+            self._io_loop.stop()
+
         for port in self._ports:
             if port is not None and port.connection is not None and port.connection.is_open:
                 port.connection.close()
@@ -211,6 +326,18 @@ class SerialController():
 
             new_ports.append(port)
 
+        for name, desc in self._extra_ports.items():
+            if any(p.name == name for p in new_ports):
+                continue
+
+            port = self._get_port(name)
+            is_active = has_active_port and self._active_port.name == name
+
+            if port is None:
+                port = SerialPort(name, None, desc, is_active)
+
+            new_ports.append(port)
+
         # Ensure test port is added if in dev environment.
         if self._is_dev_env:
             p_name = SerialController._TEST_SERIAL_PORT
@@ -235,11 +362,17 @@ class SerialController():
         response = None
 
         if port and self._is_port_open(port):
-            p_bytes = port.connection.readline()
+            if self._io_loop is not None and self._io_loop.is_attached(port.name):
+                p_bytes = self._io_loop.readline(port.name, self._READ_TIMEOUT)
+            else:
+                p_bytes = port.connection.readline()
             resp = p_bytes.decode()
 
-            if self._db_attached and self._log_options and self._log_options.get('log_rx'):
-                self._sys_db.serial_rx(p_bytes)
+            if self._log_options and self._log_options.get('log_rx'):
+                if self._serial_log is not None:
+                    self._serial_log.rx(p_bytes)
+                elif self._db_attached:
+                    self._sys_db.serial_rx(p_bytes)
 
             if resp:
                 #even if verbose output is off we still want to print system messages and error, so we only ignore position updates.
@@ -250,12 +383,42 @@ class SerialController():
 
         return response
 
+    def _create_connection(self, name):
+        if name == SerialController._TEST_SERIAL_PORT:
+            return MockSerial(device=self._test_device)
+        if name in self._mock_devices:
+            return MockSerial(device=self._mock_devices[name])
+
+        connection = serial.Serial()
+        connection.port = name
+        return connection
+
     def _get_port(self, name):
         if len(self._ports) < 1:
             return None
         return next(filter(lambda p, n = name: p.name == n, self._ports), None)
 
     def _parse_response(self, resp) -> object:
+        # Idle devices repeat the same report; those lines parse once.
+        response = self._response_cache.get(resp)
+        if response is not None:
+            return response
+
+        line = resp.strip('\r\n')
+        if line[:1] != '<' or line[-1:] != '>':
+            return line
+
+        response = _parse_object(line[1:-1])
+        if response is None:
+            return self._parse_response_re(line)
+
+        if self._RESPONSE_CACHE_SIZE:
+            if len(self._response_cache) >= self._RESPONSE_CACHE_SIZE:
+                self._response_cache.clear()
+            self._response_cache[resp] = response
+        return response
+
+    def _parse_response_re(self, resp) -> object:
         line = resp.strip('\r\n')
         if self._OBJECT_PATTERN.match(line):
             result = SerialResponse()
@@ -284,6 +447,11 @@ class SerialController():
         """Returns open status of the active port."""
         return self._is_port_open()
 
+    @property
+    def open_port_names(self) -> List[str]:
+        """Returns the names of the open ports."""
+        return [p.name for p in self._ports if self._is_port_open(p)]
+
     @property
     def port_list(self) -> List[SerialPort]:
         """Returns a copy of the serial ports list."""
@@ -292,13 +460,16 @@ class SerialController():
 _instance = SerialController()
 initialize = _instance.initialize
 update_port_list = _instance.update_port_list
+add_port = _instance.add_port
 select_port = _instance.select_port
 open_port = _instance.open_port
 close_port = _instance.close_port
 read = _instance.read
 write = _instance.write
+write_encoded = _instance.write_encoded
 terminate = _instance.terminate
 attach_sys_db = _instance.attach_sys_db
+attach_serial_log = _instance.attach_serial_log
 BAUDS = _instance.BAUDS
 
 #@mproperty
@@ -28,14 +28,30 @@ from copis.classes.sys_db import SysDB
 import copis.store as store
 from .globals import DebugEnv, Size, WindowState
 from .classes import ApplicationSettings, MachineSettings
-import wx
 
-from copis.gui import config_dialog
+
+# Used when no display can be queried, as when running headless.
+_DEFAULT_DISPLAY_GEOMETRY = (0, 0, 1920, 1080)
 
 def _get_bool(val):
     return val.lower() in ['yes', 'on', 'true', '1']
 
 
+def _get_display_geometry():
+    """Returns the primary display's (x, y, width, height); a default one without a GUI."""
+    try:
+        import wx
+    except ImportError:
+        return _DEFAULT_DISPLAY_GEOMETRY
+
+    if wx.GetApp() is None:
+        return _DEFAULT_DISPLAY_GEOMETRY
+
+    displays = (wx.Display(i) for i in range(wx.Display.GetCount()))
+    main_d = next(filter(lambda d: d.IsPrimary, displays))
+    return tuple(main_d.GetGeometry())
+
+
 def _get_state_parts(state_str):
     parts = state_str.split(',')
     return list(int(s)
@@ -55,6 +71,13 @@ class Config():
         self._log_serial_rx : bool = False
         self._homing_method : str = ''
         self._adjust_live_pan : bool = False
+        self._profile_render : bool = False
+        self._console_log_path : str = None
+        self._edsdk_backend : str = 'canon'
+        self._serial_stream_depth : int = 0
+        self._serial_backend : str = 'threads'
+        self._serial_log_path : str = None
+        self._telemetry_dir : str = None
         self._db_path : str = None
         self._profile_path : str = None
         self._default_proxy_path : str = 'proxies\\handsome_dan.obj'
@@ -134,6 +157,21 @@ class Config():
     def adjust_live_pan(self) -> bool:
         return self._adjust_live_pan
     
+    @property
+    def profile_render(self) -> bool:
+        """Returns a flag indicating whether to report render loop timings to the console."""
+        return self._profile_render
+
+    @property
+    def edsdk_backend(self) -> str:
+        """Returns the EDSDK backend to use; 'canon' for the Canon SDK, or 'mock' to emulate cameras."""
+        return self._edsdk_backend
+
+    @property
+    def console_log_path(self) -> str:
+        """Returns the file console output is mirrored to; None if not mirrored."""
+        return self._console_log_path
+
     @property
     def homing_method(self) -> bool:
         """Returns a homing method if a special one has been configured"""
@@ -153,14 +191,34 @@ class Config():
         """Returns the path to the system database."""
         return self._hotkeys
 
+    @property
+    def serial_log_path(self) -> str:
+        """Returns the binary log serial Tx and Rx are written to instead of the database; None if not configured."""
+        return self._serial_log_path
+
+    @property
+    def telemetry_dir(self) -> str:
+        """Returns the directory position report history is spilled to; None to keep only recent reports in memory."""
+        return self._telemetry_dir
+
     @property
     def log_serial_tx(self) -> bool:
-        """Returns a flag indicating whether to log serial Tx, if a database is configured."""
+        """Returns a flag indicating whether to log serial Tx, if a database or a serial log is configured."""
         return self._log_serial_tx
 
+    @property
+    def serial_stream_depth(self) -> int:
+        """Returns the number of serial commands that may be queued per device while imaging; 0 waits for idle."""
+        return self._serial_stream_depth
+
+    @property
+    def serial_backend(self) -> str:
+        """Returns the serial I/O backend; 'threads' for a blocking read per port, or 'asyncio' to service all ports from one event loop."""
+        return self._serial_backend
+
     @property
     def log_serial_rx(self) -> bool:
-        """Returns a flag indicating whether to log serial Rx, if a database is configured."""
+        """Returns a flag indicating whether to log serial Rx, if a database or a serial log is configured."""
         return self._log_serial_rx
 
     @property
@@ -177,15 +235,13 @@ class Config():
         """This method ensures that the window's state is correctly initialized, properly fits within the display area, 
         and saves this state to a configuration file for future use. 
         It prevents the window from being positioned outside the visible screen or being too small, maintaining a user-friendly interface."""
-        displays = (wx.Display(i) for i in range(wx.Display.GetCount()))
-        main_d = next(filter(lambda d: d.IsPrimary, displays))
-        display_rect = main_d.GetGeometry()
+        display_x, display_y, display_width, display_height = _get_display_geometry()
         if not x and not width:
-            width =  display_rect[2] * 60 / 100
+            width =  display_width * 60 / 100
         elif not width:
             width = min_width 
         if not y and not height:
-            height =  display_rect[3] * 60 / 100
+            height =  display_height * 60 / 100
         elif not height:
             height = min_height    
         if not is_maximized:
@@ -196,23 +252,23 @@ class Config():
                 if y < 0:
                     height = max(min_height, height + y)
                     y = 0
-                if x > display_rect.X + display_rect.Width:
-                    offset = x - display_rect.X
+                if x > display_x + display_width:
+                    offset = x - display_x
                     width = max(min_width, width - offset)
                     x = x - offset
-                if y  > display_rect.Y + display_rect.Height:
-                    offset = y - display_rect.Y
+                if y  > display_y + display_height:
+                    offset = y - display_y
                     height = max(min_height, height - offset)
                     y = y - offset
-                if x + width > display_rect.X + display_rect.Width:
-                    offset = x + width - display_rect.X - display_rect.Width
+                if x + width > display_x + display_width:
+                    offset = x + width - display_x - display_width
                     width = max(min_width, width - offset)
-                if y + height > display_rect.Y+ display_rect.Height:
-                    offset = y + height - display_rect.Y - display_rect.Height
+                if y + height > display_y+ display_height:
+                    offset = y + height - display_y - display_height
                     height = max(min_height, height - offset)
             else:
-                x = int((display_rect.X - width) / 2)
-                y = int((display_rect.Y - height) / 2)
+                x = int((display_x - width) / 2)
+                y = int((display_y - height) / 2)
         return WindowState(int(x),int(y),int(width),int(height),is_maximized)
 
     def update_window_state(self, state: WindowState) -> None:
@@ -294,6 +350,13 @@ class Config():
         self._log_serial_rx : bool = False
         self._homing_method : str = ''
         self._adjust_live_pan : bool = False
+        self._profile_render : bool = False
+        self._console_log_path : str = None
+        self._edsdk_backend : str = 'canon'
+        self._serial_stream_depth : int = 0
+        self._serial_backend : str = 'threads'
+        self._serial_log_path : str = None
+        self._telemetry_dir : str = None
         self._db_path: str = None
         
         if parser.has_option('System', 'db'):
@@ -302,15 +365,29 @@ class Config():
             if db_dir and not db_dir.isspace() and not os.path.exists(db_dir): 
                 os.makedirs(db_dir)
             #we should throw an error if after this db path does not exist
+        if parser.has_option('System', 'serial_log'):
+            self._serial_log_path = parser['System']['serial_log'] or None
             
-        if self._db_path and parser.has_option('System', 'log_serial_tx'):
+        if (self._db_path or self._serial_log_path) and parser.has_option('System', 'log_serial_tx'):
             self._log_serial_tx = _get_bool(parser['System']['log_serial_tx'])
-        if self._db_path and parser.has_option('System', 'log_serial_rx'):
+        if (self._db_path or self._serial_log_path) and parser.has_option('System', 'log_serial_rx'):
             self._log_serial_rx = _get_bool(parser['System']['log_serial_rx'])
         if parser.has_option('System', 'homing_method'):
                 self._homing_method = parser['System']['homing_method']
         if parser.has_option('System', 'live_cam_pan_op'):
             self._adjust_live_pan = _get_bool(parser['System']['live_cam_pan_op'])
+        if parser.has_option('System', 'profile_render'):
+            self._profile_render = _get_bool(parser['System']['profile_render'])
+        if parser.has_option('System', 'console_log'):
+            self._console_log_path = parser['System']['console_log'] or None
+        if parser.has_option('System', 'edsdk_backend'):
+            self._edsdk_backend = parser['System']['edsdk_backend'].strip().lower() or 'canon'
+        if parser.has_option('System', 'serial_stream_depth'):
+            self._serial_stream_depth = max(parser['System'].getint('serial_stream_depth'), 0)
+        if parser.has_option('System', 'telemetry_dir'):
+            self._telemetry_dir = parser['System']['telemetry_dir'] or None
+        if parser.has_option('System', 'serial_backend'):
+            self._serial_backend = parser['System']['serial_backend'].strip().lower() or 'threads'
 
         if parser.has_option('System', 'hotkeys'):
            hotkeys = parser['System']['hotkeys']
@@ -364,6 +441,20 @@ class Config():
             'log_serial_rx' : self._log_serial_rx,
             'live_cam_pan_op' : self._adjust_live_pan
         }
+        if self._profile_render:
+            config_dict['System']['profile_render'] = self._profile_render
+        if self._console_log_path:
+            config_dict['System']['console_log'] = self._console_log_path
+        if self._edsdk_backend != 'canon':
+            config_dict['System']['edsdk_backend'] = self._edsdk_backend
+        if self._serial_stream_depth:
+            config_dict['System']['serial_stream_depth'] = self._serial_stream_depth
+        if self._serial_backend != 'threads':
+            config_dict['System']['serial_backend'] = self._serial_backend
+        if self._serial_log_path:
+            config_dict['System']['serial_log'] = self._serial_log_path
+        if self._telemetry_dir:
+            config_dict['System']['telemetry_dir'] = self._telemetry_dir
         if len(self._hotkeys) > 0:
             hk_str_list = []
             for k,v in self._hotkeys.items():
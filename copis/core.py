@@ -34,19 +34,23 @@ from importlib import import_module
 from random import shuffle as rand_shuffle
 from typing import List, Tuple
 from datetime import datetime, timedelta
-from itertools import groupby, zip_longest
+from itertools import zip_longest
 from glm import vec2, vec3
 from pydispatch import dispatcher
 
-from canon.EDSDKLib import EvfDriveLens
 from copis.coms import serial_controller
-from copis.command_processor import deserialize_command, serialize_command
+from copis.command_processor import (deserialize_command, encode_commands, serialize_command,
+    serialize_commands)
+from copis.command_scheduler import CommandScheduler
+from copis.collision_detection import collision_eval_cam2cam_lead
 from copis.helpers import get_atype_kind, print_error_msg, print_debug_msg, print_info_msg, create_action_args, get_action_args_values, get_end_position, get_heading, sanitize_number, locked, rad_to_dd, dd_to_rad
-from copis.globals import ActionType, ComStatus, DebugEnv, Point5, WorkType
+from copis.globals import (ActionType, ComStatus, DebugEnv, Point5, SysStatFlags, WorkType,
+    F_STACK_ACTION_TYPES, SNAP_ACTION_TYPES)
 from copis.config import Config, _get_bool
 from copis.project import Project
-from copis.classes import Action, MonitoredList, Pose, ReadThread, SerialResponse
+from copis.classes import Action, MonitoredList, Pose, ReadThread, SerialResponse, TelemetryStore
 from copis import store
+from copis.classes.serial_log import SerialLog
 from copis.classes.sys_db import SysDB
 from copis.mathutils import optimize_rotation_move_to_angle
 
@@ -60,8 +64,8 @@ class COPISCore:
     _STALE_STATUS_THRESHOLD = 1
     _IMAGING_MANIFEST_FILE_NAME = 'copis_imaging_manifest.json'
     MOVE_COMMANDS = [ActionType.G0, ActionType.G1]
-    F_STACK_COMMANDS = [ActionType.C10, ActionType.HST_F_STACK, ActionType.EDS_F_STACK]
-    SNAP_COMMANDS = [ActionType.C0, ActionType.EDS_SNAP]
+    F_STACK_COMMANDS = list(F_STACK_ACTION_TYPES)
+    SNAP_COMMANDS = list(SNAP_ACTION_TYPES)
     FOCUS_COMMANDS = [ActionType.C1, ActionType.EDS_FOCUS]
     LENS_COMMANDS = SNAP_COMMANDS + FOCUS_COMMANDS
 
@@ -74,22 +78,25 @@ class COPISCore:
         self._session_guid = str(uuid.uuid4()) # Global session if, useful is merging dbs.
         self.project = Project()
         self.project.start(self.config.profile_path, self.config.default_proxy_path )
-        self.console = ConsoleOutput(parent)
+        self.console = ConsoleOutput(parent, mirror_path=self.config.console_log_path)
         self._is_dev_env = self.config.application_settings.debug_env == DebugEnv.DEV
-        self._is_edsdk_enabled = False
+        # EDSDK is initialized by init_edsdk, from the app's thread; not on import.
         self._edsdk = None
         self._is_serial_enabled = False
         self._serial = None
         self._is_new_connection = False
         self._connected_on = None
-        self.init_edsdk()
         self.init_serial()
         serial_log_opts = {
             'log_tx': self.config.log_serial_tx,
             'log_rx': self.config.log_serial_rx
         }
         self._serial.attach_sys_db(self.sys_db, serial_log_opts)
-        self._edsdk.attach_sys_db(self.sys_db)
+        self.serial_log = self._open_serial_log(self.config.serial_log_path)
+        self._serial.attach_serial_log(self.serial_log, serial_log_opts)
+        self.telemetry = self._open_telemetry(self.config.telemetry_dir)
+        self._replay_thread = None
+        self._stop_replay = False
         # Attach serial.
         self._check_configs()
         # Clear to send, enabled after responses.
@@ -101,11 +108,11 @@ class COPISCore:
         self._machine_busy_since = None
         self._last_machine_status = None
         self._read_threads = []
+        # Ports opened, besides the selected one, for devices whose profile names them.
+        self._routed_ports: List[str] = []
         self._working_thread = None
-        self._mainqueue = []
-        self._pose_set_offset_start: int = -1
-        self._pose_set_offset_end: int = -1
-        self._current_mainqueue_item: int = -1
+        self._scheduler = CommandScheduler()
+        self._max_pose_set_lead = None
         self._imaged_pose_sets: List[int] = MonitoredList('ntf_i_list_changed', [])
         self._selected_pose: int = -1
         self._selected_pose_set: int = -1
@@ -121,6 +128,11 @@ class COPISCore:
         self._ressetable_send_delay_ms = 0 # Delay time in milliseconds before sending a serial command after receiving idle/CTS.
         self._verbose_output = False
         self._adjust_live_pan = self.config.adjust_live_pan
+        # Streaming: serial commands queued per device while imaging; 0 sends one packet per idle.
+        self._stream_depth = self.config.serial_stream_depth
+        self._stream_pending = {}   # Device id: types of commands written and not known done.
+        self._stream_unacked = set() # Ids of devices that have not reported since their last write.
+        self._stream_lock = threading.Lock() # Guards the two above; the worker and listeners update them.
         
         print_info_msg(self.console, f"using config: {self.config.ini_path}")
         print_info_msg(self.console, f"using profile: {self.config.profile_path}")
@@ -132,10 +144,36 @@ class COPISCore:
             return self.project.options['disable_idle_motors']
         return True
 
+    @property
+    def _is_imaging_per_device(self):
+        if 'per_device_queues' in self.project.options:
+            return self.project.options['per_device_queues']
+        return False
+
+    @property
+    def _sync_shutters(self):
+        if 'sync_shutters' in self.project.options:
+            return self.project.options['sync_shutters']
+        return False
+
+    @property
+    def _pose_set_lead(self):
+        if 'max_pose_set_lead' in self.project.options:
+            return max(int(self.project.options['max_pose_set_lead']), 0)
+        return 1
+
+    @property
+    def _is_edsdk_enabled(self):
+        return self._edsdk is not None and self._edsdk._instance.is_enabled
+
     @property
     def _is_machine_busy(self):
         return self._working_thread is not None or self._is_machine_paused
 
+    @property
+    def _is_streaming(self):
+        return self._stream_depth > 0 and self._work_type == WorkType.IMAGING
+
     @property
     def _machine_last_reported_on(self):
         reports = [dvc.last_reported_on for dvc in self.project.devices if dvc.last_reported_on]
@@ -228,7 +266,7 @@ class COPISCore:
     def is_edsdk_connected(self):
         """Returns a flag indicating whether a device is connected via edsdk."""
         #return self._edsdk.is_connected
-        return self._edsdk._instance.is_connected
+        return self._edsdk is not None and self._edsdk._instance.is_connected
 
     @property
     def save_imaging_session(self) -> str:
@@ -293,12 +331,15 @@ class COPISCore:
         if self._is_machine_busy:
             print_error_msg(self.console, 'Cannot query. The machine is busy.')
             return
-        cmds.append(Action(ActionType.M120, 0))
+        if self._routed_ports:
+            # One device per port; devices report on their own bus.
+            cmds.extend(Action(ActionType.M120, min(ids)) for ids in self._get_port_device_ids().values())
+        else:
+            cmds.append(Action(ActionType.M120, 0))
         if cmds:
             self._keep_working = True
             self._clear_to_send = True
-            self._mainqueue = []
-            self._mainqueue.append(cmds)
+            self._queue_packets([cmds])
             self._send_next()
             self._keep_working = False
     
@@ -316,8 +357,7 @@ class COPISCore:
         if cmds:
             self._keep_working = True
             self._clear_to_send = True
-            self._mainqueue = []
-            self._mainqueue.append(cmds)
+            self._queue_packets([cmds])
             self._send_next()
             self._keep_working = False
             return True
@@ -384,6 +424,30 @@ class COPISCore:
                 return device
         return None
 
+    def _get_serial_port_name(self, device_id):
+        """Returns the routed port the device is on; None for the selected port."""
+        dvc = self._get_device(device_id)
+        if dvc and dvc.serial_port in self._routed_ports:
+            return dvc.serial_port
+        return None
+
+    def _get_port_device_ids(self):
+        port_device_ids = {}
+        for dvc in self.project.devices:
+            port_device_ids.setdefault(self._get_serial_port_name(dvc.device_id), []).append(dvc.device_id)
+        return port_device_ids
+
+    def _write_serial(self, commands):
+        """Writes commands to the ports their devices are on; one write per port."""
+        if not self._routed_ports:
+            self._serial.write_encoded(encode_commands(commands))
+            return
+        port_commands = {}
+        for command in commands:
+            port_commands.setdefault(self._get_serial_port_name(command.device), []).append(command)
+        for port_name, cmds in port_commands.items():
+            self._serial.write_encoded(encode_commands(cmds), port_name)
+
     def _listener(self) -> None:
         """Implements a listening thread."""
         current_thread = threading.current_thread()
@@ -394,6 +458,8 @@ class COPISCore:
                 break
         continue_listening =  True
         machine_queried = False
+        # Routed ports' readers only read; the selected port's one also manages the connection.
+        is_selected_port = read_thread.port == self._get_active_serial_port_name()
         print_debug_msg(self.console, f'{read_thread.thread.name.capitalize()} started', self._is_dev_env)
         while not read_thread.stop: #continue_listening():
             time.sleep(self.YIELD_TIMEOUT)
@@ -404,6 +470,9 @@ class COPISCore:
                     dvc = self._get_device(resp.device_id)
                     if dvc:
                         dvc.set_serial_response(resp)
+                        self.telemetry.record(resp)
+                        if self._is_streaming:
+                            self._update_stream_pending(dvc, resp)
                 if self._keep_working and self._is_machine_locked:
                     print_info_msg(self.console, '**** Machine error-locked. stopping imaging!! ****')
                     self.stop_work()
@@ -411,10 +480,10 @@ class COPISCore:
                     self._clear_to_send = controllers_unlocked or self.is_machine_idle
                 if self._last_machine_status != self.machine_status and self.is_machine_idle:
                     print_debug_msg(self.console, '**** Machine is clear ****', self._is_dev_env)
-                    if len(self._mainqueue) <= 0:
+                    if self._scheduler.is_empty:
                         print_info_msg(self.console, '**** Machine is idle ****')
                         dispatcher.send('ntf_machine_idle')
-            if self._is_new_connection:
+            if self._is_new_connection and is_selected_port:
                 if self._has_machine_reported:
                     if self._is_machine_locked and not controllers_unlocked:
                         controllers_unlocked = self._unlock_machine()
@@ -444,7 +513,7 @@ class COPISCore:
                         print_info_msg(self.console, f'Stale status threshold of {_format_time_delta(timedelta(seconds=self._STALE_STATUS_THRESHOLD))} reached.')
                         self._query_machine()
                         machine_queried = True
-            if self.is_machine_homed and 'busy_bus_polling_interval_ms' in self.project.options and self.project.options['busy_bus_polling_interval_ms'] > 0:
+            if is_selected_port and self.is_machine_homed and 'busy_bus_polling_interval_ms' in self.project.options and self.project.options['busy_bus_polling_interval_ms'] > 0:
                 busy_bus_polling_threshold = int(self.project.options['busy_bus_polling_interval_ms'] / 1000)
                 busy_span = None
                 if self.machine_status not in ('mixed', 'busy'):
@@ -455,7 +524,8 @@ class COPISCore:
                 if busy_span and busy_span.total_seconds() > busy_bus_polling_threshold:
                     print_info_msg(self.console, f'Busy bus polling threshold of {_format_time_delta(timedelta(seconds=busy_bus_polling_threshold))} reached.')
                     print_info_msg(self.console, '**** Thawing machine ****')
-                    self._serial.write(ActionType.M120.name)
+                    for port_name in [None, *self._routed_ports]:
+                        self._serial.write(ActionType.M120.name, port_name)
                     self._machine_busy_since = datetime.now()
             #print(self._last_machine_status)
             self._last_machine_status = self.machine_status
@@ -490,7 +560,6 @@ class COPISCore:
             self._keep_working = False
             if not self._is_machine_paused:
                 if self._work_type == WorkType.IMAGING:
-                    self._current_mainqueue_item = -1
                     self.select_pose_set(-1)
                     self._imaged_pose_sets.clear()
                     m = f'{t_name} ended'
@@ -499,6 +568,7 @@ class COPISCore:
                     print_info_msg(self.console, m)  #where stepping ended was being generated
                     self._session_id = self.sys_db.last_session_id() +1
                 self._work_type = None
+                self._max_pose_set_lead = None
             if not had_error:
                 print_debug_msg(self.console, f'{t_name} thread stopped', self._is_dev_env)
 
@@ -510,16 +580,13 @@ class COPISCore:
         return counter
 
     def _get_image_counts(self, pose_list=None):
-        c_key = lambda p: (p.position or p.payload[0]).device
+        path_stats = self.project.path_stats
+        stats = path_stats.compute(pose_list) if pose_list else path_stats.get_stats()
         counts = {}
-        poses = sorted(pose_list or self.project.poses, key=c_key)
-        groups = groupby(poses, c_key)
-        for key, group in groups:
-            pics = [a for p in list(group) for a in p.get_actions()
-                if a.atype in self.SNAP_COMMANDS]
+        for key, dvc_stats in stats.items():
             device = self._get_device(key)
             device_key = f'{device.name}_{device.type}_id_{device.device_id}'.lower()
-            counts[device_key] = len(pics)
+            counts[device_key] = dvc_stats.image_count
         return ('expected_image_counts', counts)
 
     def _update_imaging_manifest(self, pairs):
@@ -583,18 +650,22 @@ class COPISCore:
     def _send_next(self):
         if not (self.is_serial_port_connected or self._is_edsdk_enabled):
             return
-        # Wait until we get the ok from listener.
-        while self.is_serial_port_connected and not self._clear_to_send \
-            and self._keep_working:
+        batch = None
+        # Wait until the scheduler has something the machine is clear to take.
+        while self._keep_working:
+            if self._scheduler.is_empty:
+                if self._clear_to_send or not self.is_serial_port_connected:
+                    break
+            else:
+                batch = self._scheduler.pop_ready(self._is_packet_clear, self._is_device_clear,
+                    self._is_device_idle, self._max_pose_set_lead)
+                if batch:
+                    break
             time.sleep(self.YIELD_TIMEOUT)
-        if self._keep_working and len(self._mainqueue) > 0:
-            packet = self._mainqueue.pop(0)
-            packet_size = len(packet)
-            if isinstance(packet, tuple) and list(map(type, packet)) == [int, list]:
-                packet_size = len(packet[1])
-            print_debug_msg(self.console, f'Packet size is: {packet_size}',
+        if self._keep_working and batch:
+            print_debug_msg(self.console, f'Packet size is: {len(batch.actions)}',
                 self._is_dev_env)
-            if packet:
+            if batch.actions:
                 # Temporary shoehorn of a post shutter delay.
                 # We set a delay via _send_delay_ms when a shutter command is sent,
                 # then reset it to zero after subsequent command is ready to send.
@@ -606,20 +677,124 @@ class COPISCore:
                         time.sleep(self.YIELD_TIMEOUT)
                     self._ressetable_send_delay_ms = 0
                     print_debug_msg(self.console, 'end post shutter delay', True)
-                self._send(*packet)
+                self._send(*batch.actions)
                 self._clear_to_send = False #why is this set after the send and not before?
+                self._update_pose_set_progress(batch.pose_sets)
             else:
                 print_debug_msg(self.console, 'Not writing empty packet.', self._is_dev_env)
         else:
             self._keep_working = False
             self._clear_to_send = True
 
+    def _queue_packets(self, *packet_lists):
+        self._scheduler.clear()
+        for packets in packet_lists:
+            for packet in packets:
+                self._scheduler.add_packet(packet)
+
+    def _queue_pose_sets(self, start_index, end_index):
+        """Queues pose sets in lockstep: each zipped packet waits for the machine to be clear;
+        or per device, with barriers only where the path needs them."""
+        pose_sets = self.project.pose_sets
+        if not self._is_imaging_per_device:
+            for i in range(start_index, end_index + 1):
+                for tup in zip_longest(*[p.get_seq_actions() for p in pose_sets[i]]):
+                    self._scheduler.add_packet([val for val in tup if val is not None], i)
+            return
+        # Cameras whose moves into pose sets up to the lead apart may collide wait for each other.
+        barriers = {}
+        for collision in collision_eval_cam2cam_lead(start_index, end_index, self._pose_set_lead + 1):
+            barriers.setdefault(collision['ps_idx'], []).append(collision['cams'])
+        for i in range(start_index, end_index + 1):
+            for device_ids in barriers.get(i, []):
+                self._scheduler.add_barrier(device_ids)
+            payloads = []
+            for pose in pose_sets[i]:
+                if pose.position:
+                    self._scheduler.add_step(pose.position.device, [pose.position], i)
+                if pose.payload:
+                    payloads.append(pose.payload)
+            if self._sync_shutters:
+                self._scheduler.add_barrier(p[0].device for p in payloads)
+            for payload in payloads:
+                for action in payload:
+                    self._scheduler.add_step(action.device, [action], i)
+
+    def _is_packet_clear(self, actions) -> bool:
+        if not self.is_serial_port_connected:
+            return True
+        if self._is_streaming:
+            return all(self._is_device_clear(d, [a for a in actions if a.device == d])
+                for d in set(a.device for a in actions))
+        return self._clear_to_send
+
+    def _is_device_clear(self, device_id, actions) -> bool:
+        """Returns True if the device can take the actions now.
+
+        While streaming, moves are queued up to the stream depth per device.
+        Shutter and host commands, and commands that follow a shutter delay,
+        wait for the device to be idle, so poses are recorded where they were taken."""
+        dvc = self._get_device(device_id)
+        if dvc is None or not self.is_serial_port_connected:
+            return True
+        is_sync_needed = not self._is_streaming or self._ressetable_send_delay_ms > 0 or any(
+            a.atype in self.LENS_COMMANDS + self.F_STACK_COMMANDS or get_atype_kind(a.atype) != 'SER'
+            for a in actions)
+        if is_sync_needed:
+            return dvc.status == ComStatus.IDLE
+        if dvc.status == ComStatus.ERROR:
+            return False
+        with self._stream_lock:
+            pending_count = len(self._stream_pending.get(device_id, ()))
+        return not pending_count or pending_count + len(actions) <= self._stream_depth
+
+    def _is_device_idle(self, device_id) -> bool:
+        dvc = self._get_device(device_id)
+        return dvc is None or not self.is_serial_port_connected or dvc.status == ComStatus.IDLE
+
+    def _update_pose_set_progress(self, sent_pose_sets):
+        """Selects the lowest pose set with actions left to send; the ones before it are imaged."""
+        if self._work_type != WorkType.IMAGING:
+            return
+        sent = [i for i in sent_pose_sets if i >= 0]
+        current = self._scheduler.first_pose_set
+        if current < 0 and sent:
+            current = max(sent)
+        if current < 0:
+            if self._selected_pose_set >= 0:
+                self._imaged_pose_sets.append(self._selected_pose_set)
+            self.select_pose_set(-1)
+            return
+        if self._selected_pose_set < 0:
+            if not sent:
+                return
+            self.select_pose_set(min(sent))
+        while 0 <= self._selected_pose_set < current:
+            self._imaged_pose_sets.append(self._selected_pose_set)
+            self.select_pose_set(self._selected_pose_set + 1)
+
+    def _update_stream_pending(self, dvc, resp):
+        flags = resp.parse_sys_stat()
+        done = []
+        with self._stream_lock:
+            pending = self._stream_pending.get(dvc.device_id)
+            if not pending:
+                return
+            if resp.is_idle:
+                pending.clear()
+                self._stream_unacked.discard(dvc.device_id)
+            elif SysStatFlags.STA_CMD_AVAIL in flags or SysStatFlags.STA_MOTION_QUEUED in flags:
+                self._stream_unacked.discard(dvc.device_id)
+            elif dvc.device_id not in self._stream_unacked:
+                # Nothing is queued behind the executing command; the ones before it are done.
+                done = pending[:-1]
+                del pending[:-1]
+        for atype in done:
+            if atype in self.LENS_COMMANDS + self.F_STACK_COMMANDS:
+                self.sys_db.end_pose(dvc)
+
     def _send(self, *commands):
         """Send command to machine."""
-        current_pose_set = -1
-        if isinstance(commands, tuple) and list(map(type, commands)) == [int, list]:
-            current_pose_set = commands[0]
-            commands = commands[1]
         is_serial_needed = any(get_atype_kind(c.atype) == 'SER' for c in commands)
         is_serial_checked = not is_serial_needed or self.is_serial_port_connected
         is_edsdk_needed = any(get_atype_kind(c.atype) == 'EDS' for c in commands)
@@ -664,12 +839,19 @@ class COPISCore:
                         self._ressetable_send_delay_ms = self.project.options['post_shutter_delay_ms']
                     self.sys_db.start_pose(device, method, action, session_id = self._session_id)
                     
+            if self._is_streaming:
+                # Marked unacked first; a report without the command must not count it done.
+                with self._stream_lock:
+                    for command in commands:
+                        if get_atype_kind(command.atype) == 'SER':
+                            self._stream_unacked.add(command.device)
+                            self._stream_pending.setdefault(command.device, []).append(command.atype)
             if not is_edsdk_needed:
                 for dvc in dvcs:
                     if self._machine_busy_since is None:
                         self._machine_busy_since = datetime.now()
                     dvc.set_is_writing_ser() #why do we wait this long to se the is writing flag? What is the flag and how is it used?
-                self._serial.write(cmd_lines)
+                self._write_serial(commands)
             else:
                 serial_cmds = []
                 host_cmds = []
@@ -687,26 +869,14 @@ class COPISCore:
                                 for dvc in dvcs:
                                     if dvc.device_id in [c.device for c in serial_cmds]:
                                         dvc.set_is_writing_ser()
-                                self._serial.write('\r'.join([serialize_command(c) for c in serial_cmds]))
+                                self._write_serial(serial_cmds)
                                 serial_cmds = []
                             host_cmds.extend(chunk)
                 if serial_cmds:
-                    self._serial.write('\r'.join([serialize_command(c) for c in serial_cmds]))
+                    self._write_serial(serial_cmds)
                 if host_cmds:
                     self._process_host_commands(host_cmds)
 
-        if self._work_type == WorkType.IMAGING:
-            if self._pose_set_offset_start <= self._current_mainqueue_item and self._current_mainqueue_item <= self._pose_set_offset_end:
-                previous_pose_set = current_pose_set - 1
-                if previous_pose_set > -1:
-                    self._imaged_pose_sets.append(previous_pose_set)
-                self.select_pose_set(current_pose_set)
-            else:
-                if self._current_mainqueue_item == self._pose_set_offset_end + 1:
-                    self._imaged_pose_sets.append(current_pose_set)
-                self.select_pose_set(-1)
-            self._current_mainqueue_item = self._current_mainqueue_item + 1
-
     def _update_recent_projects(self, path) -> None:
         recent_projects = list(map(str.lower,
             self.config.application_settings.recent_projects))
@@ -736,9 +906,7 @@ class COPISCore:
         init_code = ActionType.G1 if self.is_machine_homed else ActionType.G92
         cmds = self._get_initialization_commands(init_code)
         if cmds:
-            self._mainqueue = []
-            self._mainqueue.extend(cmds)
-            self._mainqueue.extend(self._disengage_motors_commands)
+            self._queue_packets(cmds, self._disengage_motors_commands)
             self._work_type = WorkType.SET_READY
             self._keep_working = True
             self._clear_to_send = True
@@ -760,10 +928,7 @@ class COPISCore:
         header = self._get_move_commands(False, action.device)
         body = [action]
         footer = self._get_move_commands(True, action.device)
-        self._mainqueue = []
-        self._mainqueue.extend(header)
-        self._mainqueue.append(body)
-        self._mainqueue.extend(footer)
+        self._queue_packets(header, [body], footer)
         self._work_type = WorkType.JOGGING
         self._keep_working = True
         self._clear_to_send = True
@@ -810,8 +975,7 @@ class COPISCore:
                     self._do_g92_pan_optimize(device_id,pt[3])
         dispatcher.connect(self._on_device_ser_updated, signal='ntf_device_ser_updated')
         dispatcher.connect(self._on_device_eds_updated, signal='ntf_device_eds_updated')
-        self._mainqueue = []
-        self._mainqueue.extend(processed_poses)
+        self._queue_packets(processed_poses)
         self._work_type = WorkType.IMAGING
         self._keep_working = True
         self._clear_to_send = True
@@ -823,7 +987,7 @@ class COPISCore:
         if self._is_serial_enabled:
             return
         self._serial = serial_controller
-        self._serial.initialize(self.console, self._is_dev_env)
+        self._serial.initialize(self.console, self._is_dev_env, self.config.serial_backend)
         self._is_serial_enabled = True
 
     def terminate_serial(self):
@@ -841,7 +1005,33 @@ class COPISCore:
             self._last_machine_status = None
         if self._is_serial_enabled:
             self._serial.terminate()
+            self._routed_ports.clear()
             time.sleep(self.YIELD_TIMEOUT * 5)
+        if self.serial_log:
+            self.serial_log.flush()
+        self.telemetry.flush()
+
+    def _open_serial_log(self, path: str) -> SerialLog:
+        if not path:
+            return None
+        try:
+            return SerialLog(path)
+        except (OSError, ValueError) as err:
+            print_error_msg(self.console, f'Serial traffic is not logged; cannot open serial log {path}: {err}')
+            return None
+
+    def _open_telemetry(self, directory: str) -> TelemetryStore:
+        if not directory:
+            return TelemetryStore()
+        # Opened, not created, so this session's chunks go after earlier sessions'.
+        return TelemetryStore.open(directory, on_bad_chunk=lambda path, err: print_error_msg(
+            self.console, f'Skipped unreadable telemetry chunk {path}: {err}'))
+
+    def close_serial_log(self) -> None:
+        """Flushes and closes the binary serial log, if any; call on shutdown."""
+        if self.serial_log:
+            self._serial.attach_serial_log(None)
+            self.serial_log.close()
 
     def update_serial_ports(self) -> None:
         """Updates the serial ports list."""
@@ -872,13 +1062,29 @@ class COPISCore:
         else:
             connected = self._serial.open_port(baud)
             if connected:
-                self._connected_on = datetime.now()
                 port_name = next(filter(lambda p: p.is_connected and p.is_active, self.serial_port_list)).name
+                routed_ports = sorted({d.serial_port for d in self.project.devices
+                    if d.serial_port and d.serial_port != port_name})
+                for routed_port in routed_ports:
+                    if not self._serial.open_port(baud, routed_port):
+                        print_error_msg(self.console, f'Unable to connect to port {routed_port}.')
+                        connected = False
+                        break
+                    self._routed_ports.append(routed_port)
+            if connected:
+                self._connected_on = datetime.now()
                 print_info_msg(self.console, f'Connected to device {port_name}')
-                read_thread = threading.Thread(target=self._listener,name=f'read thread {port_name}')
-                self._read_threads.append(ReadThread(thread=read_thread, port=port_name))
-                read_thread.start()
+                for name in [port_name, *self._routed_ports]:
+                    if name != port_name:
+                        print_info_msg(self.console, f'Connected to device {name}')
+                    read_thread = threading.Thread(target=self._listener,name=f'read thread {name}')
+                    self._read_threads.append(ReadThread(thread=read_thread, port=name))
+                    read_thread.start()
             else:
+                for name in self._routed_ports:
+                    self._serial.close_port(name)
+                self._routed_ports.clear()
+                self._serial.close_port()
                 print_error_msg(self.console, 'Unable to connect to device.')
         self._is_new_connection = connected
         return connected
@@ -889,10 +1095,10 @@ class COPISCore:
         self._keep_working = False
         # self.is_serial_port_connected is a property and pylint can't see that for some reason.
         # pylint: disable=using-constant-test
+        port_name = self._get_active_serial_port_name()
         if self.is_serial_port_connected:
-            port_name = self._get_active_serial_port_name()
-            read_thread = next(filter(lambda t: t.port == port_name, self._read_threads))
-            if read_thread:
+            port_names = [port_name, *self._routed_ports]
+            for read_thread in [t for t in self._read_threads if t.port in port_names]:
                 read_thread.stop = True
                 if threading.current_thread() != read_thread.thread:
                     read_thread.thread.join()
@@ -902,29 +1108,76 @@ class COPISCore:
             self._working_thread = None
             self._last_machine_status = None
         if self.is_serial_port_connected:
+            for name in self._routed_ports:
+                self._serial.close_port(name)
             self._serial.close_port()
             time.sleep(self.YIELD_TIMEOUT * 5)
+        self._routed_ports.clear()
         self._is_new_connection = False
         self._connected_on = None
         print_info_msg(self.console, f'Disconnected from device {port_name}')
 
+    def replay_telemetry(self, telemetry: TelemetryStore = None, start: float = None,
+                         end: float = None, speed: float = 1.0) -> bool:
+        """Replays recorded position reports onto the devices, as if the machine sent them.
+
+        Replays this session's reports unless another store, like one opened
+        from a telemetry directory, is given. Not available while connected.
+        """
+        if self.is_serial_port_connected:
+            print_error_msg(self.console, 'Cannot replay telemetry while connected to the machine.')
+            return False
+        if self._replay_thread and self._replay_thread.is_alive():
+            print_error_msg(self.console, 'Telemetry replay already in progress.')
+            return False
+
+        telemetry = telemetry or self.telemetry
+
+        def replay():
+            print_info_msg(self.console, '**** Replaying telemetry ****')
+            for _, resp in telemetry.replay(start, end, speed=speed):
+                if self._stop_replay:
+                    break
+                dvc = self._get_device(resp.device_id)
+                if dvc:
+                    dvc.set_serial_response(resp)
+            print_info_msg(self.console, '**** Telemetry replay ended ****')
+
+        self._stop_replay = False
+        self._replay_thread = threading.Thread(target=replay, daemon=True, name='telemetry replay thread')
+        self._replay_thread.start()
+        return True
+
+    def stop_telemetry_replay(self) -> None:
+        """Stops a telemetry replay in progress."""
+        self._stop_replay = True
+        if self._replay_thread and threading.current_thread() != self._replay_thread:
+            self._replay_thread.join()
+        self._replay_thread = None
+
+    @locked
     def init_edsdk(self) -> None:
-        """Initializes the Canon EDSDK controller."""
-        if self._is_edsdk_enabled:
+        """Initializes the Canon EDSDK controller; a no-op if it already is."""
+        if self._edsdk is not None:
             return
-        self._edsdk = import_module('copis.coms.edsdk_controller')
-        self._edsdk.initialize(self.console)
-        #self._is_edsdk_enabled = self._edsdk.is_enabled
-        self._is_edsdk_enabled = self._edsdk._instance.is_enabled
+        edsdk = import_module('copis.coms.edsdk_controller')
+        backend = None
+        if self.config.edsdk_backend == 'mock':
+            from copis.mocks import MockEDSDK
+            backend = MockEDSDK([d.port for d in self.project.devices if d.port])
+        edsdk.initialize(self.console, backend)
+        edsdk.attach_sys_db(self.sys_db)
+        self._edsdk = edsdk
 
     def terminate_edsdk(self):
         """Disconnects all EDSDK connections; and terminates the Canon EDSDK."""
-        if self._is_edsdk_enabled:
+        if self._edsdk is not None and self._edsdk._instance.is_enabled:
             self._edsdk.terminate()
 
     def connect_edsdk(self, device_id):
         """Connects to the provided camera via EDSDK."""
         connected = False
+        self.init_edsdk()
         if not self._is_edsdk_enabled:
             print_error_msg(self.console, 'EDSDK is not enabled.')
         else:
@@ -937,7 +1190,7 @@ class COPISCore:
 
     def disconnect_edsdk(self):
         """Disconnects from the currently connect camera via EDSDK."""
-        if self._is_edsdk_enabled:
+        if self._edsdk is not None and self._edsdk._instance.is_enabled:
             return self._edsdk.disconnect()
         return True
 
@@ -1005,6 +1258,7 @@ class COPISCore:
         if not self._is_edsdk_enabled:
             print_error_msg(self.console, 'EDSDK is not enabled.')
         else:
+            from canon.EDSDKLib import EvfDriveLens
             if step_info < 0:
                 if step_info == -1:
                     step = EvfDriveLens.Near1
@@ -1211,8 +1465,7 @@ class COPISCore:
         if cmds:
             self._keep_working = True
             self._clear_to_send = True
-            self._mainqueue = []
-            self._mainqueue.append(cmds)
+            self._queue_packets([cmds])
             self._send_next()
             self._keep_working = False
 
@@ -1284,9 +1537,6 @@ class COPISCore:
         self.select_pose(-1)
         self.select_device(-1)
         self.select_proxy(-1)
-        self._pose_set_offset_start = -1
-        self._pose_set_offset_end = -1
-        self._current_mainqueue_item = -1
         self.select_pose_set(-1)
         self._imaged_pose_sets.clear()
         last_dvc_statuses = [(d.device_id, d.is_homed, d.serial_response)
@@ -1299,9 +1549,6 @@ class COPISCore:
         self.select_pose(-1)
         self.select_device(-1)
         self.select_proxy(-1)
-        self._pose_set_offset_start = -1
-        self._pose_set_offset_end = -1
-        self._current_mainqueue_item = -1
         self.select_pose_set(-1)
         self._imaged_pose_sets.clear()
         last_dvc_statuses = [(d.device_id, d.is_homed, d.serial_response)
@@ -1316,9 +1563,6 @@ class COPISCore:
         self.select_pose(-1)
         self.select_device(-1)
         self.select_proxy(-1)
-        self._pose_set_offset_start = -1
-        self._pose_set_offset_end = -1
-        self._current_mainqueue_item = -1
         self.select_pose_set(-1)
         self._imaged_pose_sets.clear()
         last_dvc_statuses = [(d.device_id, d.is_homed, d.serial_response) for d in self.project.devices]
@@ -1350,8 +1594,6 @@ class COPISCore:
         dispatcher.connect(self._on_device_ser_updated, signal='ntf_device_ser_updated')
         dispatcher.connect(self._on_device_eds_updated, signal='ntf_device_eds_updated')
         header = self._get_move_commands(True, *[dvc.device_id for dvc in self.project.devices])
-        #body = process_pose_sets()
-        body = []
         if start_index == None or start_index < 0 or start_index > len(self.project.pose_sets):
             start_index = 0
         if end_index == None or end_index < 0 or end_index > len(self.project.pose_sets):
@@ -1370,23 +1612,22 @@ class COPISCore:
                         pose.position_as_point5
                         pt = pose.position_as_point5       
                         self._do_g92_pan_optimize(device_id,pt[3])
-        for i, p_set in enumerate(pose_sets_to_process, start=start_index):
-            zipped = [(i, [val for val in tup if val is not None]) for tup in
-                zip_longest(*[p.get_seq_actions() for p in p_set])]
-            body.extend(zipped)
-            
+
         ### Revised footer to only send the disengage motors such that cams do not return to "ready" upon completion of an imaging session.
         # Uncomment next two lines and comment third to reenable.
         # footer = self._get_initialization_commands(ActionType.G1)
         # footer.extend(self._disengage_motors_commands)
         footer = self._disengage_motors_commands
-        self._mainqueue = []
-        self._mainqueue.extend(header)
-        self._mainqueue.extend(body)
-        self._mainqueue.extend(footer)
-        self._pose_set_offset_start = len(header)
-        self._pose_set_offset_end = self._pose_set_offset_start + len(body) - 1
-        self._current_mainqueue_item = 0
+        with self._stream_lock:
+            self._stream_pending.clear()
+            self._stream_unacked.clear()
+        self._queue_packets(header)
+        self._queue_pose_sets(start_index, end_index)
+        for packet in footer:
+            self._scheduler.add_packet(packet)
+        # Serialize the poses' commands before the first send; the send loop then reuses them.
+        serialize_commands(a for ps in pose_sets_to_process for pose in ps for a in pose.get_actions())
+        self._max_pose_set_lead = self._pose_set_lead if self._is_imaging_per_device else None
         self._work_type = WorkType.IMAGING
         self._keep_working = True
         self._clear_to_send = True
@@ -1419,10 +1660,7 @@ class COPISCore:
         body = _chunk_actions(batch_size, homing_actions)
         footer = self._get_initialization_commands(ActionType.G1)
         footer.extend(self._disengage_motors_commands)
-        self._mainqueue = []
-        self._mainqueue.extend(header)
-        self._mainqueue.extend(body)
-        self._mainqueue.extend(footer)
+        self._queue_packets(header, body, footer)
         self._work_type = WorkType.HOMING
         self._keep_working = True
         self._clear_to_send = True
@@ -1435,12 +1673,10 @@ class COPISCore:
         paused = self._is_machine_paused
         self._session_id = self.sys_db.last_session_id() +1
         if paused or self.pause_work():
-            self._mainqueue = []
+            self._scheduler.clear()
+            self._max_pose_set_lead = None
             self._is_machine_paused = False
             self._clear_to_send = True
-            self._pose_set_offset_start = -1
-            self._pose_set_offset_end = -1
-            self._current_mainqueue_item = -1
             self.select_pose_set(-1)
             self._imaged_pose_sets.clear()
             work_type_name = self.work_type_name
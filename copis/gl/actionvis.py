@@ -19,6 +19,7 @@ TODO: Add rendering functionality to more than just G0 and C0 actions.
 TODO: Signify via color or border when action is selected
 """
 from collections import defaultdict, namedtuple
+from typing import Dict
 import OpenGL
 from OpenGL.GL.VERSION.GL_1_5 import glGetBufferParameteriv
 
@@ -26,6 +27,7 @@ from OpenGL.GL import GLint
 from OpenGL.GL import GL_BUFFER_SIZE
 
 import numpy as np
+import wx
 
 from glm import vec3, vec4, mat4
 import glm
@@ -38,13 +40,27 @@ from OpenGL.GL import (
     glDrawArrays, glDrawArraysInstanced)
 from OpenGL.GLU import ctypes
 
-from copis.globals import ActionType, Point5
+from copis.globals import Point5
 from copis.helpers import (
     create_cuboid, create_device_features, dd_to_rad, fade_color,
-    get_action_args_values, get_heading, point5_to_mat4, shade_color, xyzpt_to_mat4)
-import json
+    get_action_args_values, point5_to_mat4, shade_color)
+from .path_geometry import DevicePath, PathGeometryWorker, build_path_geometry, to_gl_mats
+from .render_profiler import count_upload
+
 ArrayInfo = namedtuple('ArrayInfo', 'name key')
 
+
+def _array_buffer_data(data) -> None:
+    """Upload a glm.array or NumPy array to the bound GL_ARRAY_BUFFER."""
+    count_upload(data.nbytes)
+    if isinstance(data, glm.array):
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data.ptr, GL_STATIC_DRAW)
+    elif len(data) > 0:
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+    else:
+        glBufferData(GL_ARRAY_BUFFER, 0, ctypes.c_void_p(0), GL_STATIC_DRAW)
+
+
 class GLActionVis:
     """Manage action list rendering in a GLCanvas."""
 
@@ -71,10 +87,10 @@ class GLActionVis:
         self._num_points = 0
         self._num_devices = 0
 
+        self._paths: Dict[int, DevicePath] = {}
+        self._path_worker = PathGeometryWorker(self._on_paths_built)
+
         self._items = {
-            'line': defaultdict(list),
-            'midline': defaultdict(list),
-            'point': defaultdict(list),
             'device': defaultdict(list),
             'dvc_feature_vtx': defaultdict(list),
             'pt_feature_vtx': defaultdict(list)
@@ -179,22 +195,19 @@ class GLActionVis:
         """Update VAOs when action list changes."""
         self._vaos['line'].clear()
 
-        scale = glm.scale(mat4(), vec3(self._SCALE_FACTOR))
-
+        scale = np.array([self._SCALE_FACTOR] * 3 + [1.0], dtype=np.float32)
 
         # --- bind data for lines ---
 
-        for key, value in self._items['line'].items():  #'line' represents the motion lines connecting poses
-            #print("binding line")
-            #print(key)
-            #print(value)
+        for key, path in self._paths.items():  #'line' represents the motion lines connecting poses
             # ignore if 1 or fewer points
-            if len(value) <= 1:
+            if len(path.ids) <= 1:
                 continue
-            points = glm.array([vec3(mat[1][3]) for mat in value])
+            points = path.line_points
             vbo = glGenBuffers(1)
             glBindBuffer(GL_ARRAY_BUFFER, vbo)
-            glBufferData(GL_ARRAY_BUFFER, points.nbytes, points.ptr, GL_STATIC_DRAW)
+            glBufferData(GL_ARRAY_BUFFER, points.nbytes, points, GL_STATIC_DRAW)
+            count_upload(points.nbytes)
             vao = glGenVertexArrays(1)
             glBindVertexArray(vao)
             glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
@@ -204,24 +217,18 @@ class GLActionVis:
 
         # --- bind data for imaging direction indicator ---
 
-        for key, value in self._items['midline'].items():  #direction arrow along line
-            mats = glm.array([mat * scale for mat in value])
-            color = self.colors[key % len(self.colors)]
-            cols = glm.array([color] * len(value))
+        for key, path in self._paths.items():  #direction arrow along line
+            if len(path.midline_mats) == 0:
+                continue
+            mats = to_gl_mats(path.midline_mats * scale)
+            color = np.asarray(self.colors[key % len(self.colors)], dtype=np.float32)
+            cols = np.tile(color, (len(mats), 1))
             self._bind_directional_keys(('midline', key), mats, cols)
 
         # --- bind data for points ---
 
-        self._num_points = sum(len(i) for i in self._items['point'].values())
-        
-        #print(f'Num Points: {self._num_points}')
-        #print(f'_items:\n {self._items}')
-        j = json.dumps(self._items, indent=4, default=str)
-        #print(f'_items json:\n {j}')
-        #print(f'_vaos:\n {self._vaos}')
-        j = json.dumps(self._vaos, indent=4, default=str)
-        #print(f'_vaos json:\n {j}')        
-        #print('********************') 
+        self._num_points = sum(len(p.ids) for p in self._paths.values())
+
         if self._num_points > 0:
             sets = self.core.project.pose_sets
 
@@ -241,56 +248,35 @@ class GLActionVis:
 
                 for i in range(len(sets[set_index])):
                     imaged_poses.append(start + i)
-            
 
-            for key, value in self._items['point'].items(): #represents each camera pose 
-                #print("binding cameras")
-                #print(f'key={key}')
-                #print(f'value={value}')
-               
-                mats = glm.array([p[1] * scale for p in value])
-                feat_mats = []
+            for key, path in self._paths.items(): #represents each camera pose
+                if len(path.ids) == 0:
+                    continue
 
-                if any(p[2] for p in value):
-                    feat_mats = glm.array([p[1] * scale for p in value if p[2]])
+                mats = to_gl_mats(path.mats * scale)
+                feat_mats = mats[path.features]
 
                 color = shade_color(vec4(self.colors[key % len(self.colors)]), -0.3)
-                cols = glm.array([color] * len(value))
+                cols = np.tile(np.asarray(color, dtype=np.float32), (len(mats), 1))
 
-                feat_color_mods = glm.array([vec3()] * len(value))
+                feat_color_mods = np.zeros((len(feat_mats), 3), dtype=np.float32)
 
                 # If point is selected (individually or highlighted in a set), darken its color.
                 # If it's imaged, gray it out.
-                for i, v in enumerate(value):
-                    feat_offset = len(list(filter(lambda p: not p[2], value[:i])))
-
-                    # Un-offset ids.
-                    pose_index = v[0] - self._num_devices
-                    if selected_poses and pose_index in selected_poses:
-                        shade_factor = .6
-                        cols[i] = shade_color(vec4(cols[i]), shade_factor)
-
-                        if v[2]:
-                            feat_color_mods[i - feat_offset] = vec3(2, shade_factor, 0)
-                    elif imaged_poses and pose_index in imaged_poses:
-                        cols[i] = vec4(vec3(.75), 1)
-
-                        if v[2]:
-                            feat_color_mods[i - feat_offset] = vec3(3, 1, 1)
-                
-                ids = glm.array.from_numbers(ctypes.c_int, *(p[0] for p in value))  
-
-                #print(f'mats={mats}')
-                #print(f'cols={cols}')
-                #print(f'ids={ids}')
-                #print(f'feat_mats={feat_mats}')
-                #print(f'feat_color_mods={feat_color_mods}')
-
-                self._bind_vao_mat_col_id(('point', key), mats, cols, ids)  #point is the camera box
+                # Un-offset ids.
+                pose_indexes = path.ids - self._num_devices
+                selected = np.isin(pose_indexes, selected_poses)
+                imaged = ~selected & np.isin(pose_indexes, imaged_poses)
+
+                shade_factor = .6
+                cols[selected, :3] = np.minimum(1.0, cols[selected, :3] * (1 - shade_factor))
+                cols[imaged] = (.75, .75, .75, 1.0)
+                feat_color_mods[selected[path.features]] = (2.0, shade_factor, 0.0)
+                feat_color_mods[imaged[path.features]] = (3.0, 1.0, 1.0)
+
+                self._bind_vao_mat_col_id(('point', key), mats, cols, path.ids)  #point is the camera box
                 self._bind_device_features(('pt_feature', key), feat_mats, feat_color_mods) #pt_feature represents the "payload" or lens extension from camera box
-                    
-                #print('********************') 
-                
+
     def update_device_vaos(self) -> None:
         """Update VAO when device list changes."""
         self._num_devices = len(self.core.project.devices)
@@ -318,57 +304,35 @@ class GLActionVis:
                 self._bind_device_features(('dvc_feature', key), mats, glm.array(feat_color_mods))
 
     def update_poses(self) -> None:
-        """Update lines and poses when pose list changes.
+        """Update lines and poses when pose list changes; synchronously.
+
+        Supersedes any background build in progress.
+        """
+        self._path_worker.cancel()
+        self._paths = build_path_geometry(self.core.project.poses, self._num_devices,
+            self.core.LENS_COMMANDS + self.core.F_STACK_COMMANDS)
+        self.update_action_vaos()
 
-        Called from GLCanvas upon ntf_a_list_changed signal.
+    def request_update_poses(self) -> None:
+        """Rebuild lines and poses geometry on a background thread.
 
-        # TODO: process other pose ids
+        Called from GLCanvas upon ntf_a_list_changed signal. Safe to call from
+        any thread; only the resulting GPU upload happens on the GUI thread.
         """
+        self._path_worker.request(self.core.project.poses, self._num_devices,
+            self.core.LENS_COMMANDS + self.core.F_STACK_COMMANDS)
 
-        self._items['line'].clear()
-        self._items['point'].clear()
-        self._items['midline'].clear()
-        self._num_points = 0
+    def _on_paths_built(self, generation: int, paths: Dict[int, DevicePath]) -> None:
+        # Runs on the worker thread; hand the result to the GUI thread.
+        wx.CallAfter(self._apply_paths, generation, paths)
 
-        positions = defaultdict(list)
-
-#this is where I should probably be solvng the drawing of the payload.  opengl crashes when removing last payload of a given devices
-        for i, pose in enumerate(self.core.project.poses):
-            positions[pose.position.device].append(pose.position.args[:5])
-            for action in pose.get_actions():
-                if action.atype in (ActionType.G0, ActionType.G1):
-                    args = get_action_args_values(action.args)
-                    data = (i + self._num_devices, xyzpt_to_mat4(*args[:5]))
-                    #print(data)
-                    self._items['line'][action.device].append(data)
-                    self._items['point'][action.device].append(data + (False,))
-                    # For now draw the same GUI lens for focus stacks as for snaps and focuses.
-                elif action.atype in self.core.LENS_COMMANDS + self.core.F_STACK_COMMANDS:
-                    if action.device not in self._items['line'].keys():
-                        continue
-                    data = list(self._items['point'][action.device][-1])
-                    #print(tuple(data))
-                    data[2] = True
-                    self._items['point'][action.device][-1] = tuple(data)
-                else:
-                    # TODO: Draw a variation of the camera lens for focus stack and focus actions here.
-                    pass
-
-        for key, value in positions.items():
-            for i, args in enumerate(value):
-                if i < len(value) - 1:
-                    position = get_action_args_values(args)
-                    next_position = get_action_args_values(value[i + 1])
-
-                    start = vec3(position[:3])
-                    end = vec3(next_position[:3])
-                    midpoint = [sum(i)/2 for i in list(zip(start, end))]
-                    heading = get_heading(start, end)
-                    midpoint.extend(heading)
-
-                    self._items['midline'][key].append(xyzpt_to_mat4(*midpoint))
+    def _apply_paths(self, generation: int, paths: Dict[int, DevicePath]) -> None:
+        if not self._initialized or self._path_worker.is_stale(generation):
+            return
 
+        self._paths = paths
         self.update_action_vaos()
+        self.parent.dirty = True
 
     def update_devices(self) -> None:
         """Update device locations when device list changes.
@@ -431,7 +395,9 @@ class GLActionVis:
         # --- render points ---
             
         if self._num_points > 0:
-            for key, value in self._items['point'].items():
+            for key, path in self._paths.items():
+                if len(path.ids) == 0:
+                    continue
                 ###########
                 #print(f'render poses for device key={key}')
                 #print(f'render poses value={value}') #(idx, mat4, bool) the bool indicates if we render the camera extension (shutter) 
@@ -444,21 +410,17 @@ class GLActionVis:
                 #print(f'pt feature idx count ={index_count}')
                 #print(self._items['pt_feature_vtx'][key])
                 #when ALL poses for a camera lack the pt_feature trying to render them on some GPUs causes a crash, so we test to see if any features exist before adding them to the render pipeline
-                render_features = False   
-                for q in value:
-                    if q[2] == True:
-                       render_features = True
-                       break
-                if render_features: 
+                feature_count = int(np.count_nonzero(path.features))
+                if feature_count > 0:
                     glBindVertexArray(self._vaos['pt_feature'][key])
-                    glDrawArraysInstanced(GL_LINES, 0, index_count, len(value))
+                    glDrawArraysInstanced(GL_LINES, 0, index_count, feature_count)
                 ###########
 
                 glUseProgram(self.parent.shaders['instanced_model_color'])
                 glUniformMatrix4fv(0, 1, GL_FALSE, glm.value_ptr(proj))
                 glUniformMatrix4fv(1, 1, GL_FALSE, glm.value_ptr(view))
                 glBindVertexArray(self._vaos['point'][key])
-                glDrawArraysInstanced(GL_QUADS, 0, 24, len(value))
+                glDrawArraysInstanced(GL_QUADS, 0, 24, len(path.ids))
 
         # --- render path lines ---
 
@@ -471,16 +433,18 @@ class GLActionVis:
             color = self.colors[key % len(self.colors)]
             glUniform4fv(3, 1, glm.value_ptr(color))
             glBindVertexArray(value)
-            glDrawArrays(GL_LINE_STRIP, 0, len(self._items['line'][key]))
+            glDrawArrays(GL_LINE_STRIP, 0, len(self._paths[key].ids))
 
         # --- render imaging direction indicator ---
 
-        for key, value in self._items['midline'].items():
+        for key, path in self._paths.items():
+            if len(path.midline_mats) == 0:
+                continue
             glUseProgram(self.parent.shaders['instanced_model_color'])
             glUniformMatrix4fv(0, 1, GL_FALSE, glm.value_ptr(proj))
             glUniformMatrix4fv(1, 1, GL_FALSE, glm.value_ptr(view))
             glBindVertexArray(self._vaos['midline'][key])
-            glDrawArraysInstanced(GL_LINE_STRIP, 0, 24, len(value))
+            glDrawArraysInstanced(GL_LINE_STRIP, 0, 24, len(path.midline_mats))
 
         glBindVertexArray(0)
         glUseProgram(0)
@@ -506,15 +470,16 @@ class GLActionVis:
                 print("device key not; found render for picking")
 
         # render points for picking
-        for key, value in self._items['point'].items():
+        for key, path in self._paths.items():
+            if len(path.ids) == 0:
+                continue
             glBindVertexArray(self._vaos['point'][key])
-            glDrawArraysInstanced(GL_QUADS, 0, 24, len(value))
+            glDrawArraysInstanced(GL_QUADS, 0, 24, len(path.ids))
 
         glBindVertexArray(0)
         glUseProgram(0)
 
-    def _bind_vao_mat_col_id(self, vao_info: ArrayInfo, mat: glm.array,
-        col: glm.array, ids: glm.array):
+    def _bind_vao_mat_col_id(self, vao_info: ArrayInfo, mat, col, ids):
 
         name, key = vao_info
         if key not in self._vaos[name]:
@@ -523,7 +488,7 @@ class GLActionVis:
         vao = self._vaos[name][key]
         vbo = glGenBuffers(3)
         glBindBuffer(GL_ARRAY_BUFFER, vbo[0])
-        glBufferData(GL_ARRAY_BUFFER, mat.nbytes, mat.ptr, GL_STATIC_DRAW)
+        _array_buffer_data(mat)
         glBindVertexArray(vao)
 
         # Modelmats.
@@ -542,14 +507,14 @@ class GLActionVis:
 
         # Colors.
         glBindBuffer(GL_ARRAY_BUFFER, vbo[1])
-        glBufferData(GL_ARRAY_BUFFER, col.nbytes, col.ptr, GL_STATIC_DRAW)
+        _array_buffer_data(col)
         glVertexAttribPointer(7, 4, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
         glEnableVertexAttribArray(7)
         glVertexAttribDivisor(7, 1)
 
         # Ids for picking.
         glBindBuffer(GL_ARRAY_BUFFER, vbo[2])
-        glBufferData(GL_ARRAY_BUFFER, ids.nbytes, ids.ptr, GL_STATIC_DRAW)
+        _array_buffer_data(ids)
         # It should be GL_INT here, yet only GL_FLOAT works. huh??
         glVertexAttribPointer(8, 1, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
         glEnableVertexAttribArray(8)
@@ -560,7 +525,7 @@ class GLActionVis:
         #print(f'{name}({key}) vbo={vbo}')
         glDeleteBuffers(3, vbo)
 
-    def _bind_device_features(self, vao_info: ArrayInfo, mat: glm.array, color_mods: glm.array):
+    def _bind_device_features(self, vao_info: ArrayInfo, mat, color_mods):
         name, key = vao_info
         if key not in self._vaos[name]:
             print(f'key {key} not found')
@@ -572,12 +537,7 @@ class GLActionVis:
 
         glBindBuffer(GL_ARRAY_BUFFER, vbo[0])
 
-        if mat:
-            glBufferData(GL_ARRAY_BUFFER, mat.nbytes, mat.ptr, GL_STATIC_DRAW)
-        else:
-            glBufferData(GL_ARRAY_BUFFER, 0, ctypes.c_void_p(0), GL_STATIC_DRAW) ### I THINK THIS IS THE LINE FAILING ON GPU WHEN ALL FEATURES ARE EMPTY
-            #glDeleteBuffers(2, vbo) ##NREDIT
-            ##return                  ##NREDIT
+        _array_buffer_data(mat) ### I THINK THIS IS THE LINE FAILING ON GPU WHEN ALL FEATURES ARE EMPTY
         glBindVertexArray(vao)
 
        
@@ -603,11 +563,7 @@ class GLActionVis:
 
         # Color modifications.
         glBindBuffer(GL_ARRAY_BUFFER, vbo[1])
-        if color_mods:
-            glBufferData(GL_ARRAY_BUFFER, color_mods.nbytes, color_mods.ptr, GL_STATIC_DRAW)
-        else:
-            glBufferData(GL_ARRAY_BUFFER, 0, ctypes.c_void_p(0), GL_STATIC_DRAW) ### I THINK THIS IS THE LINE FAILING ON GPU WHEN ALL FEATURES ARE EMPTY
-   
+        _array_buffer_data(color_mods)
 
         #glBufferData(GL_ARRAY_BUFFER, color_mods.nbytes, color_mods.ptr, GL_STATIC_DRAW)
         glVertexAttribPointer(7, 3, GL_FLOAT, GL_FALSE, 12, ctypes.c_void_p(0))
@@ -626,12 +582,12 @@ class GLActionVis:
         # A feature vertex consists of 2 vec3s for 6 scalars
         return int(len(vertices) / 6)
 
-    def _bind_directional_keys(self, vao_info: ArrayInfo, mat: glm.array, col: glm.array):
+    def _bind_directional_keys(self, vao_info: ArrayInfo, mat, col):
         name, key = vao_info
         vao = self._vaos[name][key]
         vbo = glGenBuffers(2)
         glBindBuffer(GL_ARRAY_BUFFER, vbo[0])
-        glBufferData(GL_ARRAY_BUFFER, mat.nbytes, mat.ptr, GL_STATIC_DRAW)
+        _array_buffer_data(mat)
         glBindVertexArray(vao)
 
         # Modelmats.
@@ -652,7 +608,7 @@ class GLActionVis:
 
         # Colors.
         glBindBuffer(GL_ARRAY_BUFFER, vbo[1])
-        glBufferData(GL_ARRAY_BUFFER, col.nbytes, col.ptr, GL_STATIC_DRAW)
+        _array_buffer_data(col)
         glVertexAttribPointer(7, 4, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
         glEnableVertexAttribArray(7)
         glVertexAttribDivisor(7, 1)
@@ -37,6 +37,7 @@ from OpenGL.GLU import ctypes
 
 from copis.classes import CylinderObject3D, OBJObject3D, AABoxObject3D
 from copis.gl.glutils import get_cylinder_vertices, get_aabb_vertices
+from copis.gl.render_profiler import count_upload
 from copis.globals import MAX_ID
 
 
@@ -108,7 +109,8 @@ class GLAdHocs:
             # indices
             glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, vbo[2])
             glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices.ptr, GL_STATIC_DRAW)
-        
+            count_upload(vertices.nbytes + normals.nbytes + indices.nbytes)
+
             self._meshes.append(AdHocObj3D(color=vec4(0.1, 0.8, 0.8, 0.5), count=indices.length * 3, vao=vao, object_id=obj_id, selected=False))
             glBindVertexArray(0)
 
@@ -46,8 +46,9 @@ import copis.gl.shaders as shaderlib
 
 from copis.mathutils import arcball
 from copis.globals import MAX_ID
-from copis.helpers import print_error_msg
+from copis.helpers import print_error_msg, print_info_msg
 from .actionvis import GLActionVis
+from .render_profiler import RenderProfiler
 from .proxy_vis import GLProxyVis
 from .chamber import GLChamber
 from .viewcube import GLViewCube
@@ -132,6 +133,8 @@ class GLCanvas3D(glcanvas.GLCanvas):
         self._actionvis = GLActionVis(self)
         self._proxyvis = GLProxyVis(self)
         self._adhocs = GLAdHocs(self)    #NR
+        self._profiler = RenderProfiler(lambda msg: print_info_msg(self.core.console, msg))
+        self._profiler.enabled = self.core.config.profile_render
 
         # other values
         self._zoom = 1.1
@@ -168,6 +171,7 @@ class GLCanvas3D(glcanvas.GLCanvas):
         self._canvas.Bind(wx.EVT_ERASE_BACKGROUND, self.on_erase_background)
         self._canvas.Bind(wx.EVT_PAINT, self.on_paint)
         self._canvas.Bind(wx.EVT_SET_FOCUS, self.on_set_focus)
+        self._canvas.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
         
         
 
@@ -297,10 +301,10 @@ class GLCanvas3D(glcanvas.GLCanvas):
     def _update_volumes(self) -> None:
         """When action list is modified, calculate point positions.
 
-        Handles ntf_a_list_changed signal.
+        Handles ntf_a_list_changed signal. The geometry is built on a background
+        thread; actionvis marks the canvas dirty once it is uploaded.
         """
-        wx.CallAfter(self._actionvis.update_poses)
-        self._dirty = True
+        self._actionvis.request_update_poses()
 
     def _update_colors(self) -> None:
         wx.CallAfter(self._actionvis.update_action_vaos)
@@ -334,12 +338,11 @@ class GLCanvas3D(glcanvas.GLCanvas):
         wx.CallAfter(self._adhocs.update_objects)         #NR
         self._dirty = True                                      #NR
 
-    # @timing
     def render(self):
         """Render frame.
 
         First runs through a picking pass, clears the buffer, and then calls all
-        rendering sub-methods.
+        rendering sub-methods. Stages are timed when the profiler is enabled.
         """
         # ensure that canvas is current and initialized
         if not self._is_shown_on_screen() or not self._set_current():
@@ -349,26 +352,36 @@ class GLCanvas3D(glcanvas.GLCanvas):
         if not self.init_opengl():
             return
 
-        canvas_size = self.get_canvas_size()
-        glViewport(0, 0, canvas_size.width, canvas_size.height)
+        profiler = self._profiler
 
-        # run picking pass
-        self._picking_pass()
+        with profiler.frame():
+            canvas_size = self.get_canvas_size()
+            glViewport(0, 0, canvas_size.width, canvas_size.height)
 
-        # reset viewport as _picking_pass tends to mess with it
-        glViewport(0, 0, canvas_size.width, canvas_size.height)
+            # run picking pass
+            with profiler.stage('picking'):
+                self._picking_pass()
 
-        # clear buffers and render everything normally
-        self._render_background()
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            # reset viewport as _picking_pass tends to mess with it
+            glViewport(0, 0, canvas_size.width, canvas_size.height)
 
-        self._render_chamber()
-        self._render_actions_and_cameras()
-        self._render_objects()
-        self._render_adhocs() #NR
-        self._render_viewcube()
-    
-        self._canvas.SwapBuffers()
+            # clear buffers and render everything normally
+            self._render_background()
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+            with profiler.stage('chamber'):
+                self._render_chamber()
+            with profiler.stage('actions'):
+                self._render_actions_and_cameras()
+            with profiler.stage('proxies'):
+                self._render_objects()
+            with profiler.stage('adhocs'):
+                self._render_adhocs() #NR
+            with profiler.stage('viewcube'):
+                self._render_viewcube()
+
+            with profiler.stage('swap'):
+                self._canvas.SwapBuffers()
 
     # --------------------------------------------------------------------------
     # Event handlers
@@ -549,6 +562,12 @@ class GLCanvas3D(glcanvas.GLCanvas):
         else:
             self.render()
 
+    def on_destroy(self, event: wx.WindowDestroyEvent) -> None:
+        """On EVT_WINDOW_DESTROY, delete the profiler's GL queries."""
+        if event.GetEventObject() is self._canvas and self._gl_initialized and self._set_current():
+            self._profiler.release()
+        event.Skip()
+
     def on_set_focus(self, _) -> None:
         """On EVT_SET_FOCUS, try to refresh canvas."""
         self._refresh_if_shown_on_screen()
@@ -692,6 +711,10 @@ class GLCanvas3D(glcanvas.GLCanvas):
     def shaders(self) -> Dict[str, shaders.ShaderProgram]:
         return self._shaders
 
+    @property
+    def profiler(self) -> RenderProfiler:
+        return self._profiler
+
     @property
     def rot_quat(self) -> quat:
         return self._rot_quat
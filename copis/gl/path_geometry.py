@@ -0,0 +1,176 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Path visualization geometry, built off the GUI thread.
+
+Matrices are (N, 4, 4) float32 arrays indexed [instance, row, column]; the
+same layout NumPy exposes for a glm.array of mat4s. Use to_gl_mats to get
+column-major bytes for instance buffers.
+"""
+
+import threading
+
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+from copis.classes import Pose
+from copis.globals import ActionType
+from copis.helpers import get_action_args_values, get_heading_batch, xyzpt_to_mat4_batch
+
+
+class DevicePath(NamedTuple):
+    """Path geometry for one device."""
+    ids: np.ndarray             # (N,) int32 picking ids, offset by the device count.
+    mats: np.ndarray            # (N, 4, 4) float32 model matrices, one per move.
+    features: np.ndarray        # (N,) bool; True if the move is followed by a lens action.
+    midline_mats: np.ndarray    # (M, 4, 4) float32 direction indicator model matrices.
+
+    @property
+    def line_points(self) -> np.ndarray:
+        """Returns the (N, 3) line strip vertices through each move."""
+        return np.ascontiguousarray(self.mats[:, :3, 3])
+
+
+_MOVE_COMMANDS = (ActionType.G0, ActionType.G1)
+_CANCEL_CHECK_INTERVAL = 256
+
+
+def to_gl_mats(mats: np.ndarray) -> np.ndarray:
+    """Returns (N, 4, 4) row/column indexed matrices as contiguous
+    column-major float32 data, ready for glBufferData."""
+    return np.ascontiguousarray(np.asarray(mats, dtype=np.float32).transpose(0, 2, 1))
+
+
+def _midline_points(positions: List[List[float]]) -> np.ndarray:
+    # Midpoints between consecutive positions, headed from each start to its end.
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 5)
+    starts, ends = positions[:-1, :3], positions[1:, :3]
+    midpoints = np.empty((len(starts), 5), dtype=np.float64)
+    midpoints[:, :3] = (starts.astype(np.float64) + ends) / 2
+    midpoints[:, 3:] = get_heading_batch(starts, ends)
+    return midpoints
+
+
+def build_path_geometry(poses: List[Pose], id_offset: int, lens_commands: List[ActionType],
+                        is_cancelled: Callable[[], bool] = None) -> Dict[int, DevicePath]:
+    """Builds the path visualization geometry for a list of poses.
+
+    Returns None if is_cancelled reports True before the build is done.
+
+    Args:
+        poses: The flat pose list to build geometry for.
+        id_offset: Offset added to pose indexes to get picking ids.
+        lens_commands: Action types that mark a pose as taking a picture.
+        is_cancelled: Optional; polled periodically, to abandon stale builds.
+    """
+    cancelled = lambda: is_cancelled is not None and is_cancelled()
+
+    ids = defaultdict(list)
+    points = defaultdict(list)
+    features = defaultdict(list)
+    positions = defaultdict(list)
+
+    for i, pose in enumerate(poses):
+        if i % _CANCEL_CHECK_INTERVAL == 0 and cancelled():
+            return None
+
+        positions[pose.position.device].append(get_action_args_values(pose.position.args)[:5])
+
+        for action in pose.get_actions():
+            if action.atype in _MOVE_COMMANDS:
+                ids[action.device].append(i + id_offset)
+                points[action.device].append(get_action_args_values(action.args)[:5])
+                features[action.device].append(False)
+            # For now draw the same GUI lens for focus stacks as for snaps and focuses.
+            elif action.atype in lens_commands:
+                if action.device in features and features[action.device]:
+                    features[action.device][-1] = True
+
+    paths = {}
+
+    for key in set(points) | set(positions):
+        if cancelled():
+            return None
+
+        paths[key] = DevicePath(
+            ids=np.asarray(ids.get(key, []), dtype=np.int32),
+            mats=xyzpt_to_mat4_batch(points.get(key, [])),
+            features=np.asarray(features.get(key, []), dtype=bool),
+            midline_mats=xyzpt_to_mat4_batch(_midline_points(positions.get(key, []))))
+
+    return paths
+
+
+class PathGeometryWorker:
+    """Builds path geometry on a background thread.
+
+    Only the latest request is built; requests superseded while waiting are
+    dropped and a build in progress is abandoned when a newer one arrives.
+    Results are handed to on_built(generation, paths) on the worker thread.
+    """
+
+    def __init__(self, on_built: Callable[[int, Dict[int, DevicePath]], None]):
+        self._on_built = on_built
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._pending = None
+        self._thread = None
+
+    @property
+    def generation(self) -> int:
+        """Returns the generation of the latest request."""
+        return self._generation
+
+    def is_stale(self, generation: int) -> bool:
+        """Returns whether a newer request has superseded the given generation."""
+        return generation != self._generation
+
+    def request(self, poses: List[Pose], id_offset: int, lens_commands: List[ActionType]) -> int:
+        """Queues a build, superseding any pending or running one.
+        Returns the request's generation."""
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, poses, id_offset, lens_commands)
+            self._ensure_thread()
+            self._condition.notify()
+            return self._generation
+
+    def cancel(self) -> None:
+        """Abandons pending and running builds."""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._work, name='path geometry thread', daemon=True)
+            self._thread.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, poses, id_offset, lens_commands = self._pending
+                self._pending = None
+
+            paths = build_path_geometry(poses, id_offset, lens_commands,
+                lambda g=generation: self.is_stale(g))
+
+            if paths is not None and not self.is_stale(generation):
+                self._on_built(generation, paths)
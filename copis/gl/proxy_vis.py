@@ -19,7 +19,7 @@ TODO: on ntf_o_list_changed, update only vao's which have been modified, not eve
 """
 
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
 
 from glm import vec4
 import glm
@@ -36,6 +36,7 @@ from OpenGL.GLU import ctypes
 
 from copis.classes import CylinderObject3D, OBJObject3D, AABoxObject3D
 from copis.gl.glutils import get_cylinder_vertices, get_aabb_vertices
+from copis.gl.render_profiler import count_upload
 from copis.globals import MAX_ID
 
 
@@ -52,12 +53,17 @@ class ProxyMesh():
 class GLProxyVis:
     """Manage proxy object rendering in a GLCanvas."""
 
+    # Triangle budget per .obj proxy; larger meshes are drawn from their LOD chain.
+    _MAX_DISPLAY_TRIANGLES = 150000
+
     def __init__(self, parent):
         """Initialize GLActionVis with constructors."""
         self.parent = parent
         self.core = self.parent.core
         self._initialized = False
         self._meshes: List[ProxyMesh] = []
+        # .obj proxies sharing a source file and scale share one set of buffers.
+        self._obj_vaos: Dict[Tuple, Tuple[int, int]] = {}
 
     def init(self) -> bool:
         """Initialize for rendering."""
@@ -77,51 +83,65 @@ class GLProxyVis:
         self._meshes.clear()
 
         for index, object3d in enumerate(self.core.project.proxies):
-            vao = glGenVertexArrays(1)
-            glBindVertexArray(vao)
-
-            vertices: glm.array = None
-            normals: glm.array = None
-            indices: glm.array = None
-
             if object3d.__class__ == CylinderObject3D:
-                vertices, normals, indices = get_cylinder_vertices(object3d, 24)
+                vao, count = self._bind_mesh(*get_cylinder_vertices(object3d, 24))
 
             elif object3d.__class__ == OBJObject3D:
-                vertices = object3d.vertices
-                normals = object3d.normals
-                indices = object3d.indices
+                key = (object3d.filename, tuple(object3d.scale))
+                if key not in self._obj_vaos:
+                    lod = object3d.lod(self._MAX_DISPLAY_TRIANGLES)
+                    self._obj_vaos[key] = self._bind_mesh(lod.vertices, lod.normals, lod.indices)
+                vao, count = self._obj_vaos[key]
 
             elif object3d.__class__ == AABoxObject3D:
-                vertices, normals, indices = get_aabb_vertices(object3d)
+                vao, count = self._bind_mesh(*get_aabb_vertices(object3d))
 
             else:
                 continue
 
-            vbo = glGenBuffers(3)
-            # vertices
-            glBindBuffer(GL_ARRAY_BUFFER, vbo[0])
-            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices.ptr, GL_STATIC_DRAW)
-            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
-            glEnableVertexAttribArray(0)
-
-            # normals
-            glBindBuffer(GL_ARRAY_BUFFER, vbo[1])
-            glBufferData(GL_ARRAY_BUFFER, normals.nbytes, normals.ptr, GL_STATIC_DRAW)
-            glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
-            glEnableVertexAttribArray(1)
-
-            # indices
-            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, vbo[2])
-            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices.ptr, GL_STATIC_DRAW)
-
             self._meshes.append(ProxyMesh(
                 color=vec4(0.8, 0.8, 0.8, 0.85),
-                count=indices.length * 3,
+                count=count,
                 vao=vao,
                 object_id=index,
                 selected=False))
-            glBindVertexArray(0)
+
+    def _bind_mesh(self, vertices, normals, indices) -> Tuple[int, int]:
+        """Upload an indexed mesh to a new VAO; returns the VAO and its index count.
+
+        Accepts either glm.arrays or NumPy arrays.
+        """
+        if isinstance(indices, glm.array):
+            buffers = [(a.nbytes, a.ptr) for a in (vertices, normals, indices)]
+            count = indices.length * 3
+        else:
+            buffers = [(a.nbytes, a) for a in (vertices, normals, indices)]
+            count = indices.size
+
+        count_upload(sum(b[0] for b in buffers))
+
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+
+        vbo = glGenBuffers(3)
+        # vertices
+        glBindBuffer(GL_ARRAY_BUFFER, vbo[0])
+        glBufferData(GL_ARRAY_BUFFER, *buffers[0], GL_STATIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+
+        # normals
+        glBindBuffer(GL_ARRAY_BUFFER, vbo[1])
+        glBufferData(GL_ARRAY_BUFFER, *buffers[1], GL_STATIC_DRAW)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+
+        # indices
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, vbo[2])
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, *buffers[2], GL_STATIC_DRAW)
+
+        glBindVertexArray(0)
+        return vao, count
 
     def render(self) -> None:
         """Render proxy objects to canvas with a diffuse shader."""
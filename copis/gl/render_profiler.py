@@ -0,0 +1,215 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Opt-in render loop instrumentation.
+
+Times each render stage on the CPU and, where the driver supports
+GL_TIME_ELAPSED queries, on the GPU. Also counts bytes handed to
+glBufferData via count_upload. A summary is periodically sent to a sink.
+"""
+
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from OpenGL.GL import (
+    GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE, GL_TIME_ELAPSED,
+    glBeginQuery, glDeleteQueries, glEndQuery, glGenQueries,
+    glGetQueryObjectui64v, glGetQueryObjectuiv)
+
+
+_active = None
+
+
+def count_upload(nbytes: int) -> None:
+    """Adds to the active profiler's upload counters; a no-op when profiling is off."""
+    if _active is not None:
+        _active.add_upload(nbytes)
+
+
+class _StageStats:
+    __slots__ = ('cpu', 'gpu')
+
+    def __init__(self, window: int):
+        self.cpu = deque(maxlen=window)
+        self.gpu = deque(maxlen=window)
+
+
+class RenderProfiler:
+    """Collects per-stage render timings and upload counters.
+
+    Args:
+        sink: Called with a one-line summary every report_interval seconds.
+        report_interval: Optional; seconds between summaries.
+        window: Optional; number of most recent samples averaged per stage.
+
+    Attributes:
+        enabled: A boolean; when False, stage() and frame() cost next to nothing.
+        gpu_timing: Read only; True if GL_TIME_ELAPSED queries are in use.
+    """
+
+    def __init__(self, sink: Callable[[str], None], report_interval: float = 5.0,
+                 window: int = 120) -> None:
+        self._sink = sink
+        self._report_interval = report_interval
+        self._window = window
+
+        self._enabled = False
+        self._gpu_timing = None
+        self._free_queries: List[int] = []
+        self._pending_queries = deque()
+        self._stages: Dict[str, _StageStats] = OrderedDict()
+
+        self._reset()
+
+    def _reset(self) -> None:
+        # Stages are emptied, not replaced; queries still in flight report into the next window.
+        for stats in self._stages.values():
+            stats.cpu.clear()
+            stats.gpu.clear()
+
+        self._frame_times = deque(maxlen=self._window)
+        self._frame_count = 0
+        self._upload_count = 0
+        self._upload_bytes = 0
+        self._last_report = perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        global _active
+
+        if value == self._enabled:
+            return
+
+        self._enabled = value
+        self._reset()
+        _active = self if value else None
+
+    @property
+    def gpu_timing(self) -> bool:
+        return bool(self._gpu_timing)
+
+    def add_upload(self, nbytes: int) -> None:
+        """Counts a buffer upload of nbytes."""
+        self._upload_count += 1
+        self._upload_bytes += int(nbytes)
+
+    @contextmanager
+    def frame(self):
+        """Times a whole frame. Must be entered with the GL context current."""
+        if not self._enabled:
+            yield
+            return
+
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._frame_times.append(perf_counter() - start)
+            self._frame_count += 1
+            self._collect_queries()
+
+            if perf_counter() - self._last_report >= self._report_interval:
+                self._sink(self.summary())
+                self._reset()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times a render stage. Stages must not nest."""
+        if not self._enabled:
+            yield
+            return
+
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = _StageStats(self._window)
+
+        query = self._begin_query()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            stats.cpu.append(perf_counter() - start)
+            if query is not None:
+                glEndQuery(GL_TIME_ELAPSED)
+                self._pending_queries.append((stats, query))
+
+    def summary(self) -> str:
+        """Returns a one-line summary of the collected samples; times in ms."""
+        avg_ms = lambda samples: sum(samples) / len(samples) * 1000 if samples else 0.0
+        elapsed = max(perf_counter() - self._last_report, 1e-9)
+
+        parts = [f'Render: {self._frame_count / elapsed:.1f} fps, '
+                 f'frame {avg_ms(self._frame_times):.2f}ms']
+
+        for name, stats in self._stages.items():
+            part = f'{name} {avg_ms(stats.cpu):.2f}'
+            if self._gpu_timing:
+                part += f'/{avg_ms(stats.gpu):.2f}'
+            parts.append(part)
+
+        parts.append(f'uploads {self._upload_count} ({self._upload_bytes / 1024:.1f} KiB)')
+        legend = '(cpu/gpu ms)' if self._gpu_timing else '(cpu ms)'
+        return ' | '.join(parts) + f' {legend}'
+
+    def release(self) -> None:
+        """Deletes GL query objects. Must be called with the GL context current."""
+        queries = self._free_queries + [q for _, q in self._pending_queries]
+        self._free_queries.clear()
+        self._pending_queries.clear()
+
+        if queries:
+            glDeleteQueries(len(queries), queries)
+
+    def _begin_query(self):
+        if self._gpu_timing is False:
+            return None
+
+        try:
+            if not self._free_queries:
+                self._free_queries.extend(np.atleast_1d(glGenQueries(8)).tolist())
+            query = self._free_queries.pop()
+            glBeginQuery(GL_TIME_ELAPSED, query)
+        except Exception:
+            # Timer queries need OpenGL 3.3 or ARB_timer_query; fall back to CPU timing only.
+            self._gpu_timing = False
+            return None
+
+        self._gpu_timing = True
+        return query
+
+    def _collect_queries(self) -> None:
+        # Results trail by a frame or two; only read those that are ready, to avoid stalls.
+        available = np.zeros(1, dtype=np.uint32)
+        result = np.zeros(1, dtype=np.uint64)
+
+        while self._pending_queries:
+            stats, query = self._pending_queries[0]
+            glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE, available)
+
+            if not available[0]:
+                break
+
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, result)
+            stats.gpu.append(int(result[0]) / 1e9)
+            self._pending_queries.popleft()
+            self._free_queries.append(query)
@@ -145,6 +145,11 @@ class ActionType(Enum):
     NONE = auto()
 
 
+# Action types that take a single picture, and those that take a focus stack of pictures.
+SNAP_ACTION_TYPES = (ActionType.C0, ActionType.EDS_SNAP)
+F_STACK_ACTION_TYPES = (ActionType.C10, ActionType.HST_F_STACK, ActionType.EDS_F_STACK)
+
+
 @unique
 class DebugEnv(Enum):
     """Debug environment flags."""
@@ -286,7 +286,9 @@ class dlg_config ( wx.Dialog ):
         self.core.config._log_serial_tx = self.m_chk_db_log_tx.GetValue()
         serial_log_opts = {'log_tx': self.core.config.log_serial_tx, 'log_rx': self.core.config.log_serial_rx }
         self.core._serial.attach_sys_db(self.core.sys_db, serial_log_opts)
-        self.core._edsdk.attach_sys_db(self.core.sys_db)
+        # Otherwise EDSDK attaches the current database when it is first initialized.
+        if self.core._edsdk is not None:
+            self.core._edsdk.attach_sys_db(self.core.sys_db)
         
         
         pfl_path = self.m_file_profile.GetPath()
@@ -794,6 +794,7 @@ class MainWindow(wx.Frame):
         pos = self.GetPosition()
         size = self.GetSize()
         self.core.config.update_window_state(WindowState(pos.x, pos.y, size.x, size.y, self.IsMaximized()))
+        self.core.close_serial_log()
         self._mgr.UnInit()
         self.Destroy()
 
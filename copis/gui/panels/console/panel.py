@@ -29,10 +29,17 @@ from copis.gui.wxutils import create_scaled_bitmap
 class ConsolePanel(wx.Panel):
     """Console panel.
 
+    Drains the core's console output buffer on a timer, appending each batch
+    with a single call and trimming the oldest text past _MAX_CHARS.
+
     Args:
         parent: Pointer to a parent wx.Frame.
     """
 
+    _FLUSH_INTERVAL_MS = 100
+    _MAX_BATCH_SIZE = 2000
+    _MAX_CHARS = 1000000
+
     def __init__(self, parent, *args, **kwargs) -> None:
         """Initialize ConsolePanel with constructors."""
         super().__init__(parent, style=wx.BORDER_DEFAULT)
@@ -51,6 +58,11 @@ class ConsolePanel(wx.Panel):
         self.Layout()
         self._cmd_processor = _CommandProcessor(self.core)
 
+        self._flush_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_flush_timer, self._flush_timer)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+        self._flush_timer.Start(self._FLUSH_INTERVAL_MS)
+
         # Bind listeners.
         dispatcher.connect(self.on_notification, signal='ntf_a_list_changed')
         dispatcher.connect(self.on_notification, signal='ntf_d_list_changed')
@@ -64,12 +76,6 @@ class ConsolePanel(wx.Panel):
         dispatcher.connect(self.on_notification, signal='ntf_o_selected')
         dispatcher.connect(self.on_notification, signal='ntf_o_deselected')
 
-        dispatcher.connect(self.on_notification, signal='msg_error')
-        dispatcher.connect(self.on_notification, signal='msg_info')
-        dispatcher.connect(self.on_notification, signal='msg_debug')
-        dispatcher.connect(self.on_notification, signal='msg_raw')
-        dispatcher.connect(self.on_notification, signal='msg_echo')
-
     def init_gui(self) -> None:
         """Initialize gui elements."""
         self._console = wx.TextCtrl(self, style=wx.TE_MULTILINE|wx.TE_READONLY|wx.TE_CHARWRAP)
@@ -113,19 +119,45 @@ class ConsolePanel(wx.Panel):
         self._console_writer.ChangeValue('')
 
     def print(self, msg: str) -> None:
-        """Add message to console."""
+        """Add message to console. Safe to call from any thread."""
+        self.core.console.write(msg)
+
+    def on_flush_timer(self, _event: wx.TimerEvent = None) -> None:
+        """Append buffered console output to the console text control."""
+        messages, dropped = self.core.console.drain(self._MAX_BATCH_SIZE)
+
+        if not (messages or dropped):
+            return
+
+        lines = [get_notification_msg(s, m) if s else m for s, m in messages]
+
+        if dropped:
+            lines.insert(0, f'... {dropped} message{"s" if dropped != 1 else ""} dropped ...')
+
+        text = '\n'.join(lines) + '\n'
+
+        if len(text) > self._MAX_CHARS:
+            text = text[-self._MAX_CHARS:]
 
         try:
-            if self._console:
-                # Call the specified function after the current and pending event handlers have been completed.
-                # This is good for making GUI method calls from non-GUI threads, in order to prevent hangs.
-                wx.CallAfter(self._console.AppendText, f'{msg}\n')
-            else:
-                print(msg)
+            self._console.AppendText(text)
+            excess = self._console.GetLastPosition() - self._MAX_CHARS
+
+            if excess > 0:
+                # Trim whole lines from the top.
+                head = self._console.GetRange(0, min(excess + 1024, self._console.GetLastPosition()))
+                cut = head.find('\n', excess)
+                self._console.Remove(0, cut + 1 if cut >= 0 else excess)
         except Exception as err:
-            print(f'intended to print: {msg}')
+            print(f'intended to print: {text}')
             print(f'instead, got error : {err.args[0]}')
 
+    def on_destroy(self, event: wx.WindowDestroyEvent) -> None:
+        """Stop the flush timer when the panel goes away."""
+        if event.GetEventObject() is self:
+            self._flush_timer.Stop()
+        event.Skip()
+
     def on_notification(self, signal: str, message: str = '') -> None:
         """Print any pydispatch signals."""
         notification = message
@@ -149,7 +181,4 @@ class ConsolePanel(wx.Panel):
 
                 notification = get_notification_msg(signal, get_timestamped(message))
                 self.print(notification)
-        else:
-            notification = get_notification_msg(signal, message)
-            self.print(notification)
 
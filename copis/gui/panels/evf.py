@@ -15,58 +15,100 @@
 
 """EvfPanel class."""
 
-import io
+import threading
 import wx
-from PIL import Image
+
+from copis.coms.evf_stream import EvfStream
+from copis.helpers import print_error_msg
 
 
 class EvfPanel(wx.Panel):
     """Electronic viewfinder panel. Shows live feed of connected device.
 
+    Frames are fetched and decoded by an EvfStream on a background thread;
+    the panel only turns the latest decoded frame into a bitmap and blits it.
+
     Args:
         parent: Pointer to a parent wx.Frame.
     """
 
+    _CONNECTION_CHECK_MS = 250
+    _STOP_TIMEOUT = 6.0
+
     def __init__(self, parent, *args, **kwargs):
         """Initializes EvfPanel with constructors."""
         super().__init__(parent, style=wx.BORDER_THEME, *args, **kwargs)
         self._parent = parent
         self.BackgroundStyle = wx.BG_STYLE_CUSTOM
-        self.timer = wx.CallLater(10, self._update)
+        self.timer = wx.CallLater(self._CONNECTION_CHECK_MS, self._update)
+
+        self._bitmap = None
+        self._frame_pending = threading.Event()
+        self._last_error = None
+        self._stream = EvfStream(self._parent.core.download_edsdk_evf_data,
+            on_frame=self._on_frame_ready, on_error=self._on_stream_error)
+        self._stream.set_size(*self.Size)
 
         self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, self._on_size)
         self.Bind(wx.EVT_LEFT_DCLICK, self._on_left_dclick)
 
         self._parent.core.start_edsdk_live_view()
+        self._stream.start()
         self._update()
 
     def _update(self):
         if self:
             if self._parent.core.is_edsdk_connected:
-                self.Refresh()
-                self.Update()
                 self.timer.Start()
             else:
                 self._parent.remove_evf_pane()
 
-    def _get_bitmap(self):
-        img_bytes = self._parent.core.download_edsdk_evf_data()
+    def _on_frame_ready(self):
+        # Producer thread; coalesce notifications until the GUI has taken the frame.
+        if not self._frame_pending.is_set():
+            self._frame_pending.set()
+            wx.CallAfter(self._show_latest_frame)
+
+    def _on_stream_error(self, err):
+        msg = err.args[0] if err.args else str(err)
+
+        if msg != self._last_error:
+            self._last_error = msg
+            print_error_msg(self._parent.core.console, f'Live view error: {msg}')
 
-        if img_bytes:
-            img = Image.open(io.BytesIO(img_bytes))
-            img = img.resize(self.Size)
-            width, height = img.size
-            buffer = img.convert('RGB').tobytes()
-            bitmap = wx.Bitmap.FromBuffer(width, height, buffer)
-            return bitmap
+    def _show_latest_frame(self):
+        self._frame_pending.clear()
 
-        return None
+        if not self:
+            return
+
+        frame = self._stream.take()
+
+        if frame:
+            self._last_error = None
+            self._bitmap = wx.Bitmap.FromBuffer(frame.width, frame.height, frame.data)
+            self.Refresh(False)
 
     def _on_paint(self, _):
-        bitmap = self._get_bitmap()
-        if bitmap:
-            dc = wx.AutoBufferedPaintDC(self)
-            dc.DrawBitmap(bitmap, 0, 0)
+        dc = wx.AutoBufferedPaintDC(self)
+
+        if self._bitmap:
+            dc.DrawBitmap(self._bitmap, 0, 0)
+
+            stats = self._stream.stats
+            dc.SetTextForeground(wx.WHITE)
+            dc.SetTextBackground(wx.BLACK)
+            dc.SetBackgroundMode(wx.BRUSHSTYLE_SOLID)
+            dc.DrawText(f'{stats.fps:.1f} fps | decode {stats.decode_ms:.1f} ms | '
+                        f'fetch {stats.fetch_ms:.1f} ms | dropped {stats.dropped_count}', 4, 4)
+        else:
+            dc.SetBackground(wx.BLACK_BRUSH)
+            dc.Clear()
+
+    def _on_size(self, event):
+        self._stream.set_size(*event.Size)
+        event.Skip()
 
     def _on_left_dclick(self, _):
         self._parent.core.do_evf_edsdk_focus()
@@ -74,5 +116,6 @@ class EvfPanel(wx.Panel):
     def on_close(self):
         """Handles EVF panel close event."""
         self.timer.Stop()
+        self._stream.stop(self._STOP_TIMEOUT)
         self._parent.core.end_edsdk_live_view()
         self._parent.core.disconnect_edsdk()
@@ -31,6 +31,8 @@ class DefaultPanel(wx.Panel):
     _PRE_SHUTTER_DELAY_KEY = 'pre_shutter_delay_ms'
     _BUSY_BUS_POLLING_INTERVAL_KEY = 'busy_bus_polling_interval_ms'
     _DISABLE_IDLE_MOTORS_KEY = 'disable_idle_motors'
+    _PER_DEVICE_QUEUES_KEY = 'per_device_queues'
+    _SYNC_SHUTTERS_KEY = 'sync_shutters'
 
     def __init__(self, parent) -> None:
         super().__init__(parent, style=wx.BORDER_NONE)
@@ -53,9 +55,12 @@ class DefaultPanel(wx.Panel):
     def _on_checkbox_toggled(self, event: wx.CommandEvent):
         ctrl = event.GetEventObject()
 
-        if ctrl.Name == self._DISABLE_IDLE_MOTORS_KEY:
+        if ctrl.Name in (self._DISABLE_IDLE_MOTORS_KEY, self._PER_DEVICE_QUEUES_KEY, self._SYNC_SHUTTERS_KEY):
             self._core.project.update_imaging_option(ctrl.Name, ctrl.Value)
 
+        if ctrl.Name == self._PER_DEVICE_QUEUES_KEY:
+            self._sync_shutters_opt.Enable(ctrl.Value)
+
     def _on_optimize_pan_angles_btn_clicked(self, _):
         self._core.optimize_all_poses_pan_angles()
 
@@ -71,6 +76,8 @@ class DefaultPanel(wx.Panel):
             pre_shutter_delay = 0
             busy_bus_polling_interval = 0
             disable_idle_motors = True
+            per_device_queues = False
+            sync_shutters = False
 
             if self._POST_SHUTTER_DELAY_KEY in self._core.project.options:
                 post_shutter_delay = self._core.project.options[self._POST_SHUTTER_DELAY_KEY]
@@ -86,10 +93,19 @@ class DefaultPanel(wx.Panel):
             else:
                 self._core.project.set_default_imaging_option(self._DISABLE_IDLE_MOTORS_KEY, disable_idle_motors)
 
+            if self._PER_DEVICE_QUEUES_KEY in self._core.project.options:
+                per_device_queues = self._core.project.options[self._PER_DEVICE_QUEUES_KEY]
+
+            if self._SYNC_SHUTTERS_KEY in self._core.project.options:
+                sync_shutters = self._core.project.options[self._SYNC_SHUTTERS_KEY]
+
             self._post_shutter_delay.num_value = post_shutter_delay
             self._pre_shutter_delay.num_value = pre_shutter_delay
             self._busy_bus_polling_interval.num_value = busy_bus_polling_interval
             self._disable_idle_motors_opt.SetValue(disable_idle_motors)
+            self._per_device_queues_opt.SetValue(per_device_queues)
+            self._sync_shutters_opt.SetValue(sync_shutters)
+            self._sync_shutters_opt.Enable(per_device_queues)
 
         self.Sizer.RepositionChildren(self.Sizer.MinSize)
         self._parent.SetVirtualSize(self._parent.Sizer.MinSize)
@@ -107,6 +123,9 @@ class DefaultPanel(wx.Panel):
         disable_idle_motor_options_grid = wx.FlexGridSizer(1, 1, 0, 0)
         disable_idle_motor_options_grid.AddGrowableCol(0)
 
+        queue_options_grid = wx.FlexGridSizer(2, 1, 0, 0)
+        queue_options_grid.AddGrowableCol(0)
+
         self._post_shutter_delay = FancyTextCtrl(self, size=(80, -1), num_value=0, max_precision=0,
             name=self._POST_SHUTTER_DELAY_KEY, default_unit=self._TIME_UNIT, unit_conversions=time_units)
         self._pre_shutter_delay = FancyTextCtrl(self, size=(80, -1), num_value=0, max_precision=0,
@@ -114,6 +133,8 @@ class DefaultPanel(wx.Panel):
         self._busy_bus_polling_interval = FancyTextCtrl(self, size=(80, -1), num_value=0, max_precision=0,
             name=self._BUSY_BUS_POLLING_INTERVAL_KEY, default_unit=self._TIME_UNIT, unit_conversions=time_units)
         self._disable_idle_motors_opt = wx.CheckBox(self, wx.ID_ANY, label='Disable idle motors', name=self._DISABLE_IDLE_MOTORS_KEY)
+        self._per_device_queues_opt = wx.CheckBox(self, wx.ID_ANY, label='Move devices independently', name=self._PER_DEVICE_QUEUES_KEY)
+        self._sync_shutters_opt = wx.CheckBox(self, wx.ID_ANY, label='Synchronize shutters', name=self._SYNC_SHUTTERS_KEY)
         self.Bind(wx.EVT_CHECKBOX, self._on_checkbox_toggled)
         self._optimize_pan_angles_btn = wx.Button(self, label='Optimize Pan Angles')
         self.Bind(wx.EVT_BUTTON, self._on_optimize_pan_angles_btn_clicked)
@@ -131,6 +152,11 @@ class DefaultPanel(wx.Panel):
 
         disable_idle_motor_options_grid.Add(self._disable_idle_motors_opt, 0, wx.EXPAND|wx.ALIGN_CENTER_VERTICAL|wx.LEFT, 3)
 
+        queue_options_grid.AddMany([
+            (self._per_device_queues_opt, 0, wx.EXPAND|wx.ALIGN_CENTER_VERTICAL|wx.LEFT, 3),
+            (self._sync_shutters_opt, 0, wx.EXPAND|wx.ALIGN_CENTER_VERTICAL|wx.LEFT|wx.TOP, 3)
+        ])
+
         pan_angles_options_grid.Add(self._optimize_pan_angles_btn, 0, wx.EXPAND|wx.ALIGN_RIGHT, 0)
 
         self._options_box_sizer.Add(shutter_delay_options_grid, 0, wx.ALL|wx.EXPAND, 5)
@@ -138,6 +164,8 @@ class DefaultPanel(wx.Panel):
         self._options_box_sizer.Add(busy_bus_polling_options_grid, 0, wx.ALL|wx.EXPAND, 5)
         self._options_box_sizer.Add(wx.StaticLine(self, style=wx.LI_HORIZONTAL), 0, wx.EXPAND, 0)
         self._options_box_sizer.Add(disable_idle_motor_options_grid, 0, wx.ALL|wx.EXPAND, 5)
+        self._options_box_sizer.Add(wx.StaticLine(self, style=wx.LI_HORIZONTAL), 0, wx.EXPAND, 0)
+        self._options_box_sizer.Add(queue_options_grid, 0, wx.ALL|wx.EXPAND, 5)
         self._options_box_sizer.Add(wx.StaticLine(self, style=wx.LI_HORIZONTAL), 0, wx.BOTTOM|wx.EXPAND, 3)
         self._options_box_sizer.Add(pan_angles_options_grid, 0, wx.RIGHT|wx.EXPAND, 4)
 
@@ -15,7 +15,6 @@
 
 """COPIS path section of stats panel."""
 
-from itertools import groupby
 import wx
 
 from pydispatch import dispatcher
@@ -95,37 +94,19 @@ class PathStats(wx.Panel):
         self._build_panel()
 
     def _update_path_stats(self):
-        c_key = lambda p: p.position.device
-
-        def get_arg_value(arg_col, arg_key):
-            arg = next(filter(lambda a, k=arg_key: a[0] == k, arg_col), 0)
-            return float(arg[1]) if arg and arg[1] else arg
-
         def get_counts_lbl(p_count, i_count):
             return f'{p_count or "No"} ({i_count} image{"s" if i_count != 1 else ""})'
 
-        count_imgs = lambda p_list: len([a for p in p_list for a in p.get_actions() if a.atype in self._core.SNAP_COMMANDS])
-
-        count_stack_imgs = lambda p_list: sum([get_arg_value(a.args, 'V') + 1 for p in p_list for a in p.get_actions() if a.atype in self._core.F_STACK_COMMANDS])
-
-        sets = self._core.project.pose_sets
-
-        if sets:
-            poses = sorted(self._core.project.poses, key=c_key)
-            groups = groupby(poses, c_key)
-
-            pose_count = len(poses)
-            img_count = int(count_imgs(poses) + count_stack_imgs(poses))
+        path_stats = self._core.project.path_stats
 
-            self._set_count_caption.SetLabel(str(len(sets)))
-            self._pose_count_caption.SetLabel(get_counts_lbl(pose_count, img_count))
+        if self._core.project.pose_sets:
+            self._set_count_caption.SetLabel(str(path_stats.set_count))
+            self._pose_count_caption.SetLabel(
+                get_counts_lbl(path_stats.pose_count, path_stats.image_count))
 
-            for key, group in groups:
-                if key in [d.device_id for d in self._core.project.devices]:
-                    poses = list(group)
-                    pose_count = len(poses)
-                    img_count = count_imgs(poses) + count_stack_imgs(poses)
-                    self._dvc_captions[key].SetLabel(get_counts_lbl(pose_count, img_count))
+            for key, caption in self._dvc_captions.items():
+                dvc_stats = path_stats.get_device_stats(key)
+                caption.SetLabel(get_counts_lbl(dvc_stats.pose_count, dvc_stats.image_count))
 
     def _estimate_execution_time(self):
         # TODO
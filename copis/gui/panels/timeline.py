@@ -28,6 +28,7 @@ from glm import vec3
 from copis.classes.action import Action
 from copis.classes.pose import Pose
 from copis.classes.device import Device
+from copis.classes.monitored_list import ListChangeKind, ListDiff
 from copis.gui import set_editor
 
 from copis.gui.set_editor import SetEditorFrame
@@ -40,9 +41,16 @@ from copis.helpers import create_action_args, get_atype_kind, get_heading, is_nu
 
 class TimelinePanel(wx.Panel):
     """Timeline panel.
+
+    Tree nodes below pose sets are created lazily, when their parent is first
+    expanded; and list changes are applied incrementally when a diff is given.
     Args:
         parent: Pointer to a parent wx.Frame.
     """
+
+    # Pose sets are expanded on rebuild only for paths with this many sets or fewer.
+    _AUTO_EXPAND_SET_COUNT = 100
+
     def __init__(self, parent) -> None:
         """Initializes TimelinePanel with constructors."""
         super().__init__(parent, style=wx.BORDER_DEFAULT)
@@ -52,6 +60,8 @@ class TimelinePanel(wx.Panel):
         self.timeline = None
         self._buttons = {}
         self._copied_pose = None
+        self._device_captions = {}
+        self._action_captions = {}
         self.init_gui()
         self._update_timeline()
         # Bind listeners.
@@ -61,6 +71,7 @@ class TimelinePanel(wx.Panel):
         dispatcher.connect(self._on_pose_set_selected, signal='ntf_s_selected')
         dispatcher.connect(self._on_pose_set_deselected, signal='ntf_s_deselected')
         dispatcher.connect(self._on_device_position_copied, signal='ntf_device_position_copied')
+        dispatcher.connect(self._on_device_list_changed, signal='ntf_d_list_changed')
         self.Layout()
 
     def _get_device(self, device_id):
@@ -68,13 +79,31 @@ class TimelinePanel(wx.Panel):
             None)
 
     def _get_device_caption(self, device_id):
-        dvc = self._get_device(device_id)
-        caption = ''
-        if dvc:
-            caption = f'{dvc.name} {dvc.type} ({device_id})'
-        return caption.capitalize()
+        caption = self._device_captions.get(device_id)
+        if caption is None:
+            dvc = self._get_device(device_id)
+            caption = ''
+            if dvc:
+                caption = f'{dvc.name} {dvc.type} ({device_id})'
+            caption = self._device_captions[device_id] = caption.capitalize()
+        return caption
 
     def _get_action_caption(self, action):
+        # Only the serialized fallback depends on more than the action type.
+        key = action.atype if action else None
+        caption = self._action_captions.get(key)
+        if caption is None:
+            caption = self._build_action_caption(action)
+            if action is None or self._is_action_caption_cacheable(action):
+                self._action_captions[key] = caption
+        return caption
+
+    def _is_action_caption_cacheable(self, action):
+        return action.atype in self.core.MOVE_COMMANDS or \
+            action.atype in self.core.LENS_COMMANDS or \
+            action.atype in self.core.F_STACK_COMMANDS
+
+    def _build_action_caption(self, action):
         if action:
             com_mode = get_atype_kind(action.atype)
             if com_mode in ('SER', 'HST'):
@@ -95,7 +124,7 @@ class TimelinePanel(wx.Panel):
             caption = '<no action>'
         return caption
 
-    def _get_action_arg_caption(self, action_type, arg):
+    def _build_action_arg_caption(self, action_type, arg):
         time_args = { 'P': 'millisecond', 'S': 'second', 'X': 'second' }
         key, value = arg
         key = key.upper()
@@ -197,6 +226,7 @@ class TimelinePanel(wx.Panel):
         if set_index > 0:
             for _ in range(set_index):
                 set_node, cookie = self.timeline.GetNextChild(set_node, cookie)
+        self._ensure_children(set_node)
         pose_node, cookie = self.timeline.GetFirstChild(set_node)
         if idx_in_set > 0:
             for _ in range(idx_in_set):
@@ -221,6 +251,7 @@ class TimelinePanel(wx.Panel):
         if set_index > 0:
             for _ in range(set_index):
                 pose_node, cookie = self.timeline.GetNextChild(pose_node, cookie)
+        self._ensure_children(pose_node)
         dvc_node, cookie = self.timeline.GetFirstChild(pose_node)
         if idx_in_set > 0:
             for _ in range(idx_in_set):
@@ -341,6 +372,7 @@ class TimelinePanel(wx.Panel):
         btn_size = (85, -1)
         # Bind events
         self.timeline.Bind(wx.EVT_TREE_SEL_CHANGED, self._on_selection_changed)
+        self.timeline.Bind(wx.EVT_TREE_ITEM_EXPANDING, self._on_item_expanding)
         self.timeline.Bind(wx.EVT_KEY_UP, self._on_key_up)
         timeline_sizer.Add(self.timeline, 1, wx.EXPAND)
         self.Sizer.Add(timeline_sizer, 2, wx.EXPAND)
@@ -739,34 +771,136 @@ class TimelinePanel(wx.Panel):
                     idx_in_poses = self._get_index_poses(set_index, prev_pose_index)
                     self.core.select_pose(idx_in_poses)
 
-    def _on_action_list_changed(self, keep_imaging_path_selected=False):
-        wx.CallAfter(self._update_timeline, keep_imaging_path_selected)
-
-    def _update_timeline(self, keep_imaging_path_selected=False) -> None:
+    def _on_action_list_changed(self, keep_imaging_path_selected=False, diff: ListDiff=None):
+        wx.CallAfter(self._update_timeline, keep_imaging_path_selected, diff)
+
+    def _on_device_list_changed(self):
+        # Pose captions name their devices; rebuild them with the new names.
+        self._device_captions.clear()
+        wx.CallAfter(self._update_timeline)
+
+    def _on_item_expanding(self, event: wx.TreeEvent) -> None:
+        self._ensure_children(event.GetItem())
+        event.Skip()
+
+    def _child_nodes(self, parent):
+        node, cookie = self.timeline.GetFirstChild(parent)
+        while node.IsOk():
+            yield node
+            node, cookie = self.timeline.GetNextChild(parent, cookie)
+
+    def _ensure_children(self, node) -> None:
+        """Creates a node's child nodes if it has some and they don't exist yet."""
+        timeline = self.timeline
+        if not node.IsOk() or node == timeline.GetRootItem() or \
+            not timeline.ItemHasChildren(node) or timeline.GetChildrenCount(node, False) > 0:
+            return
+        data = timeline.GetItemData(node)
+        sets = self.core.project.pose_sets
+        if data and data['item'] == 'set':
+            for j, pose in enumerate(sets[data['index']]):
+                pose_data = { 'item': 'pose', 'set index': data['index'], 'index': j }
+                pose_node = timeline.AppendItem(node, self._get_device_caption(pose.position.device), data=pose_data)
+                timeline.SetItemHasChildren(pose_node, True)
+        elif data and data['item'] == 'pose':
+            for action in sets[data['set index']][data['index']].get_actions():
+                action_node = timeline.AppendItem(node, self._get_action_caption(action))
+                timeline.SetItemHasChildren(action_node, bool(action.args))
+        else:
+            # Action nodes carry no data; find the action from the parent pose.
+            pose_node = timeline.GetItemParent(node)
+            pose_data = timeline.GetItemData(pose_node)
+            action_index = next(i for i, n in enumerate(self._child_nodes(pose_node)) if n == node)
+            action = sets[pose_data['set index']][pose_data['index']].get_actions()[action_index]
+            for arg in action.args:
+                timeline.AppendItem(node, self._build_action_arg_caption(action.atype, arg))
+
+    def _add_set_node(self, root, index, pose_set):
+        data = {'item': 'set', 'index': index}
+        caption = f'Pose set {index}'
+        if index < self.timeline.GetChildrenCount(root, False):
+            node = self.timeline.InsertItem(root, index, caption, data=data)
+        else:
+            node = self.timeline.AppendItem(root, caption, data=data)
+        self.timeline.SetItemHasChildren(node, len(pose_set) > 0)
+        return node
+
+    def _refresh_set_node(self, node, pose_set) -> None:
+        """Drops a modified set's child nodes; re-creating them if it was expanded."""
+        was_expanded = self.timeline.IsExpanded(node)
+        self.timeline.DeleteChildren(node)
+        self.timeline.SetItemHasChildren(node, len(pose_set) > 0)
+        if was_expanded and pose_set:
+            self._ensure_children(node)
+            self.timeline.Expand(node)
+
+    def _apply_timeline_diff(self, diff: ListDiff) -> None:
+        """Applies pose set list changes to the existing tree, then renumbers
+        the set nodes following the first change."""
+        root = self.timeline.GetRootItem()
+        sets = self.core.project.pose_sets
+        first_changed = len(sets)
+        nodes = list(self._child_nodes(root))
+        modified = set()
+        # Change indexes are relative to the list at the time of each change, so replay them in order.
+        for change in diff:
+            first_changed = min(first_changed, change.start)
+            if change.kind == ListChangeKind.REMOVED:
+                for node in nodes[change.start:change.stop]:
+                    modified.discard(node)
+                    self.timeline.Delete(node)
+                del nodes[change.start:change.stop]
+            elif change.kind == ListChangeKind.INSERTED:
+                # Inserted nodes start out empty; they're filled lazily from the final list.
+                for index in range(change.start, change.stop):
+                    nodes.insert(index, self._add_set_node(root, index, []))
+            elif change.kind == ListChangeKind.MODIFIED:
+                modified.update(nodes[change.start:change.stop])
+        for index in range(first_changed, len(nodes)):
+            node = nodes[index]
+            if node in modified:
+                self._refresh_set_node(node, sets[index])
+            data = self.timeline.GetItemData(node)
+            if data['index'] != index:
+                self.timeline.SetItemText(node, f'Pose set {index}')
+                self.timeline.SetItemData(node, {'item': 'set', 'index': index})
+                for pose_node in self._child_nodes(node):
+                    pose_data = self.timeline.GetItemData(pose_node)
+                    pose_data['set index'] = index
+                    self.timeline.SetItemData(pose_node, pose_data)
+            if not self.timeline.GetChildrenCount(node, False):
+                self.timeline.SetItemHasChildren(node, len(sets[index]) > 0)
+
+    def _update_timeline(self, keep_imaging_path_selected=False, diff: ListDiff=None) -> None:
         """When points are modified, redisplay timeline commands.
         Handles ntf_a_list_changed signal sent by self.core.
         """
         sets = self.core.project.pose_sets
         dispatcher.send('ntf_imaging_path_selection_changed', is_selected=False)
-        self.timeline.DeleteAllItems()
-        if sets:
-            root = self.timeline.AddRoot('Imaging path')
-            for i, pose_set in enumerate(sets):
-                data = {'item': 'set','index': i }
-                node = self.timeline.AppendItem(root, f'Pose set {i}', data=data)
-                for j, pose in enumerate(pose_set):
-                    data = { 'item': 'pose', 'set index': i, 'index': j }
-                    node_1 = self.timeline.AppendItem(node, self._get_device_caption(pose.position.device), data=data)
-                    for action in pose.get_actions():
-                        node_2 = self.timeline.AppendItem(node_1, self._get_action_caption(action))
-                        for arg in action.args:
-                            self.timeline.AppendItem(node_2, self._get_action_arg_caption(action.atype, arg))
-                self.timeline.Expand(node)
-            self.timeline.Expand(root)
-            if keep_imaging_path_selected:
+        root = self.timeline.GetRootItem()
+        can_apply_diff = diff is not None and not diff.is_reset and sets and root.IsOk() \
+            and self.timeline.GetChildrenCount(root, False) - sum(c.count for c in diff \
+                if c.kind == ListChangeKind.REMOVED) + sum(c.count for c in diff \
+                if c.kind == ListChangeKind.INSERTED) == len(sets)
+        self.timeline.Freeze()
+        try:
+            if can_apply_diff:
+                self._apply_timeline_diff(diff)
+            else:
+                self.timeline.DeleteAllItems()
+                if sets:
+                    root = self.timeline.AddRoot('Imaging path')
+                    for i, pose_set in enumerate(sets):
+                        node = self._add_set_node(root, i, pose_set)
+                        if len(sets) <= self._AUTO_EXPAND_SET_COUNT:
+                            self._ensure_children(node)
+                            self.timeline.Expand(node)
+                    self.timeline.Expand(root)
+            if sets and keep_imaging_path_selected:
                 self.timeline.SelectItem(root)
+        finally:
+            self.timeline.Thaw()
         self._toggle_buttons()
-        
 
 
 class _Playset_Dialog(wx.Dialog):
@@ -603,6 +603,8 @@ class dlg_profile ( wx.Dialog ):
                 return
             if (dev_id == int(self.m_txt_ctrl_cam_id.GetValue())) or (int(self.m_txt_ctrl_cam_id.GetValue()) not in self._local_devices_dict): 
                 id = int(self.m_txt_ctrl_cam_id.GetValue()) 
+                # Not edited here; kept from the profile.
+                serial_port = self._local_devices_dict[dev_id].get('serial_port', '')
                 self._local_devices_dict[id] = {}
                 self._local_devices_dict[id]['id'] = int(self.m_txt_ctrl_cam_id.GetValue())
                 self._local_devices_dict[id]['serial_no'] = self.m_txt_ctrl_cam_sn.GetValue()
@@ -626,6 +628,8 @@ class dlg_profile ( wx.Dialog ):
                 self._local_devices_dict[id]['range_z'][1] = float(self.m_txt_ctrl_cam_max_z.GetValue())
                 self._local_devices_dict[id]['port'] = self.m_txt_ctrl_cam_port.GetValue()
                 self._local_devices_dict[id]['edsdk_save_to_path'] = self.m_txt_ctrl_edsdk.GetValue()
+                if serial_port:
+                    self._local_devices_dict[id]['serial_port'] = serial_port
                 self.m_lst_ctrl_cams.Delete(selected_index)
                 self.m_lst_ctrl_cams.Insert(self.m_txt_ctrl_cam_id.GetValue(), selected_index)
                 self.m_lst_ctrl_cams.SetSelection(selected_index)
@@ -10,10 +10,11 @@ from copis.classes.pose import Pose
 from copis.classes.device import Device
 from copis.gui.wxutils import show_msg_dialog, simple_statictext, FancyTextCtrl, EVT_FANCY_TEXT_UPDATED_EVENT, create_scaled_bitmap
 from copis.helpers import create_action_args, get_atype_kind, get_heading, is_number, print_debug_msg, rad_to_dd, sanitize_number, sanitize_point, xyz_units, pt_units, dd_to_rad, get_end_position, get_heading
-from copis.pathutils import build_pose_sets
+from copis.pathutils import build_pose_sets, forward_back_coords, retarget_coords, translate_coords
 
 from copis.classes.object3d import AABoxObject3D 
 from glm import vec3   
+import numpy as np
 from pydispatch import dispatcher  
 
 class SetEditorFrame(wx.Dialog):
@@ -253,10 +254,18 @@ class SetEditorFrame(wx.Dialog):
 
             
     def _get_filtered_pose_indexes(self) -> list:
-        filtered_idxs = []
+        arrays, mask = self._get_filtered_pose_arrays()
+        return np.flatnonzero(mask).tolist()
+
+    def _get_filtered_pose_arrays(self):
+        """Returns the poses, in deinterleaved order, as PoseArrays;
+        along with a mask of those matching the filters."""
         self.core.project.adhocs.clear()
-        if self.selected_op == "Deinterleave":       
-            self.pose_count_label.SetLabel(f"{len(self.core.project.poses)} pose(s) selected.")
+        arrays = self.core.project.get_pose_arrays(
+            self._op_deinterleave_to_poses_copy(self.deinterleave_algo))
+
+        if self.selected_op == "Deinterleave":
+            mask = np.ones(len(arrays.poses), dtype=bool)
         else:
             min_x = min(self.bb_start_x_ctrl.num_value,self.bb_end_x_ctrl.num_value)
             max_x = max(self.bb_start_x_ctrl.num_value,self.bb_end_x_ctrl.num_value)
@@ -270,100 +279,57 @@ class SetEditorFrame(wx.Dialog):
             max_t = max(self.bb_start_t_ctrl.num_value,self.bb_end_t_ctrl.num_value)
             lower = vec3(min_x,min_y, min_z)
             upper = vec3(max_x,max_y,max_z)
-            filter_check = False
-            for i, p in enumerate(self._op_deinterleave_to_poses_copy(self.deinterleave_algo)):
-                p5 = p.position_as_point5
-                if self.filter_device.IsChecked():
-                    if p.position.device in self.device_checklist.CheckedItems:
-                        filter_check = True
-                    else:
-                        continue    
-                if self.filter_bb.IsChecked():
-                    if (min_x <= p5.x <= max_x and min_y <= p5.y <= max_y and min_z <=  p5.z <= max_z and min_p <=  rad_to_dd(p5.p) <= max_p and min_t <=  rad_to_dd(p5.t) <= max_t):
-                            filter_check = True
-                    else: 
-                        continue
-                if self.filter_pose_range.IsChecked():
-                    if (i>= int(self.start_pose_ctrl.GetValue()) and i<= int(self.end_pose_ctrl.GetValue())):
-                        filter_check = True
-                    else:
-                        continue
-                if filter_check:
-                    filtered_idxs.append(i)
+            filters = {}
+            if self.filter_device.IsChecked():
+                filters['device_ids'] = self.device_checklist.CheckedItems
+            if self.filter_bb.IsChecked():
+                filters.update(lower=lower, upper=upper,
+                    pan_range=(min_p, max_p), tilt_range=(min_t, max_t))
+            if self.filter_pose_range.IsChecked():
+                filters['index_range'] = (int(self.start_pose_ctrl.GetValue()), int(self.end_pose_ctrl.GetValue()))
+            # No filter checked, nothing selected.
+            mask = arrays.mask(**filters) if filters else np.zeros(len(arrays.poses), dtype=bool)
             if self.filter_bb.IsChecked():
                 self.core.project.adhocs.append(AABoxObject3D(lower, upper))
-            self.pose_count_label.SetLabel(f"{len(filtered_idxs)} pose(s) selected.")
-        return filtered_idxs
+        self.pose_count_label.SetLabel(f"{np.count_nonzero(mask)} pose(s) selected.")
+        return arrays, mask
     
     def _on_apply(self, event):
         if self.selected_op == "Deinterleave":
             algo = self.op_deinterleave_algo__choice_ctrl.GetStringSelection()
             self._op_deinterleave_active_poseset(algo)
         elif self.selected_op == "Change Device":
-            self._op_deinterleave_active_poseset(self.deinterleave_algo)
-            for f in self._get_filtered_pose_indexes():
-                p = self.core.project.poses[f] 
-                p.position.device = self.op_dev_change_choice_ctrl.GetSelection() 
-                for a in p.payload:
-                    a.device = self.op_dev_change_choice_ctrl.GetSelection()
-            self.core.project.pose_sets._dispatch()
+            with self.core.project.batch_edit():
+                self._op_deinterleave_active_poseset(self.deinterleave_algo)
+                poses = self.core.project.poses
+                filtered = self._get_filtered_pose_indexes()
+                for f in filtered:
+                    p = poses[f]
+                    p.position.device = self.op_dev_change_choice_ctrl.GetSelection() 
+                    for a in p.payload:
+                        a.device = self.op_dev_change_choice_ctrl.GetSelection()
+                #since we deinterleaved, there is one pose per poseset, so pose and set indexes match.
+                for f in filtered:
+                    self.core.project.pose_sets.mark_modified(f)
         elif self.selected_op == "Delete":
-            self._op_deinterleave_active_poseset(self.deinterleave_algo)     
-            for f in reversed(self._get_filtered_pose_indexes()):
-                self.core.project.delete_pose_set(f) #since we deinterleaved, there should be one pose per poseset, so we can delete the posesets.
-            self.core.project.pose_sets._dispatch() 
-        elif self.selected_op == "Increment Position":     
-            for f in self._get_filtered_pose_indexes():
-                pp = self.core.project.poses[f].position 
-                p5 =  self.core.project.poses[f].position_as_point5
-                new_point = [0,0,0,0,0]
-                new_point[0] = p5[0] + self.op_x_ctrl.num_value
-                new_point[1] = p5[1] + self.op_y_ctrl.num_value
-                new_point[2] = p5[2] + self.op_z_ctrl.num_value
-                new_point[3] = sanitize_number(p5[3] + dd_to_rad(self.op_p_ctrl.num_value))
-                new_point[4] = sanitize_number(p5[4] + dd_to_rad(self.op_t_ctrl.num_value))
-                args = create_action_args(new_point)
-                argc = min(len(pp.args), len(args))
-                for i in range(argc):
-                    pp.args[i] = args[i]
-                pp.argc = argc
-                pp.update()
-            self.core.project.pose_sets._dispatch()
-        elif self.selected_op == "Forward/Back":     
-            for f in self._get_filtered_pose_indexes():
-                pp = self.core.project.poses[f].position 
-                p5 =  self.core.project.poses[f].position_as_point5
-                dist = self.op_dist_ctrl.num_value
-                new_x, new_y, new_z =get_end_position(p5, dist)
-                new_point = [0,0,0,0,0]
-                new_point[0] = new_x
-                new_point[1] = new_y
-                new_point[2] = new_z
-                new_point[3] = p5[3]
-                new_point[4] = p5[4]
-                args = create_action_args(new_point)
-                argc = min(len(pp.args), len(args))
-                for i in range(argc):
-                    pp.args[i] = args[i]
-                pp.argc = argc
-                pp.update()
-            self.core.project.pose_sets._dispatch()
-        elif self.selected_op == "Retarget":     
-            for f in self._get_filtered_pose_indexes():
-                pp = self.core.project.poses[f].position 
-                p3 =  self.core.project.poses[f].position_as_vec3
-                target_x = self.op_retarget_x_ctrl.num_value
-                target_y = self.op_retarget_y_ctrl.num_value
-                target_z = self.op_retarget_z_ctrl.num_value
-                new_point = [p3[0],p3[1],p3[2],0,0]
-                new_point[3], new_point[4] = get_heading(p3,vec3(target_x,target_y,target_z))
-                args = create_action_args(new_point)
-                argc = min(len(pp.args), len(args))
-                for i in range(argc):
-                    pp.args[i] = args[i]
-                pp.argc = argc
-                pp.update()
-            self.core.project.pose_sets._dispatch()
+            with self.core.project.batch_edit():
+                self._op_deinterleave_active_poseset(self.deinterleave_algo)
+                #since we deinterleaved, there should be one pose per poseset, so we can delete the posesets.
+                self.core.project.delete_pose_sets(self._get_filtered_pose_indexes())
+        elif self.selected_op in ("Increment Position", "Forward/Back", "Retarget"):
+            arrays, mask = self._get_filtered_pose_arrays()
+            coords = arrays.coords[mask]
+            if self.selected_op == "Increment Position":
+                coords = translate_coords(coords, [self.op_x_ctrl.num_value,
+                    self.op_y_ctrl.num_value, self.op_z_ctrl.num_value,
+                    dd_to_rad(self.op_p_ctrl.num_value), dd_to_rad(self.op_t_ctrl.num_value)])
+            elif self.selected_op == "Forward/Back":
+                coords = forward_back_coords(coords, self.op_dist_ctrl.num_value)
+            else:
+                coords = retarget_coords(coords, vec3(self.op_retarget_x_ctrl.num_value,
+                    self.op_retarget_y_ctrl.num_value, self.op_retarget_z_ctrl.num_value))
+            poses = [arrays.poses[i] for i in np.flatnonzero(mask)]
+            self.core.project.set_pose_coords(poses, coords)
         self._get_filtered_pose_indexes()
 
     def _on_close(self, event):
@@ -25,6 +25,7 @@ from math import cos, sin, pi, atan2, sqrt
 from time import time
 from typing import Callable, List
 from itertools import zip_longest
+import numpy as np
 import glm
 from glm import mat4, vec2, vec3, vec4
 from copis.globals import ActionType, Point5
@@ -68,6 +69,40 @@ def point5_to_mat4(point) -> mat4:
     """Convert Point5 into a 4x4 transformation matrix."""
     return xyzpt_to_mat4(point.x, point.y, point.z, point.p, point.t)
 
+def xyzpt_to_mat4_batch(points) -> np.ndarray:
+    """Convert an (N, 5) array of x, y, z, pan, tilt rows into (N, 4, 4) float32
+    transformation matrices; bit-compatible with xyzpt_to_mat4.
+
+    The result is indexed [instance, row, column], like a NumPy view of a
+    glm.array of mat4s. It is a view over column-major storage, so its
+    transpose(0, 2, 1) is contiguous and can be uploaded as an instance buffer
+    without copying.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 5)
+    pan = points[:, 3]
+    tilt = points[:, 4]
+    cos_p, sin_p = np.cos(pan), np.sin(pan)
+    cos_t, sin_t = np.cos(tilt), np.sin(tilt)
+
+    # Storage is [instance, column, row], same as glm.
+    cols = np.zeros((len(points), 4, 4), dtype=np.float32)
+    cols[:, 0, 0] = cos_p
+    cols[:, 0, 1] = -sin_p
+    cols[:, 1, 0] = cos_t * sin_p
+    cols[:, 1, 1] = cos_t * cos_p
+    cols[:, 1, 2] = -sin_t
+    cols[:, 2, 0] = sin_t * sin_p
+    cols[:, 2, 1] = sin_t * cos_p
+    cols[:, 2, 2] = cos_t
+    cols[:, 3, :3] = points[:, :3]
+    cols[:, 3, 3] = 1.0
+    return cols.transpose(0, 2, 1)
+
+def point5_to_mat4_batch(points) -> np.ndarray:
+    """Convert a list of Point5 (or an (N, 5) array) into (N, 4, 4) float32
+    transformation matrices. See xyzpt_to_mat4_batch."""
+    return xyzpt_to_mat4_batch(points)
+
 def shade_color(color: vec4, shade_factor: float) -> vec4:
     """Return darker or lighter shade of color by a shade factor."""
     color.x = min(1.0, color.x * (1 - shade_factor))    # red
@@ -255,6 +290,22 @@ def get_heading(start: vec3, end: vec3):
     tilt = -atan2(dir_z, sqrt(dir_x * dir_x + dir_y * dir_y))
     return vec2(pan, tilt)
 
+def get_heading_batch(starts, ends) -> np.ndarray:
+    """Returns the headings (pan and tilt) between (N, 3) arrays of start and
+    end points, as an (N, 2) float32 array; bit-compatible with get_heading.
+
+    Either argument can be a single point, to broadcast against the other.
+    """
+    starts = np.asarray(starts, dtype=np.float32)
+    ends = np.asarray(ends, dtype=np.float32)
+    # Like get_heading, subtract in single precision and do the trig in double.
+    direction = np.atleast_2d(starts - ends).astype(np.float64)
+    dir_x, dir_y, dir_z = direction[:, 0], direction[:, 1], direction[:, 2]
+    headings = np.empty((len(direction), 2), dtype=np.float32)
+    headings[:, 0] = np.arctan2(dir_x, dir_y)
+    headings[:, 1] = -np.arctan2(dir_z, np.sqrt(dir_x * dir_x + dir_y * dir_y))
+    return headings
+
 def point5_to_dict(point) -> dict:
     """Turns the provided list of args tuples into a dictionary."""
     dict_args = {}
@@ -292,6 +343,22 @@ def get_end_position(start: Point5, distance: float) -> vec3:
     end_z = sanitize_number(start.z - (distance * sin_t))
     return vec3(end_x, end_y, end_z)
 
+def get_end_position_batch(starts, distance: float) -> np.ndarray:
+    """Calculates and returns endpoints, given an (N, 5) array of start points
+    and a distance; as an (N, 3) float32 array. See get_end_position."""
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 5)
+    d_places = 3
+    sin_p = np.round(np.sin(starts[:, 3]), d_places)
+    cos_p = np.round(np.cos(starts[:, 3]), d_places)
+    sin_t = np.round(np.sin(starts[:, 4]), d_places)
+    cos_t = np.round(np.cos(starts[:, 4]), d_places)
+    ends = np.empty((len(starts), 3), dtype=np.float64)
+    ends[:, 0] = starts[:, 0] + (distance * sin_p * cos_t)
+    ends[:, 1] = starts[:, 1] + (distance * cos_p * cos_t)
+    ends[:, 2] = starts[:, 2] - (distance * sin_t)
+    # Adding zero turns signed zeros into zeros, like sanitize_number.
+    return ends.astype(np.float32) + np.float32(0.0)
+
 def get_atype_kind(atype) -> str:
     """Returns the action type kind."""
     if isinstance(atype, ActionType):
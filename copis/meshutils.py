@@ -0,0 +1,153 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Mesh util functions: vertex welding and level of detail decimation."""
+
+from typing import List, NamedTuple
+
+import numpy as np
+
+
+class MeshData(NamedTuple):
+    """Indexed triangle mesh; (N, 3) float32 vertices and normals,
+    (M, 3) uint32 indices."""
+    vertices: np.ndarray
+    normals: np.ndarray
+    indices: np.ndarray
+
+    @property
+    def triangle_count(self) -> int:
+        """Returns the number of triangles in the mesh."""
+        return len(self.indices)
+
+
+def weld_vertices(positions: np.ndarray, normals: np.ndarray) -> MeshData:
+    """Collapses an unindexed triangle soup into shared vertices and an index buffer.
+
+    Vertices are only shared if both their position and normal match, so flat
+    shaded meshes keep their hard edges.
+
+    Args:
+        positions: (3 * M, 3) array of triangle corner positions.
+        normals: (3 * M, 3) array of triangle corner normals.
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float32)
+    normals = np.ascontiguousarray(normals, dtype=np.float32)
+
+    if len(positions) == 0:
+        return MeshData(positions.reshape(0, 3), normals.reshape(0, 3),
+            np.empty((0, 3), dtype=np.uint32))
+
+    keys = np.hstack((positions, normals))
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    return MeshData(positions[first], normals[first],
+        inverse.reshape(-1, 3).astype(np.uint32))
+
+
+def cluster_decimate(mesh: MeshData, cell_size: float) -> MeshData:
+    """Decimates a mesh by vertex clustering on a uniform grid.
+
+    All vertices within a grid cell are merged into their average; triangles
+    that collapse or become duplicates are dropped.
+
+    Args:
+        mesh: The indexed mesh to decimate.
+        cell_size: Edge length of a grid cell, in mesh units.
+    """
+    if mesh.triangle_count == 0 or cell_size <= 0:
+        return mesh
+
+    vertices = mesh.vertices.astype(np.float64)
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    _, cluster, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    size = len(counts)
+
+    sum_columns = lambda data: np.stack([
+        np.bincount(cluster, weights=data[:, i], minlength=size) for i in range(3)], axis=1)
+
+    new_vertices = sum_columns(vertices) / counts[:, None]
+    new_normals = sum_columns(mesh.normals.astype(np.float64))
+    lengths = np.linalg.norm(new_normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    new_normals /= lengths[:, None]
+
+    tris = cluster[mesh.indices]
+    tris = tris[(tris[:, 0] != tris[:, 1]) &
+                (tris[:, 1] != tris[:, 2]) &
+                (tris[:, 0] != tris[:, 2])]
+
+    if len(tris) == 0:
+        return MeshData(np.empty((0, 3), dtype=np.float32),
+            np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.uint32))
+
+    # Drop duplicate triangles but keep the winding of the first occurrence.
+    _, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(first)]
+
+    # Compact away clusters no longer referenced by any triangle.
+    used, remap = np.unique(tris, return_inverse=True)
+
+    return MeshData(new_vertices[used].astype(np.float32),
+        new_normals[used].astype(np.float32),
+        remap.reshape(-1, 3).astype(np.uint32))
+
+
+def build_lod_chain(mesh: MeshData, grid_resolutions=(256, 128, 64, 32),
+                    min_triangles: int = 500) -> List[MeshData]:
+    """Returns a list of progressively decimated meshes, finest first.
+
+    The first level is always the provided mesh. Each subsequent level clusters
+    vertices on a grid with the given number of cells along the mesh's longest
+    extent. Levels that do not meaningfully reduce the triangle count are skipped.
+
+    Args:
+        mesh: The full resolution indexed mesh.
+        grid_resolutions: Grid cell counts along the longest extent, descending.
+        min_triangles: Stop decimating once a level has fewer triangles than this.
+    """
+    chain = [mesh]
+
+    if mesh.triangle_count <= min_triangles:
+        return chain
+
+    extent = float((mesh.vertices.max(axis=0) - mesh.vertices.min(axis=0)).max())
+
+    if extent <= 0:
+        return chain
+
+    for resolution in grid_resolutions:
+        level = cluster_decimate(mesh, extent / resolution)
+
+        if level.triangle_count == 0:
+            break
+
+        if level.triangle_count < chain[-1].triangle_count * .9:
+            chain.append(level)
+
+        if level.triangle_count <= min_triangles:
+            break
+
+    return chain
+
+
+def select_lod(chain: List[MeshData], max_triangles: int) -> MeshData:
+    """Returns the finest level in a LOD chain within the triangle budget;
+    or the coarsest level if none are."""
+    for level in chain:
+        if level.triangle_count <= max_triangles:
+            return level
+    return chain[-1]
@@ -1,6 +1,24 @@
-"""COPIS mocks package."""
+"""COPIS mocks package.
 
-from .mock_copis_controller import MockSerialControllerInterface, MockCopisController
-from .mock_serial import MockSerial
+Mocks are imported on first use.
+"""
 
-__all__ = ["MockSerialControllerInterface", "MockCopisController", "MockSerial"]
+from importlib import import_module
+
+_EXPORTS = {
+    "MockSerialControllerInterface": "mock_copis_controller",
+    "MockCopisController": "mock_copis_controller",
+    "MockSerial": "mock_serial",
+    "MockEDSDK": "mock_edsdk"
+}
+
+__all__ = ["MockSerialControllerInterface", "MockCopisController", "MockSerial", "MockEDSDK"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
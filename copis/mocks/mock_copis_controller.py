@@ -13,20 +13,28 @@
 # You should have received a copy of the GNU General Public License
 # along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
 
-"""Emulate COPIS Serial Controller"""
+"""Emulate COPIS Serial Controller
 
-import datetime
+Can also be served on a virtual serial port (POSIX only):
+    python -m copis.mocks.mock_copis_controller [-d 6] [-r 20]
+"""
+
+import argparse
+import heapq
+import itertools
+import math
+import os
+import random
 import sys
 import threading
 import time
-import random
 
-from typing import Any
-from collections import namedtuple
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple
 
 from copis.command_processor import deserialize_command
 from copis.helpers import is_number
-from copis.globals import ActionType, Point5
+from copis.globals import ActionType, SysStatFlags
 
 
 class MockSerialControllerMeta(type):
@@ -55,14 +63,129 @@ class MockSerialControllerInterface(metaclass=MockSerialControllerMeta):
     pass
 
 
+class _Segment(NamedTuple):
+    """A span of time a mock device spends executing a command."""
+    start: float
+    end: float
+    start_pos: tuple
+    end_pos: tuple
+    flags: int
+    distance: float     # Distance along the limiting axis.
+    speed: float        # Cruise speed of the limiting axis, per second.
+    accel: float        # Acceleration of the limiting axis, per second squared.
+
+    def fraction(self, now: float) -> float:
+        """Returns the fraction of the move completed at the given time."""
+        duration = self.end - self.start
+
+        if duration <= 0 or now >= self.end:
+            return 1.0
+        if now <= self.start:
+            return 0.0
+
+        elapsed = now - self.start
+
+        if self.distance <= 0 or math.isinf(self.accel):
+            return elapsed / duration
+
+        ramp_time = min(self.speed / self.accel, duration / 2)
+        peak_speed = self.accel * ramp_time
+
+        if elapsed < ramp_time:
+            covered = .5 * self.accel * elapsed ** 2
+        elif elapsed < duration - ramp_time:
+            covered = .5 * self.accel * ramp_time ** 2 + peak_speed * (elapsed - ramp_time)
+        else:
+            covered = self.distance - .5 * self.accel * (duration - elapsed) ** 2
+
+        return min(max(covered / self.distance, 0.0), 1.0)
+
+    def position(self, now: float) -> tuple:
+        """Returns the interpolated position at the given time."""
+        frac = self.fraction(now)
+        return tuple(a + (b - a) * frac for a, b in zip(self.start_pos, self.end_pos))
+
+
+class _MockDevice:
+    def __init__(self, device_id: int, is_locked: bool) -> None:
+        self.device_id = device_id
+        self.is_absolute_move_mode = True
+        self.is_locked = is_locked
+        self.error = None
+        self.base_pos = (0.0,) * 5
+        self.segments: List[_Segment] = []
+        self.is_ticking = False
+
+    @property
+    def planned_pos(self) -> tuple:
+        """Returns the position the device will be at after its queued commands."""
+        return self.segments[-1].end_pos if self.segments else self.base_pos
+
+    def busy_until(self, now: float) -> float:
+        """Returns when the device finishes its queued commands."""
+        return max(self.segments[-1].end if self.segments else now, now)
+
+    def prune(self, now: float) -> None:
+        """Drops finished segments."""
+        while self.segments and self.segments[0].end <= now:
+            self.base_pos = self.segments.pop(0).end_pos
+
+    def state(self, now: float):
+        """Returns the device's (position, status flags) at the given time."""
+        self.prune(now)
+        flags = 0
+        pos = self.base_pos
+
+        if self.segments:
+            current = self.segments[0]
+            if current.start <= now:
+                pos = current.position(now)
+                flags |= current.flags
+                queued = len(self.segments) > 1
+            else:
+                queued = True
+
+            if queued:
+                flags |= 1 << SysStatFlags.STA_MOTION_QUEUED.value
+
+        if self.is_locked:
+            flags |= 1 << SysStatFlags.STA_LOCK.value
+
+        return pos, flags
+
+
 class MockCopisController():
-    """Implements a mock COPIS serial controller."""
-    _INTERVAL = 2 # Seconds
+    """Implements a mock COPIS serial controller.
+
+    Devices execute their commands in order, with moves timed by a trapezoidal
+    velocity profile. Each device reports when a command is received, starts
+    and ends; and, while busy, report_rate times per second.
+
+    Args:
+        device_count: Optional; the number of emulated devices, with ids 0 to N - 1.
+        max_feed_rates: Optional; per axis ('x', 'y', 'z', 'p', 't') maximum
+            feed rates in mm or dd per minute.
+        accelerations: Optional; per axis accelerations in mm or dd per second
+            squared. math.inf moves at constant speed.
+        report_rate: Optional; status reports per second from busy devices.
+            0 only reports on receipt, start and end of commands.
+        latency: Optional; seconds between an event and its report being readable.
+        jitter: Optional; up to this many seconds are randomly added to latency.
+        error_rate: Optional; the probability a command error-locks its device.
+        queue_size: Optional; the number of commands a device can hold, including
+            the executing one. More error-lock it (E02). 0 is unbounded.
+        start_locked: Optional; if True devices start locked, like real hardware.
+        seed: Optional; seeds jitter and error injection.
+        device_ids: Optional; the ids of the emulated devices, in place of 0 to
+            device_count - 1; for controllers that share a rig across ports.
+    """
     _MAX_FEEDRATE = 5000 # mm or dd/min
+    _DEFAULT_ACCELERATION = 1000 # mm or dd/s^2
     _DEFAULT_SHUTTER_PRESS = .01 # 10 milliseconds in seconds
     _DEFAULT_ACTION_TIMESPAN = .1 # 100 millisecond in seconds
     _MINS_TO_SECS_RATIO = 60
     _MSS_TO_SECS_RATIO = 1/1000
+    _AXES = 'xyzpt'
 
     _MOVE_COMMANDS = [ActionType.G0, ActionType.G1]
     _MODE_COMMANDS = [ActionType.G90, ActionType.G91]
@@ -70,237 +193,460 @@ class MockCopisController():
     _HOME_COMANDS = [ActionType.G28]
     _CAMERA_COMMANDS = [ActionType.C0, ActionType.C1]
 
-    _BOUNDS = {
-        'x': (-180, 180),
-        'y': (-300, 300),
-        'z': (0, 300),
-        'p': (-180, 180),
-        't': (-180, 180)
-    }
-
-    _COPIS_RESPONSE = namedtuple('CopisResponse', 'payload report_on')
-
-    def __init__(self):
+    _EXEC_FLAGS = (1 << SysStatFlags.STA_GC_EXEC.value)
+    _MOTION_FLAGS = _EXEC_FLAGS | (1 << SysStatFlags.STA_MOTION_EXEC.value)
+    _HOMING_FLAGS = _MOTION_FLAGS | (1 << SysStatFlags.STA_HOMING.value)
+
+    def __init__(self, device_count: int = 3, max_feed_rates: Dict[str, float] = None,
+                 accelerations: Dict[str, float] = None, report_rate: float = 0,
+                 latency: float = 0, jitter: float = 0, error_rate: float = 0,
+                 start_locked: bool = True, queue_size: int = 0, seed: int = None,
+                 device_ids: Iterable[int] = None):
+        self.device_ids = list(range(device_count) if device_ids is None else device_ids)
+        self.device_count = len(self.device_ids)
+        self.max_feed_rates = {a: float(self._MAX_FEEDRATE) for a in self._AXES}
+        self.max_feed_rates.update(max_feed_rates or {})
+        self.accelerations = {a: float(self._DEFAULT_ACCELERATION) for a in self._AXES}
+        self.accelerations.update(accelerations or {})
+        self.report_rate = report_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.start_locked = start_locked
+        self.queue_size = queue_size
+
+        self.command_count = 0
+        self.report_count = 0
+        self.peak_queue_length = 0
+        self._busy_time = 0.0
+        self._busy_end = 0.0
+
+        self._random = random.Random(seed)
+        self._condition = threading.Condition()
         self._is_running = False
-        self._is_absolute_move_mode = []
-        self._is_locked = []
-        self._response_buffer = []
-        self._output_buffer = []
-
-        self._last_positions = []
+        self._devices: List[_MockDevice] = []
+        self._devices_by_id: Dict[int, _MockDevice] = {}
+        self._events = []
+        self._event_ids = itertools.count()
+        self._output_buffer = deque()
+        self._last_delivery = 0.0
+        self._pty_fds = None
+
+    @property
+    def is_running(self) -> bool:
+        """Returns True if the controller is running."""
+        return self._is_running
+
+    @property
+    def busy_time(self) -> float:
+        """Returns the seconds during which at least one device was executing a command."""
+        with self._condition:
+            return self._busy_time
+
+    @property
+    def idle_since(self) -> float:
+        """Returns when, in time.monotonic() seconds, every device last finished its
+        commands; None if a device is still busy."""
+        with self._condition:
+            now = time.monotonic()
+            if any(dvc.busy_until(now) > now for dvc in self._devices):
+                return None
+            return self._busy_end
 
     def start(self):
         """Starts the controller as a result of connecting to it via serial."""
-        self._is_running = True
-        response_thread = threading.Thread(
-            target=self._respond,
-            daemon=True,
-            name = 'response thread'
-        )
-
-        self._is_absolute_move_mode = [True] * 3
-        self._is_locked = [True] * 3
-        self._last_positions = [Point5()] * 3
-
-        now = datetime.datetime.now()
-
-        startup_start = [
-            'settings read from EEPROM',
-            '**COPIS**',
-            'Version: SZRC_RC6 Tue Jun 08 15:38:58 2021',
-            'Device ID: 0',
-            '2 connected',
-            'id:1;state:255',
-            'id:2;state:255'
-        ]
-        startup_end = [
-            '9860 bytes available',
-            'COPIS_READY'
-        ]
-
-        for line in startup_start:
-            resp = self._COPIS_RESPONSE(
-                payload=line,
-                report_on=now
-            )
-            self._response_buffer.append(resp)
-
-        for i in range(len(self._last_positions)):
-            resp = self._COPIS_RESPONSE(
-                payload=self._get_formatted_response(i),
-                report_on=now
-            )
-            self._response_buffer.append(resp)
-
-        for line in startup_end:
-            resp = self._COPIS_RESPONSE(
-                payload=line,
-                report_on=now
-            )
-            self._response_buffer.append(resp)
-
-        response_thread.start()
+        with self._condition:
+            if self._is_running:
+                return
+
+            self._is_running = True
+            self._devices = [_MockDevice(i, self.start_locked) for i in self.device_ids]
+            self._devices_by_id = {dvc.device_id: dvc for dvc in self._devices}
+            self._events.clear()
+            self._output_buffer.clear()
+            self._busy_time = 0.0
+            self._busy_end = 0.0
+
+            startup_start = [
+                'settings read from EEPROM',
+                '**COPIS**',
+                'Version: SZRC_RC6 Tue Jun 08 15:38:58 2021',
+                f'Device ID: {self.device_ids[0] if self.device_ids else 0}',
+                f'{max(self.device_count - 1, 0)} connected',
+                *[f'id:{i};state:255' for i in self.device_ids[1:]]
+            ]
+            startup_end = [
+                '9860 bytes available',
+                'COPIS_READY'
+            ]
+
+            now = time.monotonic()
+            for line in startup_start:
+                self._deliver(now, line)
+            for dvc in self._devices:
+                self._schedule(now, dvc.device_id)
+            for line in startup_end:
+                self._schedule(now, line)
+
+        threading.Thread(target=self._respond, daemon=True, name='response thread').start()
 
     def stop(self):
         """Stops the controller as a result of disconnecting from it via serial."""
-        self._is_running = False
-
-        self._last_positions = []
+        with self._condition:
+            self._is_running = False
+            self._devices = []
+            self._devices_by_id = {}
+            self._condition.notify_all()
+
+        if self._pty_fds:
+            for fd in self._pty_fds:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            self._pty_fds = None
+
+    def set_locked(self, device_id: int, is_locked: bool) -> None:
+        """Locks or unlocks a device, as M511 would; unlocking clears errors."""
+        with self._condition:
+            dvc = self._devices_by_id[device_id]
+            dvc.is_locked = is_locked
+            if not is_locked:
+                dvc.error = None
+            self._schedule(time.monotonic(), device_id)
+
+    def inject_error(self, device_id: int, code: str = 'E99') -> None:
+        """Error-locks a device; it reports the error and ignores commands until unlocked."""
+        with self._condition:
+            dvc = self._devices_by_id[device_id]
+            now = time.monotonic()
+            dvc.prune(now)
+            if dvc.segments:
+                # Stop where it is.
+                dvc.base_pos = dvc.state(now)[0]
+                dvc.segments.clear()
+            dvc.is_locked = True
+            dvc.error = code
+            self._schedule(now, device_id)
 
     def execute(self, cmd: bytes) -> int:
         """Executs a command written to the controller from serial."""
-        def to_dict(args):
-            obj = {
-                'x': None,
-                'y': None,
-                'z': None,
-                'p': None,
-                't': None,
-                'f': None,
-                's': None,
-                'v': None
-            }
-
-            for arg in args:
-                key = arg[0].lower()
-                val = arg[1]
-                val = 0.0 if not is_number(val) else float(val)
-                obj[key] = val
+        if not cmd:
+            return 0
 
-            return obj
+        cmds = [c for c in cmd.decode().strip('\r ').split('\r') if c.strip()]
+        actions = [deserialize_command(c) for c in cmds]
 
-        if cmd and len(cmd) > 0:
-            cmds = cmd.decode().strip('\r ').split('\r')
-            actions = [deserialize_command(c) for c in cmds]
-            pos = 'xyzpt'
+        with self._condition:
+            now = time.monotonic()
 
             for action in actions:
-                x, y, z, p, t = self._last_positions[action.device]
-                prev_position = {
-                    'x': x,
-                    'y': y,
-                    'z': z,
-                    'p': p,
-                    't': t
-                }
-                position = prev_position.copy()
-
-                feedrate = None
-                action_timespan = self._DEFAULT_ACTION_TIMESPAN
-                data = None if action.argc == 0 else to_dict(action.args)
-
-                if self._is_locked[action.device] and action.atype != ActionType.M511:
-                    pass
-                elif action.atype in self._MODE_COMMANDS:
-                    self._is_absolute_move_mode[action.device] = action.atype == ActionType.G90
-                elif action.atype in self._RESET_COMMANDS:
-                    for key in pos:
-                        if data[key] is not None:
-                            position[key] = data[key]
-                elif action.atype in self._CAMERA_COMMANDS:
-                    if data['p']:
-                        action_timespan = data['p'] * self._MSS_TO_SECS_RATIO
-                    elif data['s']:
-                        action_timespan = data['s']
-                    else:
-                        action_timespan = self._DEFAULT_SHUTTER_PRESS
-                elif action.atype in self._MOVE_COMMANDS:
-                    if action.atype == ActionType.G1:
-                        feedrate = self._MAX_FEEDRATE / 2 \
-                            if data['f'] is None else min(data['f'], self._MAX_FEEDRATE)
-                    for key in pos:
-                        if data and data[key] is not None:
-                            if self._is_absolute_move_mode[action.device]:
-                                position[key] = data[key]
-                            else:
-                                position[key] = position[key] + data[key]
-                elif action.atype in self._HOME_COMANDS:
-                    if data['f']:
-                        feedrate = min(data['f'], self._MAX_FEEDRATE)
-
-                    for key in pos:
-                        if data[key] is not None:
-                            low_bound = self._BOUNDS[key][0]
-                            hi_bound = self._BOUNDS[key][1]
-                            start = 0 if low_bound == 0 else random.randrange(low_bound, 0)
-                            finish = random.randrange(0, hi_bound)
-                            position[key] = finish - start
-                elif action.atype == ActionType.M511:
-                    self._is_locked[action.device] = not self._is_locked[action.device]
-                elif action.atype == ActionType.M18:
-                    # Disengage motors.
-                    pass
-                else:
-                    raise NotImplementedError(f'Action {action.atype} not implemented.')
+                self.command_count += 1
+
+                dvc = self._devices_by_id.get(action.device)
+                if dvc is None:
+                    continue
 
-                now = datetime.datetime.now()
+                self._execute_action(dvc, action, now)
 
-                if self._is_locked[action.device]:
-                    resp = self._COPIS_RESPONSE(
-                        payload=self._get_formatted_response(action.device),
-                        report_on=now
-                    )
+            self._condition.notify_all()
 
-                    self._response_buffer.append(resp)
-                else:
-                    delta = list(map(lambda start, end: abs(end - start), \
-                        prev_position.values(), position.values()))
-                    max_delta = max(delta)
-                    travel_time = action_timespan
+        return len(cmd)
 
-                    if feedrate and max_delta > 0:
-                        travel_time = self._MINS_TO_SECS_RATIO * max_delta / feedrate
+    def output_line(self, _size=-1, timeout: float = None) -> bytes:
+        """Puts a line of response data on the output buffer; waits up to timeout
+        seconds for one if none is ready."""
+        with self._condition:
+            if not self._output_buffer and timeout:
+                self._condition.wait_for(lambda: self._output_buffer or not self._is_running, timeout)
 
-                    if action.atype == ActionType.G28:
-                        for key in pos:
-                            if data[key] is not None:
-                                position[key] = 0.0
+            if self._output_buffer:
+                return f'{self._output_buffer.popleft()}\r\n'.encode()
 
-                    x, y, z, p, t = position.values()
+        return b''
 
-                    start_resp = self._COPIS_RESPONSE(
-                        payload=self._get_formatted_response(action.device, False),
-                        report_on=now
-                    )
+    def serve_pty(self) -> str:
+        """Serves the controller on a pseudo terminal and returns its device path.
 
-                    self._last_positions[action.device] = Point5(x, y, z, p, t)
+        Connecting to that path with serial.Serial exercises the real serial
+        code path. POSIX only.
+        """
+        # Imported here; these modules do not exist on Windows.
+        import pty
+        import tty
 
-                    end_resp = self._COPIS_RESPONSE(
-                        payload=self._get_formatted_response(action.device, True),
-                        report_on=now+datetime.timedelta(0, travel_time)
-                    )
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        self._pty_fds = (master, slave)
+        self.start()
 
-                    self._response_buffer.extend([start_resp, end_resp])
+        threading.Thread(target=self._pty_reader, args=(master,),
+            daemon=True, name='pty reader thread').start()
+        threading.Thread(target=self._pty_writer, args=(master,),
+            daemon=True, name='pty writer thread').start()
 
-        return sys.getsizeof(cmd)
+        return os.ttyname(slave)
 
-    def output_line(self, _size=-1) -> bytes:
-        """Puts a line of response data on the output buffer."""
-        packet = ''.encode()
-        if len(self._output_buffer) > 0:
-            packet = f'{self._output_buffer.pop(0)}\r\n'.encode()
+    def _pty_reader(self, master: int) -> None:
+        pending = b''
 
-        return packet
+        while self._is_running:
+            try:
+                data = os.read(master, 4096)
+            except OSError:
+                break
 
-    def _get_formatted_response(self, device_id, is_idle = None):
-        ssf = 128 if is_idle is None else int(not is_idle)
-        pos = self._last_positions[device_id]
-        return (f'<id:{device_id},ssf:{ssf},pos:{pos.x:.3f},' +
-            f'{pos.y:.3f},{pos.z:.3f},{pos.p:.3f},{pos.t:.3f}>')
+            pending += data
+            end = pending.rfind(b'\r')
 
+            if end >= 0:
+                self.execute(pending[:end + 1])
+                pending = pending[end + 1:]
 
-    def _respond(self):
+    def _pty_writer(self, master: int) -> None:
         while self._is_running:
-            if len(self._response_buffer) > 0:
-                now = datetime.datetime.now()
-                to_report = list(filter(lambda r: r.report_on <= now, self._response_buffer))
+            line = self.output_line(timeout=.1)
+
+            if line:
+                try:
+                    os.write(master, line)
+                except OSError:
+                    break
+
+    def _execute_action(self, dvc: _MockDevice, action, now: float) -> None:
+        def to_dict(args):
+            obj = dict.fromkeys('xyzptfsv')
+
+            for arg in args or []:
+                key = arg[0].lower()
+                val = arg[1]
+                val = 0.0 if not is_number(val) else float(val)
+                obj[key] = val
 
-                if to_report and len(to_report) > 0:
-                    self._output_buffer.extend([r.payload for r in to_report])
-                    for data in to_report:
-                        self._response_buffer.remove(data)
+            return obj
 
-                if to_report:
-                    del to_report
+        data = to_dict(action.args)
+        atype = action.atype
+        dvc.prune(now)
+        segment_count = len(dvc.segments)
+
+        if atype == ActionType.M120:
+            # Query; every other device reports too, locked or not.
+            for other in self._devices:
+                if other is not dvc:
+                    self._schedule(now, other.device_id)
+
+        if dvc.is_locked and atype != ActionType.M511:
+            self._schedule(now, dvc.device_id)
+            return
+
+        if self.error_rate and atype != ActionType.M511 and self._random.random() < self.error_rate:
+            dvc.is_locked = True
+            dvc.error = 'E01'
+            self._schedule(now, dvc.device_id)
+            return
+
+        if self.queue_size and len(dvc.segments) >= self.queue_size:
+            dvc.is_locked = True
+            dvc.error = 'E02'
+            self._schedule(now, dvc.device_id)
+            return
+
+        start = dvc.busy_until(now)
+        start_pos = dvc.planned_pos
+
+        if atype in self._MODE_COMMANDS:
+            dvc.is_absolute_move_mode = atype == ActionType.G90
+        elif atype in self._RESET_COMMANDS:
+            end_pos = tuple(start_pos[i] if data[a] is None else data[a]
+                for i, a in enumerate(self._AXES))
+            self._add_segment(dvc, _Segment(start, start, start_pos, end_pos, 0, 0, 0, math.inf))
+        elif atype in self._CAMERA_COMMANDS:
+            if data['p']:
+                timespan = data['p'] * self._MSS_TO_SECS_RATIO
+            elif data['s']:
+                timespan = data['s']
+            else:
+                timespan = self._DEFAULT_SHUTTER_PRESS
+            self._add_segment(dvc, _Segment(start, start + timespan, start_pos, start_pos,
+                self._EXEC_FLAGS, 0, 0, math.inf))
+        elif atype in self._MOVE_COMMANDS:
+            feedrate = None
+            if atype == ActionType.G1:
+                feedrate = self._MAX_FEEDRATE / 2 if data['f'] is None else data['f']
+
+            end_pos = list(start_pos)
+            for i, key in enumerate(self._AXES):
+                if data[key] is not None:
+                    end_pos[i] = data[key] if dvc.is_absolute_move_mode else start_pos[i] + data[key]
+
+            self._add_move(dvc, start, start_pos, tuple(end_pos), feedrate, self._MOTION_FLAGS)
+        elif atype in self._HOME_COMANDS:
+            axes = [a for a in self._AXES if data[a] is not None] or list(self._AXES)
+            end_pos = tuple(0.0 if a in axes else start_pos[i] for i, a in enumerate(self._AXES))
+            feedrate = data['f'] or self._MAX_FEEDRATE / 4
+            self._add_move(dvc, start, start_pos, end_pos, feedrate, self._HOMING_FLAGS)
+        elif atype == ActionType.M511:
+            dvc.is_locked = not dvc.is_locked
+            if not dvc.is_locked:
+                dvc.error = None
+        elif atype == ActionType.M18:
+            # Disengage motors.
+            pass
+
+        # Commands report as they are received, start and end; once if that is all right away.
+        if len(dvc.segments) == segment_count or dvc.segments[-1].start > now:
+            self._schedule(now, dvc.device_id)
+        self.peak_queue_length = max(self.peak_queue_length, len(dvc.segments))
+
+    def _add_move(self, dvc: _MockDevice, start: float, start_pos: tuple, end_pos: tuple,
+                  feedrate: float, flags: int) -> None:
+        duration, distance, speed, accel = 0.0, 0.0, 0.0, math.inf
+
+        for i, axis in enumerate(self._AXES):
+            axis_distance = abs(end_pos[i] - start_pos[i])
+            if axis_distance <= 0:
+                continue
+
+            axis_feed = self.max_feed_rates[axis]
+            if feedrate:
+                axis_feed = min(feedrate, axis_feed)
+
+            axis_speed = axis_feed / self._MINS_TO_SECS_RATIO
+            axis_accel = self.accelerations[axis]
+            axis_duration = _move_duration(axis_distance, axis_speed, axis_accel)
+
+            if axis_duration > duration:
+                duration, distance, speed, accel = axis_duration, axis_distance, axis_speed, axis_accel
+
+        self._add_segment(dvc, _Segment(start, start + duration, start_pos, end_pos,
+            flags, distance, speed, accel))
+
+    def _add_segment(self, dvc: _MockDevice, segment: _Segment) -> None:
+        dvc.segments.append(segment)
+
+        busy_start = max(segment.start, self._busy_end)
+        if segment.end > busy_start:
+            self._busy_time += segment.end - busy_start
+            self._busy_end = segment.end
+        self._schedule(segment.start, dvc.device_id)
+        self._schedule(segment.end, dvc.device_id)
+
+        if self.report_rate > 0 and not dvc.is_ticking and segment.end > segment.start:
+            dvc.is_ticking = True
+            self._schedule(segment.start + 1 / self.report_rate, ('tick', dvc.device_id))
+
+    def _schedule(self, when: float, item) -> None:
+        # Items are device ids to sample, ('tick', id) for periodic reports, or lines.
+        heapq.heappush(self._events, (when, next(self._event_ids), item))
+        self._condition.notify_all()
+
+    def _deliver(self, now: float, line: str) -> None:
+        # Serial preserves order; jitter must not reorder lines.
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        deliver_at = max(now + delay, self._last_delivery)
+        self._last_delivery = deliver_at
+
+        if deliver_at <= now:
+            self._output_buffer.append(line)
+        else:
+            heapq.heappush(self._events, (deliver_at, next(self._event_ids), ('line', line)))
+
+    def _get_formatted_response(self, dvc: _MockDevice, now: float) -> str:
+        pos, ssf = dvc.state(now)
+        x, y, z, p, t = pos
+        line = (f'<id:{dvc.device_id},ssf:{ssf},pos:{x:.3f},' +
+            f'{y:.3f},{z:.3f},{p:.3f},{t:.3f}')
+        if dvc.error:
+            line += f',ERR:{dvc.error}'
+        return line + '>'
+
+    def _process_event(self, now: float, item) -> None:
+        if isinstance(item, int):
+            dvc = self._devices_by_id.get(item)
+            if dvc is not None:
+                self.report_count += 1
+                self._deliver(now, self._get_formatted_response(dvc, now))
+        elif isinstance(item, tuple) and item[0] == 'tick':
+            dvc = self._devices_by_id.get(item[1])
+            if dvc is None:
+                return
+            dvc.prune(now)
+            if dvc.segments and dvc.segments[0].start <= now < dvc.segments[-1].end:
+                self.report_count += 1
+                self._deliver(now, self._get_formatted_response(dvc, now))
+                self._schedule(now + 1 / self.report_rate, item)
+            elif dvc.segments:
+                self._schedule(dvc.segments[0].start + 1 / self.report_rate, item)
+            else:
+                dvc.is_ticking = False
+        elif isinstance(item, tuple) and item[0] == 'line':
+            self._output_buffer.append(item[1])
+        else:
+            self._deliver(now, item)
 
-            time.sleep(self._INTERVAL)
+    def _respond(self):
+        with self._condition:
+            while self._is_running:
+                now = time.monotonic()
+                has_output = False
+
+                while self._events and self._events[0][0] <= now:
+                    _, _, item = heapq.heappop(self._events)
+                    self._process_event(now, item)
+                    has_output = has_output or bool(self._output_buffer)
+
+                if has_output:
+                    self._condition.notify_all()
+
+                timeout = self._events[0][0] - now if self._events else None
+                self._condition.wait(timeout)
+
+
+def _move_duration(distance: float, speed: float, accel: float) -> float:
+    """Returns the time a trapezoidal (or triangular) velocity profile takes to cover distance."""
+    if distance <= 0 or speed <= 0:
+        return 0.0
+    if math.isinf(accel) or accel <= 0:
+        return distance / speed
+    if distance >= speed ** 2 / accel:
+        return distance / speed + speed / accel
+    return 2 * math.sqrt(distance / accel)
+
+
+def main():
+    """Serves a mock controller on a pseudo terminal until interrupted."""
+    parser = argparse.ArgumentParser(description='Serve a mock COPIS controller on a virtual serial port.')
+    parser.add_argument('-d', '--devices', type=int, default=3, help='number of devices')
+    parser.add_argument('-i', '--device-ids', type=lambda v: [int(i) for i in v.split(',')],
+        help='comma separated device ids, in place of 0 to devices - 1')
+    parser.add_argument('-r', '--report-rate', type=float, default=0, help='status reports per second while busy')
+    parser.add_argument('-l', '--latency', type=float, default=0, help='report latency, in seconds')
+    parser.add_argument('-j', '--jitter', type=float, default=0, help='maximum added random latency, in seconds')
+    parser.add_argument('-e', '--error-rate', type=float, default=0, help='probability a command error-locks its device')
+    parser.add_argument('-a', '--acceleration', type=float, default=MockCopisController._DEFAULT_ACCELERATION,
+        help='acceleration on all axes, in mm or dd/s^2')
+    parser.add_argument('-q', '--queue-size', type=int, default=0, help='commands a device can hold; 0 is unbounded')
+    parser.add_argument('--unlocked', action='store_true', help='start with devices unlocked')
+    args = parser.parse_args()
+
+    controller = MockCopisController(args.devices,
+        accelerations={a: args.acceleration for a in MockCopisController._AXES},
+        report_rate=args.report_rate, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, start_locked=not args.unlocked, queue_size=args.queue_size,
+        device_ids=args.device_ids)
+    path = controller.serve_pty()
+    print(f'Mock COPIS controller with {controller.device_count} devices on {path}; Ctrl+C to stop.')
+
+    try:
+        while True:
+            time.sleep(1)
+            print(f'\r{controller.command_count} commands, {controller.report_count} reports', end='')
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        controller.stop()
+        print()
+
+
+if __name__ == '__main__':
+    main()
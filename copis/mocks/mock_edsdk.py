@@ -0,0 +1,375 @@
+# This file is part of COPISClient.
+#
+# COPISClient is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# COPISClient is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with COPISClient. If not, see <https://www.gnu.org/licenses/>.
+
+"""Emulate the Canon EDSDK"""
+
+import io
+import itertools
+import threading
+import time
+
+from ctypes import POINTER, c_ubyte, c_uint64, c_void_p, cast, memmove
+from typing import Any, Dict, List, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+from canon.EDSDKLib import (DirectoryItemInfo, EdsDeviceInfo, EdsErrorCodes,
+    EdsShutterButton, ImageQuality)
+
+
+class _MockCamera:
+    def __init__(self, ref: c_void_p, hardware_id: str, description: str) -> None:
+        self.ref = ref
+        self.hardware_id = hardware_id
+        self.description = description
+        self.is_session_open = False
+        self.is_evf_on = False
+        self.evf_ready_at = 0.0
+        self.object_handler = None
+        self.property_handler = None
+        self.state_handler = None
+        self.state_context = None
+        self.next_evf_frame_at = 0.0
+        self.file_number = 0
+
+
+class _MockStream:
+    def __init__(self, filename: str = None) -> None:
+        self.filename = filename
+        self.data = b''
+
+
+class MockEDSDK:
+    """A stand-in for canon.EDSDKLib.EDSDK that emulates cameras in software.
+
+    Implements the calls COPIS makes: camera enumeration, sessions, shutter
+    and focus commands, object events for images to transfer, image downloads
+    to disk and live view streaming. Events are delivered on timer threads.
+
+    Args:
+        hardware_ids: The hardware ids of the emulated cameras, as set in the
+            ports of the profile's devices.
+        image_sizes: Optional; the size in bytes of each image a shot produces.
+            One size emulates a JPEG only quality; two, RAW + JPEG.
+        shutter_latency: Optional; seconds from shutter release to the first
+            transfer request.
+        event_interval: Optional; seconds between transfer requests of one shot.
+        af_latency: Optional; seconds autofocus adds to a shot.
+        download_rate: Optional; emulated transfer rate in bytes per second.
+            0 writes as fast as the disk allows.
+        evf_fps: Optional; live view frame rate.
+        evf_size: Optional; live view frame (width, height).
+    """
+
+    # Only the EDSDK ids and constants COPIS uses.
+    PropID_SaveTo = 0x0000000b
+    PropID_ImageQuality = 0x00000100
+    PropID_Evf_OutputDevice = 0x00000500
+    PropertyEvent_All = 0x00000100
+    ObjectEvent_All = 0x00000200
+    ObjectEvent_DirItemRequestTransfer = 0x00000208
+    StateEvent_All = 0x00000300
+    StateEvent_Shutdown = 0x00000301
+    StateEvent_WillSoonShutDown = 0x00000303
+    CameraCommand_PressShutterButton = 0x00000004
+    CameraCommand_DoEvfAf = 0x00000102
+    CameraCommand_DriveLensEvf = 0x00000103
+    EvfOutputDevice_TFT = 1
+    EvfOutputDevice_PC = 2
+
+    _ERROR_FORMAT = 'EDSDK Exception Occurred: {} {}'
+    _CHUNK_SIZE = 1024 * 1024
+    _EVF_FRAME_COUNT = 30
+    _PORT_NAME_FORMAT = '\\\\?\\{}#{{6ac27878-a6fa-4155-ba85-f98f491d4f33}}'
+
+    def __init__(self, hardware_ids: Sequence[str], image_sizes: Sequence[int] = (8000000,),
+                 shutter_latency: float = .15, event_interval: float = .02,
+                 af_latency: float = .25, download_rate: float = 40e6,
+                 evf_fps: float = 30, evf_size: Tuple[int, int] = (960, 640)) -> None:
+        self.image_sizes = list(image_sizes)
+        self.shutter_latency = shutter_latency
+        self.event_interval = event_interval
+        self.af_latency = af_latency
+        self.download_rate = download_rate
+        self.evf_fps = evf_fps
+        self.evf_size = evf_size
+
+        self.shot_count = 0
+        self.download_count = 0
+        self.downloaded_bytes = 0
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._is_initialized = False
+        self._camera_list = c_void_p(next(self._ids))
+        self._cameras = [_MockCamera(c_void_p(next(self._ids)), h_id, f'Mock Camera {i}')
+            for i, h_id in enumerate(hardware_ids)]
+        self._items: Dict[int, Tuple[_MockCamera, DirectoryItemInfo]] = {}
+        self._evf_frames: List[bytes] = None
+        self._evf_index = 0
+
+    @property
+    def image_quality(self) -> ImageQuality:
+        """Returns the image quality the cameras report for the configured image sizes."""
+        if len(self.image_sizes) > 1:
+            return ImageQuality.EdsImageQuality_LRLJF
+        return ImageQuality.EdsImageQuality_LJF
+
+    def _raise(self, code: EdsErrorCodes) -> None:
+        raise Exception(self._ERROR_FORMAT.format(hex(code.value), code.name))
+
+    def _get_camera(self, ref: Any) -> _MockCamera:
+        key = _ref_value(ref)
+        camera = next((c for c in self._cameras if c.ref.value == key), None)
+
+        if camera is None:
+            self._raise(EdsErrorCodes.EDS_ERR_DEVICE_NOT_FOUND)
+
+        return camera
+
+    def _get_open_camera(self, ref: Any) -> _MockCamera:
+        camera = self._get_camera(ref)
+
+        if not camera.is_session_open:
+            self._raise(EdsErrorCodes.EDS_ERR_SESSION_NOT_OPEN)
+
+        return camera
+
+    def _release_shutter(self, camera: _MockCamera, do_af: bool) -> None:
+        self.shot_count += 1
+        delay = self.shutter_latency + (self.af_latency if do_af else 0)
+
+        # The last image of a shot is the JPEG; any others are RAWs.
+        exts = ['CR3'] * (len(self.image_sizes) - 1) + ['JPG']
+        camera.file_number += 1
+
+        for i, (size, ext) in enumerate(zip(self.image_sizes, exts)):
+            info = DirectoryItemInfo()
+            info.size = size
+            info.isFolder = False
+            info.szFileName = f'IMG_{camera.file_number:04d}.{ext}'.encode()
+
+            with self._lock:
+                item_id = next(self._ids)
+                self._items[item_id] = (camera, info)
+
+            timer = threading.Timer(delay + i * self.event_interval,
+                self._fire_object_event, (camera, item_id))
+            timer.daemon = True
+            timer.start()
+
+    def _fire_object_event(self, camera: _MockCamera, item_id: int) -> None:
+        if camera.object_handler and camera.is_session_open:
+            camera.object_handler(self.ObjectEvent_DirItemRequestTransfer, item_id, None)
+
+    def _build_evf_frames(self) -> List[bytes]:
+        width, height = self.evf_size
+        frames = []
+
+        for i in range(self._EVF_FRAME_COUNT):
+            img = Image.new('RGB', (width, height), (40, 40, 40))
+            draw = ImageDraw.Draw(img)
+            x = int(width * i / self._EVF_FRAME_COUNT)
+            draw.rectangle((x, height // 3, x + width // 8, 2 * height // 3), fill=(200, 200, 60))
+            draw.text((10, 10), f'MOCK EVF {i:02d}', fill=(255, 255, 255))
+
+            data = io.BytesIO()
+            img.save(data, 'JPEG', quality=80)
+            frames.append(data.getvalue())
+
+        return frames
+
+    def shut_down(self, hardware_id: str) -> None:
+        """Emulates a camera turning off; sends its state handler a shutdown event."""
+        camera = next(c for c in self._cameras if c.hardware_id == hardware_id)
+        camera.is_session_open = False
+
+        if camera.state_handler:
+            camera.state_handler(self.StateEvent_Shutdown, 0, camera.state_context)
+
+    def EdsInitializeSDK(self):
+        self._is_initialized = True
+
+    def EdsTerminateSDK(self):
+        self._is_initialized = False
+
+    def EdsGetCameraList(self):
+        return self._camera_list
+
+    def EdsGetChildCount(self, inRef):
+        if _ref_value(inRef) == self._camera_list.value:
+            return len(self._cameras)
+
+        # Cameras save to host; there are no volumes to browse.
+        return 0
+
+    def EdsGetChildAtIndex(self, inRef, inIndex):
+        if _ref_value(inRef) != self._camera_list.value or not 0 <= inIndex < len(self._cameras):
+            self._raise(EdsErrorCodes.EDS_ERR_DEVICE_NOT_FOUND)
+
+        return self._cameras[inIndex].ref
+
+    def EdsGetDeviceInfo(self, inCameraRef):
+        camera = self._get_camera(inCameraRef)
+        info = EdsDeviceInfo()
+        info.szPortName = self._PORT_NAME_FORMAT.format(camera.hardware_id.replace('\\', '#')).encode()
+        info.szDeviceDescription = camera.description.encode()
+        return info
+
+    def EdsOpenSession(self, inCameraRef):
+        self._get_camera(inCameraRef).is_session_open = True
+
+    def EdsCloseSession(self, inCameraRef):
+        camera = self._get_camera(inCameraRef)
+        camera.is_session_open = False
+        camera.is_evf_on = False
+
+    def EdsGetPropertySize(self, inRef, inPropertyID, inParam):
+        return {'dataType': None, 'size': 4}
+
+    def EdsGetPropertyData(self, inRef, inPropertyID, inParam, inPropertySize, outPropertyData):
+        self._get_open_camera(inRef)
+
+        if inPropertyID == self.PropID_ImageQuality:
+            outPropertyData.value = self.image_quality.value
+
+        return outPropertyData
+
+    def EdsSetPropertyData(self, inRef, inPropertyID, inParam, inPropertySize, inPropertyData):
+        camera = self._get_open_camera(inRef)
+
+        if inPropertyID == self.PropID_Evf_OutputDevice:
+            camera.is_evf_on = bool(inPropertyData & self.EvfOutputDevice_PC)
+            # Live view takes a moment to start streaming.
+            camera.evf_ready_at = camera.next_evf_frame_at = time.perf_counter() + .3
+
+    def EdsSetCapacity(self, inCameraRef, inCapacity):
+        self._get_open_camera(inCameraRef)
+
+    def EdsSetObjectEventHandler(self, inCameraRef, inEvnet, inObjectEventHandler, inContext):
+        self._get_camera(inCameraRef).object_handler = inObjectEventHandler
+
+    def EdsSetPropertyEventHandler(self, inCameraRef, inEvent, inPropertyEventHandler, inContext):
+        self._get_camera(inCameraRef).property_handler = inPropertyEventHandler
+
+    def EdsSetCameraStateEventHandler(self, inCameraRef, inEvent, inStateEventHandler, inContext):
+        camera = self._get_camera(inCameraRef)
+        camera.state_handler = inStateEventHandler
+        camera.state_context = inContext
+
+    def EdsSendCommand(self, inCameraRef, inCommand, inParam):
+        camera = self._get_open_camera(inCameraRef)
+
+        if inCommand == self.CameraCommand_PressShutterButton:
+            if inParam == EdsShutterButton.CameraCommand_ShutterButton_Completely.value:
+                self._release_shutter(camera, True)
+            elif inParam == EdsShutterButton.CameraCommand_ShutterButton_Completely_NonAF.value:
+                self._release_shutter(camera, False)
+            elif inParam == EdsShutterButton.CameraCommand_ShutterButton_Halfway.value:
+                time.sleep(self.af_latency)
+
+    def EdsGetDirectoryItemInfo(self, inDirItemRef):
+        with self._lock:
+            item = self._items.get(_ref_value(inDirItemRef))
+
+        if item is None:
+            self._raise(EdsErrorCodes.EDS_ERR_OBJECT_NOTREADY)
+
+        info = item[1]
+        info.ref = inDirItemRef
+        return info
+
+    def EdsCreateFileStream(self, inFileName, inCreateDisposition, inDesiredAccess):
+        return _MockStream(inFileName)
+
+    def EdsCreateMemoryStream(self, inBufferSize):
+        return _MockStream()
+
+    def EdsDownload(self, inDirItemRef, inReadSize, stream):
+        with self._lock:
+            item = self._items.get(_ref_value(inDirItemRef))
+
+        if item is None:
+            self._raise(EdsErrorCodes.EDS_ERR_OBJECT_NOTREADY)
+
+        camera, info = item
+
+        if not camera.is_session_open:
+            self._raise(EdsErrorCodes.EDS_ERR_SESSION_NOT_OPEN)
+
+        start = time.perf_counter()
+        chunk = bytes(self._CHUNK_SIZE)
+
+        try:
+            with open(stream.filename, 'wb') as file:
+                file.write(info.file_name.encode().ljust(64, b'\0'))
+                remaining = inReadSize - 64
+
+                while remaining > 0:
+                    file.write(chunk[:min(remaining, self._CHUNK_SIZE)])
+                    remaining -= self._CHUNK_SIZE
+        except OSError:
+            self._raise(EdsErrorCodes.EDS_ERR_FILE_IO_ERROR)
+
+        if self.download_rate > 0:
+            remaining_time = inReadSize / self.download_rate - (time.perf_counter() - start)
+
+            if remaining_time > 0:
+                time.sleep(remaining_time)
+
+        with self._lock:
+            self.download_count += 1
+            self.downloaded_bytes += inReadSize
+
+        return stream
+
+    def EdsDownloadComplete(self, inDirItemRef):
+        with self._lock:
+            self._items.pop(_ref_value(inDirItemRef), None)
+
+    def EdsRelease(self, inRef):
+        pass
+
+    def EdsCreateEvfImageRef(self, inStreamRef):
+        return inStreamRef
+
+    def EdsDownloadEvfImage(self, inCameraRef, inEvfImageRef):
+        camera = self._get_open_camera(inCameraRef)
+
+        if not camera.is_evf_on or time.perf_counter() < camera.evf_ready_at:
+            self._raise(EdsErrorCodes.EDS_ERR_OBJECT_NOTREADY)
+
+        if self._evf_frames is None:
+            self._evf_frames = self._build_evf_frames()
+
+        # Pace frames like a camera would.
+        wait = camera.next_evf_frame_at - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        camera.next_evf_frame_at = max(camera.next_evf_frame_at, time.perf_counter()) + 1 / self.evf_fps
+
+        inEvfImageRef.data = self._evf_frames[self._evf_index % len(self._evf_frames)]
+        self._evf_index += 1
+
+    def EdsGetLength(self, inStreamRef):
+        return c_uint64(len(inStreamRef.data))
+
+    def EdsGetPointer(self, inStreamRef, data):
+        memmove(data, inStreamRef.data, len(inStreamRef.data))
+        return cast(data, POINTER(c_ubyte))
+
+
+def _ref_value(ref: Any) -> int:
+    return ref.value if isinstance(ref, c_void_p) else ref
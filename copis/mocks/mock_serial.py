@@ -19,19 +19,25 @@ from . import MockCopisController, MockSerialControllerInterface
 
 
 class MockSerial:
-    """A mock serial port to pair with an emulated mock COPIS serial controller."""
-    def __init__(self, port=None, baudrate=9600, timeout=None):
+    """A mock serial port to pair with an emulated mock COPIS serial controller.
+
+    A configured controller can be passed in as device; a default one is made otherwise.
+    """
+    def __init__(self, port=None, baudrate=9600, timeout=None, device=None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self._is_open = False
 
         # Constrain the mock serial device type so that we can expect the proper methods.
-        if not issubclass(MockCopisController, MockSerialControllerInterface):
+        if device is None:
+            device = MockCopisController()
+
+        if not isinstance(device, MockSerialControllerInterface):
             raise TypeError("Only objects that implement 'MockSerialControllerInterface' " +
                 "can serve as a mock serial device.")
 
-        self._device = MockCopisController()
+        self._device = device
 
         if self.port:
             self.open()
@@ -48,7 +54,7 @@ class MockSerial:
 
     def readline(self, size=-1) -> bytes:
         """Emulates serial readline method."""
-        return self._device.output_line(size)
+        return self._device.output_line(size, self.timeout)
 
     def write(self, data: bytes) -> int:
         """Emulates serial write method."""
@@ -19,7 +19,7 @@ import math
 
 from collections import defaultdict
 from re import X
-from typing import List, Tuple
+from typing import Iterable, List, NamedTuple, Tuple
 from itertools import groupby
 
 import numpy as np
@@ -28,8 +28,8 @@ from glm import vec2, vec3
 
 from copis.classes import Action, Object3D, Pose
 from copis.globals import ActionType, Point5
-from copis.helpers import (create_action_args, get_heading, interleave_lists,
-    sanitize_number, sanitize_point, rad_to_dd)
+from copis.helpers import (create_action_args, get_action_args_values, get_end_position_batch,
+    get_heading, get_heading_batch, interleave_lists, sanitize_number, sanitize_point, rad_to_dd)
 from .mathutils import orthonormal_basis_of
 
 
@@ -264,14 +264,88 @@ def build_pose_sets(poses: List[Pose]) -> List[List[Pose]]:
         sets.append(set_)
     return sets
 
+class PoseArrays(NamedTuple):
+    """The positions of a list of poses, as arrays; for vectorized bulk edits.
+
+    Coords rows are x, y, z in mm and pan, tilt in radians.
+    """
+    poses: List[Pose]
+    devices: np.ndarray     # (N,) int
+    coords: np.ndarray      # (N, 5) float64
+
+    @classmethod
+    def from_poses(cls, poses: List[Pose]) -> 'PoseArrays':
+        """Parses the positions of the given poses into arrays."""
+        pad = [0.0] * 5
+        coords = np.array(
+            [(get_action_args_values(p.position.args[:5]) + pad)[:5] for p in poses],
+            dtype=np.float64).reshape(-1, 5)
+        devices = np.fromiter((p.position.device for p in poses), dtype=np.int64, count=len(poses))
+        return cls(list(poses), devices, coords)
+
+    def mask(self, device_ids: Iterable[int] = None, lower: vec3 = None, upper: vec3 = None,
+             pan_range: Tuple[float, float] = None, tilt_range: Tuple[float, float] = None,
+             index_range: Tuple[int, int] = None) -> np.ndarray:
+        """Returns a boolean mask of the poses matching all the given criteria.
+
+        Bounds are inclusive. Pan and tilt ranges are in decimal degrees; index
+        range is in terms of this list of poses.
+        """
+        mask = np.ones(len(self.poses), dtype=bool)
+        between = lambda values, low, high: (values >= low) & (values <= high)
+
+        if device_ids is not None:
+            mask &= np.isin(self.devices, list(device_ids))
+        if lower is not None and upper is not None:
+            mask &= np.all(between(self.coords[:, :3], np.asarray(lower), np.asarray(upper)), axis=1)
+        if pan_range is not None:
+            mask &= between(np.round(self.coords[:, 3] * 180.0 / math.pi, 3), *pan_range)
+        if tilt_range is not None:
+            mask &= between(np.round(self.coords[:, 4] * 180.0 / math.pi, 3), *tilt_range)
+        if index_range is not None:
+            mask &= between(np.arange(len(self.poses)), *index_range)
+
+        return mask
+
+
+def translate_coords(coords: np.ndarray, offset: Iterable[float]) -> np.ndarray:
+    """Returns (N, 5) pose coords offset by x, y, z, pan and tilt (radians).
+
+    Pan and tilt are sanitized as by sanitize_number: values under 1e-4 are
+    rounded to 4 places and signed zeros dropped.
+    """
+    result = np.asarray(coords, dtype=np.float64) + np.asarray(list(offset), dtype=np.float64)
+    angles = result[:, 3:]
+    result[:, 3:] = np.where(np.abs(angles) < 1e-4, np.round(angles, 4), angles) + 0.0
+    return result
+
+
+def retarget_coords(coords: np.ndarray, target: vec3) -> np.ndarray:
+    """Returns (N, 5) pose coords turned to face the target."""
+    result = np.array(coords, dtype=np.float64)
+    result[:, 3:] = get_heading_batch(result[:, :3], target)
+    return result
+
+
+def forward_back_coords(coords: np.ndarray, distance: float) -> np.ndarray:
+    """Returns (N, 5) pose coords moved by distance along their heading;
+    backwards if distance is negative."""
+    result = np.array(coords, dtype=np.float64)
+    result[:, :3] = get_end_position_batch(result, distance)
+    return result
+
+
 def _build_poses(ordered_points, clearance_indexes, lookat):
     poses = []
 
     pos_records = {}
 
     for device_id in ordered_points:
+        headings = get_heading_batch(ordered_points[device_id], lookat).tolist() \
+            if len(ordered_points[device_id]) else []
+
         for i, point in enumerate(ordered_points[device_id]):
-            pan, tilt = get_heading(point, lookat)
+            pan, tilt = headings[i]
 
             # Add action. skip feed rate for now.
             s_point = sanitize_point(point)
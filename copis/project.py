@@ -18,21 +18,20 @@
 import os
 import json
 from importlib import import_module
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 from pydispatch import dispatcher
 from itertools import groupby
 from glm import vec3
 
-from copis.classes import (BoundingBox, Device, Action, Pose, MonitoredList, Object3D, OBJObject3D)
+from copis.classes import (BoundingBox, Device, Action, Pose, MonitoredList, Object3D, OBJObject3D,
+    PathStatsAggregator)
 
 from copis.globals import Point5
 from copis.command_processor import deserialize_command
-from copis.helpers import collapse_whitespaces, interleave_lists
-from copis.pathutils import build_pose_sets
+from copis.helpers import collapse_whitespaces, create_action_args, interleave_lists
+from copis.pathutils import PoseArrays, build_pose_sets
 import copis.store as store
 
-import wx
-from copis.gui.wxutils import show_prompt_dialog, show_msg_dialog
 
 class Project():
     """A singleton that manages COPIS project operations."""
@@ -63,6 +62,8 @@ class Project():
             self._devices = None
         if not hasattr(self, '_proxies'):
             self._proxies = None
+        if not hasattr(self, '_default_proxy_path'):
+            self._default_proxy_path = None
         if not hasattr(self, '_adhocs'):     #NR
             self._adhocs = None              
         if not hasattr(self, '_pose_sets'):
@@ -71,6 +72,12 @@ class Project():
             self._core = None
         if not hasattr(self, '_options'):
             self._options = {}
+        if not hasattr(self, '_path_stats'):
+            self._path_stats = PathStatsAggregator(lambda: self._pose_sets)
+        if not hasattr(self, '_confirm'):
+            self._confirm = lambda msg, caption: False
+        if not hasattr(self, '_notify'):
+            self._notify = print
         # Bind listeners.
         dispatcher.connect(self._set_is_dirty, signal='ntf_a_list_changed')
         dispatcher.connect(self._set_is_dirty, signal='ntf_d_list_changed')
@@ -95,11 +102,13 @@ class Project():
     @property
     def proxies(self) -> List[Object3D]:
         """Returns the list of proxy objects."""
+        self._ensure_proxies()
         return self._proxies
     
     @property  #NR
     def adhocs(self) -> List[Object3D]:              #NR
         """Returns (dict of lists [todo]) list of adhoc objects that can be displayed as needed."""     #NR
+        self._ensure_proxies()
         return self._adhocs                          #NR
 
     @property
@@ -107,6 +116,11 @@ class Project():
         """Returns the pose set list."""
         return self._pose_sets
 
+    @property
+    def path_stats(self) -> PathStatsAggregator:
+        """Returns the per-device pose and image counts and extents of the pose set list."""
+        return self._path_stats
+
     @property
     def poses(self) ->List[Pose]:
         """Returns all poses in the pose set list."""
@@ -149,6 +163,18 @@ class Project():
             return []
         return [deserialize_command(cmd) for cmd in self.homing_sequence]
 
+    def set_prompt_handlers(self, confirm: Callable[[str, str], bool] = None,
+        notify: Callable[[str], None] = None) -> None:
+        """Sets how the project asks the user questions and tells them things.
+
+        Args:
+            confirm: Called with a question and a caption; returns True for yes.
+                Without one, questions are answered no.
+            notify: Called with a message. Without one, messages are printed.
+        """
+        self._confirm = confirm or (lambda msg, caption: False)
+        self._notify = notify or print
+
     def _init(self):
         #self._profile_path =  store.get_profile_path()
         #self._default_proxy_path = store.get_proxy_path()
@@ -184,6 +210,8 @@ class Project():
                 data['serial_no'] = ''
             if 'serial_no' not in data:
                 data['serial_no'] = ''
+            if 'serial_port' not in data:
+                data['serial_port'] = ''
             if 'edsdk_save_to_path' not in data: #eventually add global default in ini for all cams
                 data['edsdk_save_to_path'] = os.path.join(store.get_root(), 'output') #for now default to program dir.
             if data['edsdk_save_to_path'] and not (data['edsdk_save_to_path']).isspace() and not os.path.exists(data['edsdk_save_to_path']):
@@ -202,7 +230,8 @@ class Project():
                 vec3(data['body_dims']),
                 vec3(data['gantry_dims']),
                 data['gantry_orientation'],
-                data['edsdk_save_to_path']
+                data['edsdk_save_to_path'],
+                data['serial_port']
             )
         key = 'devices'
         devices = []
@@ -214,6 +243,10 @@ class Project():
         else:
             self._devices: List[Device] = MonitoredList('ntf_d_list_changed', devices)
 
+    def _ensure_proxies(self):
+        if self._proxies is None and self._is_initialized:
+            self._init_proxies(default_proxy_path=self._default_proxy_path)
+
     def _init_proxies(self, proxies=None, default_proxy_path=None):
         
         if proxies is None and  default_proxy_path and os.path.exists(default_proxy_path):
@@ -298,10 +331,12 @@ class Project():
             self._init()
         with open(profile_path, 'r', encoding='utf-8') as file:
             self._profile = json.load(file)
-        #self._default_proxy_path = default_proxy_path
+        self._default_proxy_path = default_proxy_path
         #self._profile = store.load_json(store.get_profile_path())
         self._init_devices()
-        self._init_proxies(default_proxy_path=default_proxy_path)
+        # On first start, the default proxy is loaded when first needed.
+        if self._proxies is not None:
+            self._init_proxies(default_proxy_path=default_proxy_path)
         self._init_pose_sets()
         self._path = None
         self._unset_dirty_flag()
@@ -342,8 +377,7 @@ class Project():
         #eventually move the UI check elsewhere
         #this is a critical check, otherwise it makes sharing paths among labs difficult.
         if self._profile != proj_data['profile']:
-            choice = show_prompt_dialog('This project was made using a different machine profile, override existing?',"Profile Mismatch")
-            if choice == wx.ID_YES:
+            if self._confirm('This project was made using a different machine profile, override existing?',"Profile Mismatch"):
                 self._profile = proj_data['profile']
                 self._init_devices()
         self._init_proxies(proxies=proxies)
@@ -368,7 +402,7 @@ class Project():
         resp = None
         is_dirty = False
         if self._profile != proj_data['profile']:
-            show_msg_dialog('This project was made using a different machine profile, unable to import poses.')
+            self._notify('This project was made using a different machine profile, unable to import poses.')
             return resp
         p_sets = list(map(_pose_from_json_map, proj_data['imaging_path']))
         self._append_pose_sets(p_sets)
@@ -383,9 +417,9 @@ class Project():
         get_module = lambda i: '.'.join(i.split(".")[:2])
         
         proj_data = { 'imaging_path': self._pose_sets, 'imaging_options': self._options, 'profile': self._profile, 'proxies': []}
-        for proxy in self._proxies:
-            if hasattr(proxy, 'obj'):
-                proxy_data = proxy.obj.file_name
+        for proxy in self.proxies:
+            if isinstance(proxy, OBJObject3D):
+                proxy_data = proxy.filename
                 proxy_name = store.get_file_base_name_no_ext(proxy_data)
                 is_path = True
             else:
@@ -423,29 +457,32 @@ class Project():
             In which case poses are shifted down to the end of the list
             or until a set without a pose for the camera is encountered.
             Returns the index of the inserted pose."""
-        if not self.can_add_pose(set_index, pose.position.device):
-            free_set_indices = [i for i, set_ in enumerate(self._pose_sets) if i > set_index \
-                and not any(p.position.device == pose.position.device for p in set_)]
+        with self.batch_edit():
+            if not self.can_add_pose(set_index, pose.position.device):
+                free_set_indices = [i for i, set_ in enumerate(self._pose_sets) if i > set_index \
+                    and not any(p.position.device == pose.position.device for p in set_)]
 
-            if free_set_indices:
-                free_set_index = free_set_indices[0]
-            else:
-                free_set_index = len(self._pose_sets)
-                self.add_pose_set()
+                if free_set_indices:
+                    free_set_index = free_set_indices[0]
+                else:
+                    free_set_index = len(self._pose_sets)
+                    self.add_pose_set()
 
-            for i in range(free_set_index - 1, set_index - 1, -1):
-                shifted = next(filter(lambda p: p.position.device == pose.position.device,
-                    self._pose_sets[i]))
+                for i in range(free_set_index - 1, set_index - 1, -1):
+                    shifted = next(filter(lambda p: p.position.device == pose.position.device,
+                        self._pose_sets[i]))
 
-                self._pose_sets[i].remove(shifted)
-                self._pose_sets[i + 1].append(shifted)
-                self._pose_sets[i + 1].sort(key=lambda p: p.position.device)
+                    self._pose_sets[i].remove(shifted)
+                    self._pose_sets[i + 1].append(shifted)
+                    self._pose_sets[i + 1].sort(key=lambda p: p.position.device)
 
-        pose_set = self._pose_sets[set_index].copy()
-        pose_set.append(pose)
-        pose_set.sort(key=lambda p: p.position.device)
+                self._pose_sets.mark_modified(set_index + 1, free_set_index - set_index)
 
-        self._pose_sets[set_index] = pose_set
+            pose_set = self._pose_sets[set_index].copy()
+            pose_set.append(pose)
+            pose_set.sort(key=lambda p: p.position.device)
+
+            self._pose_sets[set_index] = pose_set
 
         return pose_set.index(pose)
 
@@ -475,18 +512,62 @@ class Project():
         """Removes a pose set given its index."""
         self._pose_sets.pop(set_index)
 
+    def delete_pose_sets(self, set_indexes: Iterable[int]):
+        """Removes pose sets given their indexes; with a single notification."""
+        with self.batch_edit():
+            for set_index in sorted(set(set_indexes), reverse=True):
+                self._pose_sets.pop(set_index)
+
+    def get_pose_arrays(self, poses: List[Pose] = None) -> PoseArrays:
+        """Returns the positions of the given poses as arrays, for bulk editing.
+            Defaults to all poses, in pose set order."""
+        return PoseArrays.from_poses(self.poses if poses is None else poses)
+
+    def set_pose_coords(self, poses: List[Pose], coords) -> None:
+        """Writes x, y, z, pan and tilt back into the positions of the given poses.
+
+            Coords is an (N, 5) array, as in PoseArrays. All changes go out in a
+            single ntf_a_list_changed notification, marking the affected sets modified.
+        """
+        set_indexes = {id(p): i for i, p_set in enumerate(self._pose_sets) for p in p_set}
+        modified = set()
+
+        with self.batch_edit():
+            for pose, values in zip(poses, coords.tolist()):
+                position = pose.position
+                args = create_action_args(values)
+                argc = min(len(position.args), len(args))
+                position.args[:argc] = args[:argc]
+                position.argc = argc
+                position.update()
+
+                if id(pose) in set_indexes:
+                    modified.add(set_indexes[id(pose)])
+
+            for set_index in sorted(modified):
+                self._pose_sets.mark_modified(set_index)
+
+    def batch_edit(self):
+        """Returns a context manager that groups pose set list edits.
+
+            Listeners get a single ntf_a_list_changed notification when the
+            outermost batch exits, with a ListDiff of all the changes made:
+
+                with project.batch_edit():
+                    project.delete_pose_set(3)
+                    project.add_pose_set()
+        """
+        return self._pose_sets.batch()
+
     def move_set(self, index: int, step: int) -> int:
         """Moves a pose set up or down by step amount.
             Returns the pose set's new index."""
         new_index = index + step
 
         if 0 <= new_index < len(self._pose_sets):
-            sets = self._pose_sets.copy()
-            pose_set = sets.pop(index)
-            sets.insert(new_index, pose_set)
-
-            self._pose_sets.clear(False)
-            self._pose_sets.extend(sets)
+            with self.batch_edit():
+                pose_set = self._pose_sets.pop(index)
+                self._pose_sets.insert(new_index, pose_set)
 
             return new_index
 
@@ -22,12 +22,14 @@ import io
 import json
 import shutil
 import errno
+import tempfile
 
 from configparser import ConfigParser
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, Optional
 #from appdirs import user_data_dir
-from platformdirs import site_data_path, user_data_dir, site_data_dir
+from platformdirs import site_data_path, user_data_dir, site_data_dir, user_cache_dir
+import numpy as np
 
 def get_root() -> str:
      """Returns root directory."""
@@ -193,3 +195,48 @@ def delete_path(filename: str) -> None:
         os.remove(filename)
 
 
+def get_cache_dir(*sub_dirs: str) -> str:
+    """Returns (and creates if needed) the COPIS user cache directory;
+    with optional sub directories joined."""
+    cache_dir = os.path.join(user_cache_dir('copis', 'copis'), *sub_dirs)
+    if_not_exists_create(cache_dir)
+    return cache_dir
+
+
+def save_arrays(dir_name: str, arrays: Dict[str, np.ndarray]) -> None:
+    """Saves named arrays as raw .npy files in a directory.
+
+    The directory is written under a temporary name then moved in place so
+    readers never see a partial entry. If it already exists it's left alone.
+    """
+    if path_exists(dir_name):
+        return
+
+    parent_dir = os.path.dirname(dir_name)
+    if_not_exists_create(parent_dir)
+    temp_dir = tempfile.mkdtemp(dir=parent_dir)
+
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+        os.replace(temp_dir, dir_name)
+    except OSError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def load_arrays(dir_name: str, names: Iterable[str], mmap: bool=True) -> Optional[Dict[str, np.ndarray]]:
+    """Loads named .npy arrays saved with save_arrays; memory mapped (read only)
+    by default. Returns None if any of the arrays is missing or unreadable."""
+    arrays = {}
+    mmap_mode = 'r' if mmap else None
+
+    for name in names:
+        filename = os.path.join(dir_name, f'{name}.npy')
+        if not path_exists(filename):
+            return None
+        try:
+            arrays[name] = np.load(filename, mmap_mode=mmap_mode)
+        except (OSError, ValueError):
+            return None
+
+    return arrays